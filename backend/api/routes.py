@@ -7,12 +7,15 @@ Endpoints:
 - Keyboard shortcut configuration
 - Value stream management
 - AI assist (Intelligence Flywheel)
+- Related case studies
 - System health checks
 """
 import asyncio
+import json
 import logging
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text, delete
 from sqlalchemy.orm import selectinload
@@ -33,10 +36,15 @@ from api.schemas import (
     ValueStreamSchema,
     ValueStreamCreateRequest,
     AIAssistRequest,
+    AIAssistBatchRequest,
+    AIAssistBatchResponse,
     AIAssistResponse,
+    ReindexJobResponse,
+    IndexCompactionResponse,
+    RelatedCasesResponse,
 )
 from db.database import get_db
-from db.models import Task, Comment, Attachment, ShortcutConfig, ValueStream
+from db.models import Task, Comment, Attachment, ShortcutConfig, ValueStream, FlywheelOutbox
 
 logger = logging.getLogger(__name__)
 
@@ -47,13 +55,27 @@ router = APIRouter()
 
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
-    """Check API and database health"""
+    """Check API and database health, and whether the AI path is warm"""
+    from services.warmup import get_warmup_status
+
+    warmup = get_warmup_status()
     return HealthResponse(
         status="healthy",
         database_connected=True,
+        ai_ready=warmup.ready,
+        warmup=warmup.to_dict(),
     )
 
 
+@router.get("/health/ai", response_model=HealthResponse)
+async def ai_health_check():
+    """Readiness probe for AI traffic: 503 until the startup warm-up finished"""
+    response = await health_check()
+    if not response.ai_ready:
+        raise HTTPException(status_code=503, detail=response.warmup)
+    return response
+
+
 # ============= Task CRUD =============
 
 @router.get("/tasks", response_model=List[TaskSchema])
@@ -112,6 +134,11 @@ async def create_task(
     db.add(task)
     await db.commit()
 
+    # Opt-in (ASSIST_PREFETCH): have the default AI assist answer ready
+    if task_data.status != "done":
+        from services.assist_prefetcher import get_assist_prefetcher
+        get_assist_prefetcher().schedule(task_id)
+
     result = await db.execute(
         select(Task)
         .where(Task.id == task_id)
@@ -208,13 +235,18 @@ async def update_task(
 
         task.updated_at = datetime.utcnow()
 
-        # Intelligence Flywheel: create case study when task completed
+        # Intelligence Flywheel: queue case study creation when task completed.
+        # The outbox row commits with the status change; the flywheel worker
+        # writes and indexes the case study off the request path.
+        case_study_queued = False
         if "status" in update_data and update_data["status"] == "done" and original_status != "done":
-            task.completed_at = datetime.utcnow()
-            try:
-                from services.case_memory import create_case_study
+            from services.flywheel_worker import EVENT_CASE_STUDY_UPSERT
 
-                task_dict = {
+            task.completed_at = datetime.utcnow()
+            db.add(FlywheelOutbox(
+                task_id=task.id,
+                event=EVENT_CASE_STUDY_UPSERT,
+                payload={
                     "id": task.id,
                     "title": task.title,
                     "description": task.description,
@@ -227,15 +259,18 @@ async def update_task(
                     "comments": [
                         {"text": c.text, "author": c.author} for c in task.comments
                     ],
-                }
-                result_case = await create_case_study(task_dict)
-                task.case_study_slug = result_case.get("slug")
-                logger.info(f"Case study created for task {task_id}: {result_case.get('slug')}")
-            except Exception as e:
-                logger.error(f"Case study creation failed for task {task_id}: {e}")
+                },
+            ))
+            case_study_queued = True
 
         await db.commit()
         db.expire_all()
+        if case_study_queued:
+            from services.flywheel_worker import get_flywheel_worker
+            get_flywheel_worker().notify()
+        if "status" in update_data and update_data["status"] == "doing" and original_status != "doing":
+            from services.assist_prefetcher import get_assist_prefetcher
+            get_assist_prefetcher().schedule(task_id)
 
         # Reload task with relationships
         result = await db.execute(
@@ -270,6 +305,9 @@ async def delete_task(task_id: str, db: AsyncSession = Depends(get_db)):
 
         if not task:
             raise HTTPException(status_code=404, detail="Task not found")
+        # Completed tasks have (or will have, once the outbox catches up) a
+        # case study to tombstone
+        has_case_study = bool(task.case_study_slug or task.completed_at)
 
         # Delete using raw SQL to avoid relationship issues
         delete_sql = text("DELETE FROM tasks WHERE id = :task_id")
@@ -278,7 +316,16 @@ async def delete_task(task_id: str, db: AsyncSession = Depends(get_db)):
         if result.rowcount == 0:
             raise HTTPException(status_code=404, detail="Task not found")
 
+        if has_case_study:
+            from services.flywheel_worker import EVENT_CASE_STUDY_DELETE
+            db.add(FlywheelOutbox(task_id=task_id, event=EVENT_CASE_STUDY_DELETE, payload={}))
+        from services.assist_prefetcher import delete_suggestion
+        await delete_suggestion(db, task_id)
         await db.commit()
+        if has_case_study:
+            from services.flywheel_worker import get_flywheel_worker
+            get_flywheel_worker().notify()
+
         return {"message": "Task deleted successfully"}
 
     except HTTPException:
@@ -628,45 +675,272 @@ async def delete_value_stream(value_stream_id: str, db: AsyncSession = Depends(g
 
 # ============= AI Assist (Intelligence Flywheel) =============
 
-@router.post("/ai/assist", response_model=AIAssistResponse)
-async def ai_assist(request: AIAssistRequest, db: AsyncSession = Depends(get_db)):
-    """Get AI assistance for a specific task using case memory context."""
+async def _assist_task_data(db: AsyncSession, task_id: str) -> dict:
+    """Task fields used for AI assist; 404 if the task does not exist."""
     result = await db.execute(
         select(Task)
-        .where(Task.id == request.task_id)
+        .where(Task.id == task_id)
         .options(selectinload(Task.comments))
     )
     task = result.scalar_one_or_none()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
+    from services.ai_service import assist_task_data
+    return assist_task_data(task)
+
+
+async def _prefetched_assist(
+    db: AsyncSession, request: AIAssistRequest, task_data: dict
+) -> Optional[dict]:
+    """Stored default answer (ASSIST_PREFETCH) if the request asks for the default
+    and the task has not changed since it was computed."""
+    if request.prompt or request.scope_to_value_stream or request.tier:
+        return None
+    from services.assist_prefetcher import get_assist_prefetcher, get_fresh_suggestion
+    stored = await get_fresh_suggestion(db, request.task_id, task_data["updated_at"])
+    prefetcher = get_assist_prefetcher()
+    if prefetcher.enabled:
+        prefetcher.record_lookup(stored is not None)
+    if stored is not None:
+        stored["prefetched"] = True
+    return stored
+
+
+def _ai_overloaded() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="AI assist is at capacity, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+def _check_ai_capacity():
+    """Reject up front, before retrieval, when Gemini calls would queue past the limit."""
+    from services.gemini_client import get_gemini_client
+
+    if get_gemini_client().scheduler.saturated:
+        raise _ai_overloaded()
+
+
+@router.post("/ai/assist", response_model=AIAssistResponse)
+async def ai_assist(request: AIAssistRequest, db: AsyncSession = Depends(get_db)):
+    """Get AI assistance for a specific task using case memory context.
+
+    Answers 503 (with Retry-After) when the Gemini queue is full. A fresh
+    prefetched answer (ASSIST_PREFETCH) is returned as is.
+    """
+    task_data = await _assist_task_data(db, request.task_id)
+    stored = await _prefetched_assist(db, request, task_data)
+    if stored is not None:
+        return AIAssistResponse(**stored)
+    _check_ai_capacity()
+
     from services.ai_service import assist_with_task
+    from services.gemini_client import GeminiOverloaded
 
-    task_data = {
-        "id": task.id,
-        "title": task.title,
-        "status": task.status,
-        "description": task.description,
-        "notes": task.notes,
-        "assignee": task.assignee,
-        "value_stream": task.value_stream,
-    }
-    ai_result = await assist_with_task(task_data, prompt=request.prompt)
+    try:
+        ai_result = await assist_with_task(
+            task_data,
+            prompt=request.prompt,
+            scope_to_value_stream=request.scope_to_value_stream,
+            tier=request.tier,
+            latency_slo_ms=request.latency_slo_ms,
+        )
+    except GeminiOverloaded:
+        raise _ai_overloaded()
     return AIAssistResponse(**ai_result)
 
 
-@router.post("/ai/reindex")
-async def reindex_case_studies():
-    """Rebuild the semantic search index over all case studies."""
+@router.post("/ai/assist/batch", response_model=AIAssistBatchResponse)
+async def ai_assist_batch(request: AIAssistBatchRequest, db: AsyncSession = Depends(get_db)):
+    """Get AI assistance for several tasks (e.g. during triage) in few Gemini calls.
+
+    Tasks are packed into as few structured-output prompts as fit
+    AI_BATCH_TOKEN_BUDGET, sharing retrieved past cases. 404 if any task
+    does not exist; 503 (with Retry-After) when the Gemini queue is full.
+    """
+    _check_ai_capacity()
+    task_ids = list(dict.fromkeys(request.task_ids))
+    result = await db.execute(select(Task).where(Task.id.in_(task_ids)))
+    tasks = {task.id: task for task in result.scalars().all()}
+    missing = [task_id for task_id in task_ids if task_id not in tasks]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Tasks not found: {', '.join(missing)}")
+
+    from services.ai_service import assist_task_data, batch_assist_with_tasks
+    from services.gemini_client import GeminiOverloaded
+
     try:
-        from services.semantic_rag import get_rag_service
+        results, batches = await batch_assist_with_tasks(
+            [assist_task_data(tasks[task_id]) for task_id in task_ids],
+            prompt=request.prompt,
+            scope_to_value_stream=request.scope_to_value_stream,
+        )
+    except GeminiOverloaded:
+        raise _ai_overloaded()
+    return AIAssistBatchResponse(results=results, batches=batches)
+
+
+@router.post("/ai/assist/stream")
+async def ai_assist_stream(request: AIAssistRequest, db: AsyncSession = Depends(get_db)):
+    """Stream AI assistance as server-sent events.
+
+    Emits "chunk" events ({"text": ...}) as Gemini generates, then one
+    "metadata" event with the AIAssistResponse fields other than response.
+    Generation stops when the client disconnects. Answers 503 (with
+    Retry-After) when the Gemini queue is full. A fresh prefetched answer
+    arrives as a single chunk.
+    """
+    task_data = await _assist_task_data(db, request.task_id)
+    stored = await _prefetched_assist(db, request, task_data)
+    if stored is None:
+        _check_ai_capacity()
+
+    from services.ai_service import stream_assist_with_task
+
+    async def stored_events():
+        yield f"event: chunk\ndata: {json.dumps({'text': stored.pop('response')})}\n\n"
+        yield f"event: metadata\ndata: {json.dumps(stored)}\n\n"
+
+    if stored is not None:
+        return StreamingResponse(
+            stored_events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
-        rag = get_rag_service()
-        count = rag.build_index()
-        return {"message": f"Indexed {count} case studies", "count": count}
-    except Exception as e:
-        logger.error(f"Reindex failed: {e}")
-        raise HTTPException(status_code=503, detail=f"Reindex unavailable: {str(e)}")
+    from services.gemini_client import GeminiOverloaded
+
+    stream = stream_assist_with_task(
+        task_data,
+        prompt=request.prompt,
+        scope_to_value_stream=request.scope_to_value_stream,
+        tier=request.tier,
+        latency_slo_ms=request.latency_slo_ms,
+    )
+    # Wait for the first event before sending headers, so a full Gemini
+    # queue can still be answered with 503
+    try:
+        first = await stream.__anext__()
+    except GeminiOverloaded:
+        raise _ai_overloaded()
+
+    async def events():
+        try:
+            event, data = first
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            async for event, data in stream:
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            # Runs on disconnect too (the response task is cancelled)
+            await stream.aclose()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/ai/usage")
+async def get_ai_usage(window: Optional[float] = Query(None, gt=0, description="Seconds of history")):
+    """Gemini usage: requests, tokens, cost and latency percentiles (overall, per model and
+    per method), response cache and scheduler queue, plus the RAG query embedding
+    cache (null until the index is loaded) and assist prefetching.
+
+    With window, usage over the last `window` seconds from the persisted usage
+    history instead (survives restarts).
+    """
+    from services.assist_prefetcher import get_assist_prefetcher
+    from services.gemini_client import get_gemini_client
+    from services.semantic_rag import loaded_rag_service
+
+    client = get_gemini_client()
+    if window is None:
+        stats = client.get_usage_stats()
+        rag = loaded_rag_service()
+        stats["query_cache"] = rag.query_cache_stats() if rag is not None else None
+        stats["prefetch"] = get_assist_prefetcher().stats()
+        return stats
+    try:
+        return await client.usage_window(window)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/ai/reindex", response_model=ReindexJobResponse, status_code=202)
+async def reindex_case_studies():
+    """Start a background rebuild of the semantic search index.
+
+    Search keeps serving the current index until the rebuild completes.
+    If a rebuild is already in progress, its job is returned instead.
+    """
+    from services.reindex_jobs import start_reindex_job
+
+    job = start_reindex_job()
+    return ReindexJobResponse(**job.to_dict())
+
+
+@router.get("/ai/reindex/{job_id}", response_model=ReindexJobResponse)
+async def get_reindex_status(job_id: str):
+    """Get progress of a background reindex job."""
+    from services.reindex_jobs import get_reindex_job
+
+    job = get_reindex_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return ReindexJobResponse(**job.to_dict())
+
+
+@router.post("/ai/reindex/{job_id}/cancel", response_model=ReindexJobResponse)
+async def cancel_reindex(job_id: str):
+    """Cancel a background reindex job, leaving the live index untouched."""
+    from services.reindex_jobs import cancel_reindex_job
+
+    job = cancel_reindex_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Reindex job not found")
+    return ReindexJobResponse(**job.to_dict())
+
+
+@router.post("/ai/index/compact", response_model=IndexCompactionResponse)
+async def compact_index():
+    """Rewrite the semantic search index without tombstoned entries."""
+    from services.semantic_rag import get_rag_service
+
+    result = await asyncio.to_thread(get_rag_service().compact_index)
+    return IndexCompactionResponse(**result)
+
+
+# ============= Case Studies =============
+
+@router.get("/cases/{slug}/readme", response_class=PlainTextResponse)
+async def get_case_readme(slug: str):
+    """Render a case study's README (markdown) from the case store."""
+    from services.case_store import get_case_store, render_readme
+
+    metadata = await asyncio.to_thread(get_case_store().get, slug)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="Case study not found")
+    return PlainTextResponse(render_readme(metadata), media_type="text/markdown")
+
+
+@router.get("/cases/{slug}/related", response_model=RelatedCasesResponse)
+async def get_related_cases(slug: str, limit: int = Query(5, ge=1, le=50)):
+    """Get the case studies most similar to a case study.
+
+    Answered from the neighbour graph kept in the index, so no query
+    encoding or search is needed. At most RAG_RELATED_K neighbours are
+    stored per case study; a larger limit returns that many.
+    """
+    from services.semantic_rag import get_rag_service
+
+    # The first call loads the index
+    related = await asyncio.to_thread(lambda: get_rag_service().related_cases(slug, limit))
+    if related is None:
+        raise HTTPException(status_code=404, detail="Case study not found")
+    return RelatedCasesResponse(slug=slug, related=related)
 
 
 # ============= Helper Functions =============
@@ -66,6 +66,8 @@ class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     database_connected: bool
+    ai_ready: bool = True
+    warmup: Optional[dict] = None
 
 
 class ShortcutConfigSchema(BaseModel):
@@ -137,6 +139,11 @@ class AIAssistRequest(BaseModel):
     """Request for AI task assistance"""
     task_id: str
     prompt: Optional[str] = None
+    scope_to_value_stream: bool = False
+    # Gemini model tier; routed by prompt size if omitted
+    tier: Optional[Literal["light", "standard", "heavy"]] = None
+    # Target Gemini latency: the most capable model meeting it (ignored with tier)
+    latency_slo_ms: Optional[float] = Field(None, gt=0)
 
 
 class AIAssistResponse(BaseModel):
@@ -144,3 +151,65 @@ class AIAssistResponse(BaseModel):
     response: str
     similar_cases: int
     model: str
+    # "ok", or "timeout"/"error"/"busy" when the answer was given without case context
+    retrieval: str = "ok"
+    # Estimated prompt tokens spent on similar cases, and saved by the budget
+    context_tokens: int = 0
+    context_tokens_saved: int = 0
+    # Served from the background prefetch (ASSIST_PREFETCH) for an unchanged task
+    prefetched: bool = False
+
+
+class AIAssistBatchRequest(BaseModel):
+    """Request for AI assistance on several tasks at once"""
+    task_ids: List[str] = Field(..., min_length=1, max_length=50)
+    prompt: Optional[str] = None
+    scope_to_value_stream: bool = False
+
+
+class AIAssistBatchItem(AIAssistResponse):
+    """AI assistance for one task of a batch"""
+    task_id: str
+
+
+class AIAssistBatchResponse(BaseModel):
+    """Response from batch AI assistance, in request order"""
+    results: List[AIAssistBatchItem]
+    # Gemini calls made (tasks are packed per call under AI_BATCH_TOKEN_BUDGET)
+    batches: int
+
+
+class ReindexJobResponse(BaseModel):
+    """Status of a background reindex job"""
+    job_id: str
+    status: Literal["pending", "running", "completed", "failed", "cancelled"]
+    processed: int
+    total: int
+    progress: float
+    count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+
+
+class IndexCompactionResponse(BaseModel):
+    """Result of compacting the semantic search index"""
+    removed: int
+    entries: int
+
+
+class RelatedCaseSchema(BaseModel):
+    """A case study from the related-cases graph"""
+    slug: str
+    title: Optional[str] = None
+    value_stream: Optional[str] = None
+    assignee: Optional[str] = None
+    completed_at: Optional[str] = None
+    score: float
+
+
+class RelatedCasesResponse(BaseModel):
+    """Nearest neighbours of a case study"""
+    slug: str
+    related: List[RelatedCaseSchema]
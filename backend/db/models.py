@@ -95,3 +95,36 @@ class ShortcutConfig(Base):
     is_default = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class FlywheelOutbox(Base):
+    """Durable queue of Intelligence Flywheel work (case study upsert/delete).
+
+    Rows are written in the same transaction as the task change that causes
+    them and processed by services/flywheel_worker.py off the request path.
+    """
+    __tablename__ = "flywheel_outbox"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task_id = Column(String, nullable=False, index=True)
+    event = Column(String, nullable=False)  # case_study.upsert, case_study.delete
+    payload = Column(JSON, default=dict)
+    status = Column(String, nullable=False, default="pending", index=True)  # pending, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
+
+
+class AssistSuggestion(Base):
+    """Prefetched default AI assist answer for a task.
+
+    Written by services/assist_prefetcher.py; only served while the task's
+    updated_at still equals task_updated_at.
+    """
+    __tablename__ = "assist_suggestions"
+
+    task_id = Column(String, primary_key=True)
+    task_updated_at = Column(DateTime, nullable=False)
+    response = Column(JSON, nullable=False)  # AIAssistResponse fields
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -31,8 +31,26 @@ async def lifespan(app: FastAPI):
     logger.info("Initializing database...")
     await init_db()
     logger.info("Database initialized")
+    from services.flywheel_worker import get_flywheel_worker
+    flywheel_worker = get_flywheel_worker()
+    flywheel_worker.start()
+    # Opt-in (RAG_WARMUP): loads the model and index in a background thread
+    from services.warmup import start_warmup
+    start_warmup()
+    # Persists Gemini usage every GEMINI_USAGE_FLUSH_INTERVAL seconds. This
+    # creates the client at startup on purpose: every AI route uses it, and
+    # usage from the first request on must reach the history.
+    from services.gemini_client import get_gemini_client
+    get_gemini_client().start_usage_flusher()
     yield
     logger.info("Shutting down...")
+    await flywheel_worker.stop()
+    from services.assist_prefetcher import get_assist_prefetcher
+    await get_assist_prefetcher().stop()
+    from services.embedding_worker import shutdown_embedding_batcher
+    shutdown_embedding_batcher()
+    from services.gemini_client import close_gemini_client
+    await close_gemini_client()
 
 
 # Create FastAPI app
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent query encoding: inline on the event loop vs the
+micro-batching embedding worker process.
+
+Fires R bursts of C simultaneous encode requests (the query step of
+/api/ai/assist arriving together) and reports throughput, p50/p99 latency
+measured from arrival, and the worst event-loop stall observed by a
+heartbeat task while they run.
+
+Usage:
+    python backend/scripts/benchmark_embedding_concurrency.py [--embedder NAME]
+        [--concurrency C] [--rounds R] [--wait-ms MS] [--max-batch N]
+
+Defaults:
+    --embedder     sentence-transformers
+    --concurrency  16
+    --rounds       10
+    --wait-ms      5
+    --max-batch    32
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.embedders import create_embedder  # noqa: E402
+from services.embedding_worker import EmbeddingBatcher  # noqa: E402
+
+QUERIES = [
+    "payments gateway timeout after deploy",
+    "database migration locks orders table",
+    "frontend build fails on node upgrade",
+    "flaky integration test in checkout service",
+    "rotate expired TLS certificate on api gateway",
+]
+
+
+async def heartbeat(stop: asyncio.Event, stalls: list, interval: float = 0.005):
+    """Measures how late the loop wakes us up — i.e. how long it was blocked."""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - start - interval)
+
+
+async def run(encode, concurrency: int, rounds: int) -> dict:
+    latencies = []
+    stalls = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, stalls))
+
+    async def request(text: str, arrived: float):
+        await asyncio.sleep(0)  # let every request in the burst arrive first
+        await encode(text)
+        latencies.append(time.perf_counter() - arrived)
+
+    start = time.perf_counter()
+    for r in range(rounds):
+        arrived = time.perf_counter()
+        # Vary text so a query cache would not help
+        await asyncio.gather(*(
+            request(f"{QUERIES[(c + r) % len(QUERIES)]} #{c}-{r}", arrived)
+            for c in range(concurrency)
+        ))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": float(np.percentile(lat_ms, 50)),
+        "p99": float(np.percentile(lat_ms, 99)),
+        "max_stall": max(stalls) * 1000 if stalls else 0.0,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent query encoding")
+    parser.add_argument("--embedder", default="sentence-transformers")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--wait-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    args = parser.parse_args()
+
+    embedder = create_embedder(args.embedder).load()
+    embedder.encode("warm up")
+
+    async def inline_encode(text):
+        # The old path: model.encode directly on the event loop thread
+        return embedder.encode(text)
+
+    batcher = EmbeddingBatcher(embedder.descriptor(), max_batch=args.max_batch, max_wait_ms=args.wait_ms)
+    await batcher.encode("warm up")  # start the worker and load the model there
+
+    results = {
+        "inline": await run(inline_encode, args.concurrency, args.rounds),
+        "worker": await run(batcher.encode, args.concurrency, args.rounds),
+    }
+    stats = batcher.stats()
+    batcher.close()
+
+    print(f"{args.embedder}: {args.rounds} bursts of {args.concurrency} concurrent requests\n")
+    print(f"{'path':<8} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'max loop stall ms':>18}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['throughput']:>8.1f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['max_stall']:>18.2f}")
+    print(f"\nworker avg batch size: {stats['avg_batch_size']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
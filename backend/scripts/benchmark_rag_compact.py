@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark RAG compact mode: memory per 10k cases and recall vs full precision.
+
+Builds synthetic index snapshots (384-dim clustered embeddings, realistic
+description/notes sizes) in each storage mode and reports:
+
+  - in-memory bytes per 10k case studies (vectors + entry metadata)
+  - recall@k of float16 / int8 search against the float32 top-k
+
+No model or case studies on disk are needed.
+
+Usage:
+    python backend/scripts/benchmark_rag_compact.py [--cases N] [--queries N] [--top-k K]
+
+Defaults:
+    --cases    10000
+    --queries  200
+    --top-k    5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.semantic_rag import IndexSnapshot, COMPACT_MODES, _entry_from_metadata  # noqa: E402
+
+DIM = 384
+
+
+def synthetic_corpus(n_cases: int, rng: np.random.Generator):
+    """Clustered unit-ish vectors so neighbours are meaningfully close."""
+    centers = rng.normal(size=(max(8, n_cases // 50), DIM)).astype(np.float32)
+    assignment = rng.integers(0, len(centers), size=n_cases)
+    vectors = centers[assignment] + 0.35 * rng.normal(size=(n_cases, DIM)).astype(np.float32)
+
+    metadata = [
+        {
+            "slug": f"{i:04d}_synthetic-case-{i}",
+            "title": f"Synthetic case {i}",
+            "description": "d" * 400,
+            "notes": "n" * 1200,
+            "assignee": "You",
+            "value_stream": "Platform",
+            "completed_at": "2024-01-01T00:00:00",
+            "indexed_text": "t" * 1600,
+        }
+        for i in range(n_cases)
+    ]
+    return vectors, metadata, centers
+
+
+def top_k(snapshot: IndexSnapshot, query: np.ndarray, k: int) -> set:
+    scores = snapshot.cosine_scores(query)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return set(idx.tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark RAG compact storage modes")
+    parser.add_argument("--cases", type=int, default=10_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors, metadata, centers = synthetic_corpus(args.cases, rng)
+    queries = centers[rng.integers(0, len(centers), size=args.queries)]
+    queries = queries + 0.35 * rng.normal(size=queries.shape).astype(np.float32)
+
+    snapshots = {}
+    for mode, dtype in COMPACT_MODES.items():
+        lazy = mode != "off"
+        entries = [_entry_from_metadata(m, lazy) for m in metadata]
+        snapshots[mode] = IndexSnapshot.from_entries(entries, vectors, dtype)
+
+    baseline = [top_k(snapshots["off"], q, args.top_k) for q in queries]
+
+    print(f"{args.cases} cases, {args.queries} queries, recall@{args.top_k} vs float32\n")
+    print(f"{'mode':<8} {'vectors/10k':>12} {'metadata/10k':>13} {'total/10k':>11} {'recall':>8} {'ms/query':>9}")
+    for mode, snapshot in snapshots.items():
+        usage = snapshot.memory_bytes()
+        scale = 10_000 / args.cases
+
+        start = time.perf_counter()
+        hits = [top_k(snapshot, q, args.top_k) for q in queries]
+        elapsed_ms = (time.perf_counter() - start) * 1000 / args.queries
+
+        recall = np.mean([len(h & b) / args.top_k for h, b in zip(hits, baseline)])
+        print(
+            f"{mode:<8} {usage['vectors'] * scale / 2**20:>10.1f}MB "
+            f"{usage['metadata'] * scale / 2**20:>11.1f}MB "
+            f"{usage['total'] * scale / 2**20:>9.1f}MB "
+            f"{recall:>8.4f} {elapsed_ms:>9.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Import case study directories into the packed case store.
+
+Older versions wrote one directory per completed task
+(case_studies/MMDD_slug/{README.md, metadata.json, artifacts/}). This reads
+every metadata.json under --source into backend/case_studies.db; READMEs are
+not copied since they are rendered from the metadata on request. Tombstoned
+cases (deleted_at) stay tombstoned. Safe to run more than once.
+
+Run POST /api/ai/reindex afterwards to rebuild the search index from the store.
+
+Usage:
+    python backend/scripts/import_case_studies.py [--source DIR] [--store PATH]
+
+Defaults:
+    --source  backend/case_studies
+    --store   backend/case_studies.db
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.case_store import CASE_STORE_PATH, CaseStore  # noqa: E402
+from services.case_memory import CASE_STUDIES_DIR  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import case study directories into the case store")
+    parser.add_argument("--source", default=str(CASE_STUDIES_DIR), help="Directory of case study folders")
+    parser.add_argument("--store", default=str(CASE_STORE_PATH), help="Path to the case store database")
+    args = parser.parse_args()
+
+    source = Path(args.source)
+    if not source.is_dir():
+        print(f"No case study directory at {source}")
+        sys.exit(1)
+
+    store = CaseStore(Path(args.store))
+    imported = store.import_directory(source)
+    print(f"Imported {imported} case studies into {args.store} ({store.count()} live)")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
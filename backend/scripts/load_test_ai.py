@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Load test the AI assist path against the fake Gemini backend.
+
+Creates a set of tasks, then fires --requests AI assist calls at up to
+--concurrency at a time and reports throughput, p50/p95/p99 latency,
+status codes, and how many answers were generated vs fell back, followed
+by the server's /api/ai/usage counters (scheduler queue, deadlines,
+circuit breaker).
+
+By default the app runs in-process against a throwaway database with
+GEMINI_TRANSPORT=fake, so nothing is spent and no server is needed; the
+GEMINI_FAKE_* and GEMINI_* variables in the environment shape the backend
+(latency distribution, error/hang rates, blocking mode, timeouts). With
+--url the load goes to a running server instead, which should itself be
+started with GEMINI_TRANSPORT=fake.
+
+Usage:
+    GEMINI_FAKE_LATENCY=lognormal:600,0.5 GEMINI_FAKE_ERROR_RATE=0.05 \\
+        python backend/scripts/load_test_ai.py [--endpoint assist|stream|batch]
+        [--concurrency C] [--requests N] [--tasks T] [--url URL]
+
+Defaults:
+    --endpoint     assist
+    --concurrency  32
+    --requests     200
+    --tasks        20
+"""
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TITLES = [
+    "Payments gateway timeout after deploy",
+    "Database migration locks orders table",
+    "Frontend build fails on node upgrade",
+    "Flaky integration test in checkout service",
+    "Rotate expired TLS certificate on API gateway",
+]
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+async def app_client():
+    """In-process client for the app, on a fresh database and the fake backend."""
+    db_dir = tempfile.mkdtemp(prefix="lotus-load-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_dir}/tasks.db"
+    os.environ["GEMINI_TRANSPORT"] = "fake"
+    os.environ.setdefault("GEMINI_CACHE_TTL", "0")  # measure the backend, not the cache
+    os.environ.setdefault("GEMINI_USAGE_FLUSH_INTERVAL", "0")
+
+    from main import app  # noqa: E402
+    from db.database import init_db  # noqa: E402
+    await init_db()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://load", timeout=120)
+
+
+async def call(client, endpoint: str, task_ids: list, i: int):
+    """One request; returns (status, model names answered)."""
+    if endpoint == "batch":
+        batch = [task_ids[(i + k) % len(task_ids)] for k in range(min(8, len(task_ids)))]
+        resp = await client.post("/api/ai/assist/batch", json={"task_ids": batch})
+        models = [r["model"] for r in resp.json()["results"]] if resp.status_code == 200 else []
+        return resp.status_code, models
+
+    task_id = task_ids[i % len(task_ids)]
+    # A distinct prompt per request, so singleflight does not merge them
+    body = {"task_id": task_id, "prompt": f"Next step? (request {i})"}
+    if endpoint == "stream":
+        async with client.stream("POST", "/api/ai/assist/stream", json=body) as resp:
+            model = None
+            event = None
+            async for line in resp.aiter_lines():
+                if line.startswith("event: "):
+                    event = line[7:]
+                elif line.startswith("data: ") and event == "metadata":
+                    model = json.loads(line[6:])["model"]
+            return resp.status_code, [model] if model else []
+
+    resp = await client.post("/api/ai/assist", json=body)
+    return resp.status_code, [resp.json()["model"]] if resp.status_code == 200 else []
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load test AI assist against the fake Gemini backend")
+    parser.add_argument("--endpoint", choices=["assist", "stream", "batch"], default="assist")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=20)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    args = parser.parse_args()
+
+    client = (
+        httpx.AsyncClient(base_url=args.url, timeout=120) if args.url else await app_client()
+    )
+    async with client:
+        task_ids = []
+        for i in range(args.tasks):
+            resp = await client.post("/api/tasks", json={
+                "title": f"{TITLES[i % len(TITLES)]} #{i}",
+                "description": "Investigate, fix, and write up what happened.",
+            })
+            task_ids.append(resp.json()["id"])
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+        latencies, statuses, models = [], collections.Counter(), collections.Counter()
+
+        async def worker(i):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    status, answered = await call(client, args.endpoint, task_ids, i)
+                except Exception as e:
+                    status, answered = type(e).__name__, []
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[status] += 1
+                models.update(answered)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(i) for i in range(args.requests)))
+        elapsed = time.perf_counter() - started
+        usage = (await client.get("/api/ai/usage")).json()
+
+    print(f"{args.endpoint}: {args.requests} requests, concurrency {args.concurrency}, {args.tasks} tasks\n")
+    print(f"throughput  {args.requests / elapsed:8.1f} req/s")
+    for q in (0.50, 0.95, 0.99):
+        print(f"p{int(q * 100):<10} {percentile(latencies, q):8.1f} ms")
+    print(f"\nstatus      {dict(statuses)}")
+    print(f"answers     {dict(models)}")
+    print("\nscheduler   " + json.dumps(usage.get("scheduler", {})))
+    print("deadlines   " + json.dumps(usage.get("deadlines", {})))
+    print("breaker     " + json.dumps(usage.get("circuit_breaker", {})))
+    if "fake_backend" in usage:
+        print("fake        " + json.dumps(usage["fake_backend"]))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,67 +6,208 @@ to provide contextual AI assistance for tasks.
 
 Flow:
   1. Build search query from task title + description
-  2. Search past case studies via semantic_rag
-  3. Build prompt with task context + similar cases
+  2. Search past case studies via semantic_rag (hybrid dense + BM25)
+  3. Build prompt with task context + similar cases (token-budgeted, see
+     case_context.py)
   4. Call Gemini for a response
-  5. Return response + metadata
+  5. Return response + metadata (or stream it: stream_assist_with_task)
+
+batch_assist_with_tasks answers many tasks (e.g. a triage session) with
+few Gemini calls: tasks are packed into structured-output prompts under
+AI_BATCH_TOKEN_BUDGET, identical searches run once, and past cases
+matched by several tasks in a batch appear in its prompt only once.
+
+Retrieval (steps 1-2) runs on a small dedicated thread pool under a deadline
+(RAG_SEARCH_TIMEOUT), so query encoding and the index scan never block the
+event loop. A search that misses the deadline is abandoned (it stops before
+the index scan if it has not reached it) and the assist goes ahead without
+case context. Abandoned searches still count against the pool size until
+they finish; once that many are in flight, new searches are shed at once
+rather than queueing behind them.
 
 Graceful fallback: if Gemini fails, returns similar cases without AI text.
 """
 
+import os
+import asyncio
 import logging
-from typing import Optional
+import threading
+import concurrent.futures
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
 
 logger = logging.getLogger(__name__)
 
+SEARCH_WORKERS = int(os.getenv("RAG_SEARCH_WORKERS", "4"))
+# Dedicated pool for retrieval so slow searches cannot starve other
+# to_thread work (case study writes, compaction) in the default executor
+_search_pool = concurrent.futures.ThreadPoolExecutor(
+    max_workers=SEARCH_WORKERS,
+    thread_name_prefix="rag-search",
+)
+# Searches that overran their deadline and still hold a pool thread (event loop only)
+_searches_abandoned = 0
 
-async def assist_with_task(task_data: dict, prompt: Optional[str] = None) -> dict:
-    """Get AI assistance for a task using case memory context.
+RETRIEVAL_OK = "ok"
+RETRIEVAL_TIMEOUT = "timeout"
+RETRIEVAL_ERROR = "error"
+# Shed without searching: every pool thread is held by an abandoned search
+RETRIEVAL_BUSY = "busy"
 
-    Args:
-        task_data: Dict with keys: id, title, status, description, notes,
-                   assignee, value_stream
-        prompt: Optional custom prompt from the user
+DEFAULT_BATCH_TOKEN_BUDGET = 6000
+DEFAULT_BATCH_MAX_TASKS = 8
+# Tokens each task's description and notes may take in a batch prompt
+BATCH_TASK_FIELD_TOKENS = 150
+# Output tokens allowed per task of a batch (advice of at most 120 words,
+# plus its JSON entry) and for the enclosing JSON
+BATCH_ADVICE_TOKENS = 256
+BATCH_OUTPUT_OVERHEAD_TOKENS = 64
+
+
+def _search_timeout() -> float:
+    return float(os.getenv("RAG_SEARCH_TIMEOUT", "2.0"))
+
+
+def _search_backends():
+    """The RAG service and embedding batcher (either may load on first use). Blocking."""
+    from services.embedding_worker import get_embedding_batcher
+    from services.semantic_rag import get_rag_service
+    return get_rag_service(), get_embedding_batcher()
+
+
+def _search_cases(
+    search_query: str,
+    filters: Optional[Dict[str, Any]],
+    query_embedding=None,
+    abandoned: Optional[threading.Event] = None,
+) -> List[Tuple[dict, float]]:
+    """Encode (unless given an embedding) and search. Blocking.
+
+    Returns nothing, without scanning the index, once `abandoned` is set.
+    """
+    if abandoned is not None and abandoned.is_set():
+        return []  # Timed out while queued for a pool thread
+    from services.semantic_rag import get_rag_service
+    rag = get_rag_service()
+    if query_embedding is None:
+        query_embedding = rag.encode_query(search_query)
+    if abandoned is not None and abandoned.is_set():
+        return []
+    # Hybrid (dense + BM25) ranking is precise enough for a small k
+    results = rag.search(
+        search_query, top_k=3, filters=filters, query_embedding=query_embedding
+    )
+    return [
+        (entry["metadata"], score)
+        for entry, score in results
+        # Meaningfully similar, or the best exact-term match (IDs, service names)
+        if score > 0.3 or entry.get("match", {}).get("lexical_rank") == 1
+    ]
+
+
+async def find_similar_cases(
+    search_query: str,
+    filters: Optional[Dict[str, Any]] = None,
+    timeout: Optional[float] = None,
+) -> Tuple[List[Tuple[dict, float]], str]:
+    """Search past case studies off the event loop, under a deadline.
+
+    Concurrent searches queue for the pool's threads within their deadline.
+    Only when every thread is held by a search that already overran its
+    deadline is the search skipped ("busy").
+
+    Returns:
+        (similar_cases, retrieval status: "ok", "timeout", "error" or
+        "busy"); unless "ok", similar_cases is empty
+    """
+    global _searches_abandoned
+    timeout = _search_timeout() if timeout is None else timeout
+    if _searches_abandoned >= SEARCH_WORKERS:
+        logger.warning("RAG search pool is held by timed-out searches, answering without case context")
+        return [], RETRIEVAL_BUSY
+
+    loop = asyncio.get_running_loop()
+    abandoned = threading.Event()
+
+    async def _retrieve():
+        rag, batcher = await loop.run_in_executor(_search_pool, _search_backends)
+        query_embedding = None
+        if batcher is not None:
+            # Cache hit, or a batched encode in the embedding worker
+            query_embedding = await rag.encode_query_async(search_query)
+        if abandoned.is_set():
+            return []
+        return await loop.run_in_executor(
+            _search_pool, _search_cases, search_query, filters, query_embedding, abandoned
+        )
+
+    def _finished(task: asyncio.Task):
+        global _searches_abandoned
+        if abandoned.is_set():
+            _searches_abandoned -= 1
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case the caller has gone
+
+    task = asyncio.ensure_future(_retrieve())
+    task.add_done_callback(_finished)
+    try:
+        # Shielded: an abandoned search counts against the pool until its work ends
+        return await asyncio.wait_for(asyncio.shield(task), timeout=timeout), RETRIEVAL_OK
+    except asyncio.TimeoutError:
+        logger.warning(f"RAG search exceeded {timeout}s, answering without case context")
+        return [], RETRIEVAL_TIMEOUT
+    except Exception as e:
+        logger.warning(f"RAG search failed: {e}")
+        return [], RETRIEVAL_ERROR
+    finally:
+        if not task.done():
+            abandoned.set()
+            _searches_abandoned += 1
+
+
+def _search_params(
+    task_data: dict, scope_to_value_stream: bool
+) -> Tuple[str, Optional[Dict[str, Any]]]:
+    """Search query (title + description) and filters for a task."""
+    search_query = f"{task_data.get('title', '')} {task_data.get('description') or ''}".strip()
+    filters = None
+    if scope_to_value_stream and task_data.get("value_stream"):
+        filters = {"value_stream": task_data["value_stream"]}
+    return search_query, filters
+
+
+async def _prepare_assist(
+    task_data: dict,
+    prompt: Optional[str],
+    scope_to_value_stream: bool,
+) -> Tuple[str, List[Tuple[dict, float]], Dict[str, Any]]:
+    """Retrieve similar cases and build the Gemini prompt.
 
     Returns:
-        {"response": str, "similar_cases": int, "model": str}
+        (prompt, similar cases used in it, response metadata)
     """
     title = task_data.get("title", "")
     description = task_data.get("description") or ""
     notes = task_data.get("notes") or ""
     status = task_data.get("status", "")
 
-    # Build search query from task content
-    search_query = f"{title} {description}".strip()
+    search_query, filters = _search_params(task_data, scope_to_value_stream)
 
     # Search for similar past case studies
-    similar_cases = []
-    try:
-        from services.semantic_rag import get_rag_service
-        rag = get_rag_service()
-        results = rag.search(search_query, top_k=5)
-        similar_cases = [
-            (entry["metadata"], score)
-            for entry, score in results
-            if score > 0.3  # Only include meaningfully similar cases
-        ]
-    except Exception as e:
-        logger.warning(f"RAG search failed: {e}")
+    similar_cases, retrieval = await find_similar_cases(search_query, filters)
 
-    # Build context from similar cases
-    case_context = ""
-    if similar_cases:
-        case_context = "\n\n## Similar Past Tasks\n"
-        for i, (meta, score) in enumerate(similar_cases, 1):
-            case_context += f"\n### {i}. {meta.get('title', 'Untitled')} (similarity: {score:.2f})\n"
-            if meta.get("description"):
-                case_context += f"Description: {meta['description']}\n"
-            if meta.get("notes"):
-                case_context += f"Notes: {meta['notes']}\n"
-            if meta.get("assignee"):
-                case_context += f"Assignee: {meta['assignee']}\n"
-            if meta.get("completed_at"):
-                case_context += f"Completed: {meta['completed_at']}\n"
+    # Build context from similar cases within the token budget
+    from services.case_context import build_case_context
+    context = build_case_context(similar_cases, search_query)
+    similar_cases = context.cases
+    case_context = context.text
+    metadata = {
+        "similar_cases": len(similar_cases),
+        "retrieval": retrieval,
+        "context_tokens": context.tokens,
+        "context_tokens_saved": context.saved_tokens,
+    }
 
     # Build the Gemini prompt
     user_prompt = prompt or "Help me work on this task effectively."
@@ -86,22 +227,11 @@ Provide concise, actionable advice. If similar past tasks are provided above,
 reference relevant patterns or lessons learned from them. Keep your response
 focused and practical (2-4 paragraphs max)."""
 
-    # Try Gemini generation
-    try:
-        from services.gemini_client import get_gemini_client
-        client = get_gemini_client()
+    return full_prompt, similar_cases, metadata
 
-        if client.available:
-            response_text = await client.generate(full_prompt, temperature=0.4, max_tokens=1024)
-            return {
-                "response": response_text,
-                "similar_cases": len(similar_cases),
-                "model": client.model_name,
-            }
-    except Exception as e:
-        logger.error(f"Gemini generation failed: {e}")
 
-    # Fallback: return case summary without AI generation
+def _fallback_response(similar_cases: List[Tuple[dict, float]]) -> str:
+    """Case summary used when AI generation is unavailable."""
     if similar_cases:
         fallback = f"Found {len(similar_cases)} similar past task(s):\n\n"
         for meta, score in similar_cases:
@@ -115,9 +245,341 @@ focused and practical (2-4 paragraphs max)."""
             "Complete more tasks to build up the case memory, or configure "
             "a GOOGLE_API_KEY for AI-powered assistance."
         )
+    return fallback
+
 
+def assist_task_data(task) -> dict:
+    """Task fields used for AI assist (plus updated_at, which tags prefetched answers)."""
     return {
-        "response": fallback,
-        "similar_cases": len(similar_cases),
-        "model": "fallback",
+        "id": task.id,
+        "title": task.title,
+        "status": task.status,
+        "description": task.description,
+        "notes": task.notes,
+        "assignee": task.assignee,
+        "value_stream": task.value_stream,
+        "updated_at": task.updated_at,
     }
+
+
+async def assist_with_task(
+    task_data: dict,
+    prompt: Optional[str] = None,
+    scope_to_value_stream: bool = False,
+    tier: Optional[str] = None,
+    priority: Optional[int] = None,
+    latency_slo_ms: Optional[float] = None,
+) -> dict:
+    """Get AI assistance for a task using case memory context.
+
+    Args:
+        task_data: Dict with keys: id, title, status, description, notes,
+                   assignee, value_stream
+        prompt: Optional custom prompt from the user
+        scope_to_value_stream: Only use past cases from the task's own
+                               value stream (ignored if the task has none)
+        tier: Gemini model tier (light, standard, heavy); routed by prompt
+              size if omitted
+        priority: Gemini scheduler priority (default PRIORITY_INTERACTIVE)
+        latency_slo_ms: Target Gemini latency; picks the most capable model
+                        meeting it (ignored if tier is given)
+
+    Returns:
+        {"response": str, "similar_cases": int, "model": str, "retrieval": str,
+         "context_tokens": int, "context_tokens_saved": int}
+
+    Raises:
+        GeminiOverloaded: If the Gemini scheduler queue is full
+    """
+    full_prompt, similar_cases, metadata = await _prepare_assist(
+        task_data, prompt, scope_to_value_stream
+    )
+
+    # Try Gemini generation
+    from services.gemini_client import PRIORITY_INTERACTIVE, GeminiOverloaded, get_gemini_client
+    try:
+        client = get_gemini_client()
+
+        if client.available:
+            model = client.route(full_prompt, tier=tier, latency_slo_ms=latency_slo_ms)
+            response_text = await client.generate(
+                full_prompt,
+                temperature=0.4,
+                max_tokens=1024,
+                model=model,
+                priority=PRIORITY_INTERACTIVE if priority is None else priority,
+            )
+            return {"response": response_text, "model": model, **metadata}
+    except GeminiOverloaded:
+        raise  # Shed load (the route answers 503) rather than degrade silently
+    except Exception as e:
+        logger.error(f"Gemini generation failed: {e}")
+
+    # Fallback: return case summary without AI generation
+    return {"response": _fallback_response(similar_cases), "model": "fallback", **metadata}
+
+
+async def stream_assist_with_task(
+    task_data: dict,
+    prompt: Optional[str] = None,
+    scope_to_value_stream: bool = False,
+    tier: Optional[str] = None,
+    latency_slo_ms: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """Like assist_with_task, but yields the response as it is generated.
+
+    Yields ("chunk", {"text": str}) events, then one ("metadata", {...})
+    event with the same fields as assist_with_task minus "response" (plus
+    "error" if generation broke off after the first chunk). Without Gemini
+    the fallback text arrives as a single chunk.
+
+    Closing the generator (e.g. the client disconnected) stops the Gemini
+    stream.
+
+    Raises:
+        GeminiOverloaded: If the Gemini scheduler queue is full (before any
+                          event is yielded)
+    """
+    full_prompt, similar_cases, metadata = await _prepare_assist(
+        task_data, prompt, scope_to_value_stream
+    )
+
+    model = None
+    from services.gemini_client import GeminiOverloaded, get_gemini_client
+    try:
+        client = get_gemini_client()
+
+        if client.available:
+            routed = client.route(full_prompt, tier=tier, latency_slo_ms=latency_slo_ms)
+            async for text in client.generate_stream(
+                full_prompt, temperature=0.4, max_tokens=1024, model=routed
+            ):
+                model = routed
+                yield "chunk", {"text": text}
+            model = routed
+    except GeminiOverloaded:
+        raise  # Shed load (the route answers 503) rather than degrade silently
+    except Exception as e:
+        logger.error(f"Gemini streaming failed: {e}")
+        if model is not None:
+            # Part of the answer was already sent; say it is incomplete
+            metadata["error"] = "generation interrupted"
+
+    if model is None:
+        model = "fallback"
+        yield "chunk", {"text": _fallback_response(similar_cases)}
+
+    yield "metadata", {"model": model, **metadata}
+
+
+# ============= Batch assist =============
+
+class TaskAdvice(BaseModel):
+    """Advice for one task of a batch, by its label in the prompt (T1, T2, ...)."""
+    task: str
+    advice: str
+
+
+class BatchAdvice(BaseModel):
+    """Structured output of a batch assist call."""
+    tasks: List[TaskAdvice]
+
+
+_BATCH_INSTRUCTIONS = """You are Lotus, an AI assistant for a task management board.
+A user is triaging the tasks below and wants help with each of them.
+{tasks}{cases}
+
+**User's request (for every task):** {request}
+
+For each task, give concise, actionable advice (at most 120 words). Where a
+task lists related past tasks, reference relevant patterns or lessons from
+them. Respond as JSON: {{"tasks": [{{"task": "T1", "advice": "..."}}, ...]}}
+with one entry per task label above."""
+
+
+def _batch_token_budget() -> int:
+    return int(os.getenv("AI_BATCH_TOKEN_BUDGET", str(DEFAULT_BATCH_TOKEN_BUDGET)))
+
+
+def _batch_max_tasks() -> int:
+    return max(int(os.getenv("AI_BATCH_MAX_TASKS", str(DEFAULT_BATCH_MAX_TASKS))), 1)
+
+
+def _case_key(meta: dict) -> str:
+    return meta.get("slug") or meta.get("task_id") or meta.get("title", "")
+
+
+def _batch_task_block(label: str, task_data: dict) -> str:
+    """A task's section of the batch prompt, long fields condensed."""
+    from services.bm25 import tokenize
+    from services.case_context import condense
+
+    query_terms = set(tokenize(_search_params(task_data, False)[0]))
+    block = f"\n### {label}: {task_data.get('title', '')}\nStatus: {task_data.get('status', '')}\n"
+    for label_text, key in (("Description", "description"), ("Notes", "notes")):
+        if task_data.get(key):
+            block += f"{label_text}: {condense(task_data[key], query_terms, BATCH_TASK_FIELD_TOKENS)}\n"
+    return block
+
+
+def pack_batches(block_tokens: List[int], budget: int, max_tasks: int) -> List[List[int]]:
+    """Group tasks, in order, so each batch's task sections fit the budget.
+
+    Args:
+        block_tokens: Estimated tokens of each task's section
+        budget: Tokens available for task sections per batch
+        max_tasks: Most tasks per batch (bounds the output length)
+
+    Returns:
+        Lists of task indexes; a task larger than the budget gets a batch
+        of its own
+    """
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, tokens in enumerate(block_tokens):
+        if current and (used + tokens > budget or len(current) >= max_tasks):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def _assist_batch(
+    tasks_data: List[dict],
+    searches: List[Tuple[List[Tuple[dict, float]], str]],
+    prompt: Optional[str],
+) -> List[dict]:
+    """One Gemini call for a batch of tasks; per-task results in input order."""
+    from services.case_context import build_case_context, context_token_budget
+    from services.gemini_client import GeminiOverloaded, get_gemini_client
+
+    # Past cases shared between tasks go in once, at their best score
+    shared: Dict[str, Tuple[dict, float]] = {}
+    for cases, _ in searches:
+        for meta, score in cases:
+            key = _case_key(meta)
+            if key not in shared or score > shared[key][1]:
+                shared[key] = (meta, score)
+    batch_query = " ".join(_search_params(task, False)[0] for task in tasks_data)
+    context = build_case_context(list(shared.values()), batch_query, budget=context_token_budget())
+    numbers = {_case_key(meta): i for i, (meta, _) in enumerate(context.cases, 1)}
+
+    task_sections = ""
+    related: List[List[int]] = []
+    for i, (task, (cases, _)) in enumerate(zip(tasks_data, searches)):
+        refs = sorted({numbers[_case_key(meta)] for meta, _ in cases if _case_key(meta) in numbers})
+        related.append(refs)
+        task_sections += _batch_task_block(f"T{i + 1}", task)
+        if refs:
+            task_sections += f"Related past tasks: {', '.join(map(str, refs))}\n"
+    full_prompt = _BATCH_INSTRUCTIONS.format(
+        tasks=task_sections,
+        cases=context.text,
+        request=prompt or "Help me work on this task effectively.",
+    )
+
+    advice: Dict[str, str] = {}
+    model = "fallback"
+    try:
+        client = get_gemini_client()
+        if client.available:
+            routed = client.route(full_prompt)
+            # Room for every task's advice: truncated JSON fails the whole batch
+            result = await client.generate_structured(
+                full_prompt,
+                BatchAdvice,
+                temperature=0.4,
+                max_tokens=BATCH_OUTPUT_OVERHEAD_TOKENS + BATCH_ADVICE_TOKENS * len(tasks_data),
+                timeout=client.timeout,
+                model=routed,
+            )
+            advice = {item.task.strip().upper(): item.advice.strip() for item in result.tasks}
+            model = routed
+    except GeminiOverloaded:
+        raise
+    except Exception as e:
+        logger.error(f"Gemini batch generation failed: {e}")
+
+    # Context tokens are shared by the batch; each task is charged its share
+    share, saved_share = context.tokens // len(tasks_data), context.saved_tokens // len(tasks_data)
+    results = []
+    for i, (task, (cases, retrieval)) in enumerate(zip(tasks_data, searches)):
+        text = advice.get(f"T{i + 1}")
+        used_cases = [case for case in context.cases if numbers[_case_key(case[0])] in related[i]]
+        results.append({
+            "task_id": task["id"],
+            "response": text or _fallback_response(used_cases),
+            "model": model if text else "fallback",
+            "similar_cases": len(related[i]),
+            "retrieval": retrieval,
+            "context_tokens": share,
+            "context_tokens_saved": saved_share,
+        })
+    return results
+
+
+async def batch_assist_with_tasks(
+    tasks_data: List[dict],
+    prompt: Optional[str] = None,
+    scope_to_value_stream: bool = False,
+) -> Tuple[List[dict], int]:
+    """Get AI assistance for several tasks with as few Gemini calls as fit.
+
+    Tasks are packed in order into batches whose prompt stays within
+    AI_BATCH_TOKEN_BUDGET (at most AI_BATCH_MAX_TASKS tasks each); each
+    batch is one generate_structured call returning advice per task.
+    Retrieval runs once per distinct search, RAG_SEARCH_WORKERS at a
+    time. A task the model skipped, or a batch whose call failed, gets the
+    case-match fallback.
+
+    Args:
+        tasks_data: Task dicts as for assist_with_task
+        prompt: Optional custom prompt, applied to every task
+        scope_to_value_stream: Only use past cases from each task's own
+                               value stream
+
+    Returns:
+        (per-task results in input order, each with "task_id" and the
+        assist_with_task fields; number of batches)
+
+    Raises:
+        GeminiOverloaded: If the Gemini scheduler queue is full
+    """
+    from services.case_context import context_token_budget, estimate_tokens
+
+    # Shared retrieval: identical searches (e.g. duplicate titles) run once
+    params = [_search_params(task, scope_to_value_stream) for task in tasks_data]
+    keys = [(query, tuple(sorted((filters or {}).items()))) for query, filters in params]
+    distinct = dict(zip(keys, params))
+    # At most one search per pool thread at a time, so each one's deadline
+    # starts when it can run rather than while queued behind the others
+    slots = asyncio.Semaphore(SEARCH_WORKERS)
+
+    async def _search(query: str, filters: Optional[Dict[str, Any]]):
+        async with slots:
+            return await find_similar_cases(query, filters)
+
+    found = dict(zip(
+        distinct,
+        await asyncio.gather(*(_search(query, filters) for query, filters in distinct.values())),
+    ))
+    searches = [found[key] for key in keys]
+
+    fixed_tokens = estimate_tokens(_BATCH_INSTRUCTIONS + (prompt or "")) + context_token_budget()
+    batches = pack_batches(
+        # Labels are renumbered per batch; + 8 for the related-cases line
+        [estimate_tokens(_batch_task_block("T00", task)) + 8 for task in tasks_data],
+        budget=max(_batch_token_budget() - fixed_tokens, 0),
+        max_tasks=_batch_max_tasks(),
+    )
+
+    batch_results = await asyncio.gather(*(
+        _assist_batch([tasks_data[i] for i in batch], [searches[i] for i in batch], prompt)
+        for batch in batches
+    ))
+    return [result for results in batch_results for result in results], len(batches)
+
@@ -0,0 +1,178 @@
+"""
+Assist Prefetcher — Intelligence Flywheel
+
+Opt-in (ASSIST_PREFETCH=true) background computation of the default AI
+assist answer — no custom prompt, cases from all value streams — for tasks
+that are created or moved to "doing", so opening Ask Lotus on an active
+task does not wait for retrieval and generation.
+
+Answers are stored in the assist_suggestions table, tagged with the task's
+updated_at. ai_assist serves a stored answer only while the task is
+unchanged since; otherwise it generates as usual. Prefetches call Gemini at
+background priority, behind interactive requests, at most
+ASSIST_PREFETCH_CONCURRENCY at a time. Fallback answers (Gemini
+unavailable) and answers generated without case context (retrieval timed
+out or failed) are not stored, so a later request can do better.
+
+Usage:
+    from services.assist_prefetcher import get_assist_prefetcher, get_fresh_suggestion
+    get_assist_prefetcher().schedule(task_id)      # after committing the task
+    stored = await get_fresh_suggestion(db, task_id, task_updated_at)
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import delete
+
+from db.database import AsyncSessionLocal
+from db.models import AssistSuggestion, Task
+
+logger = logging.getLogger(__name__)
+
+
+async def get_fresh_suggestion(db, task_id: str, task_updated_at: datetime) -> Optional[Dict[str, Any]]:
+    """Stored assist answer for a task, or None if absent or the task changed since."""
+    suggestion = await db.get(AssistSuggestion, task_id)
+    if suggestion is None or suggestion.task_updated_at != task_updated_at:
+        return None
+    return dict(suggestion.response)
+
+
+async def delete_suggestion(db, task_id: str):
+    """Remove a task's stored answer (in the caller's transaction)."""
+    await db.execute(delete(AssistSuggestion).where(AssistSuggestion.task_id == task_id))
+
+
+class AssistPrefetcher:
+    """Computes and stores default assist answers in background tasks."""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.enabled = os.getenv("ASSIST_PREFETCH", "false").lower() == "true"
+        self.max_concurrency = int(os.getenv("ASSIST_PREFETCH_CONCURRENCY", "2"))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # Scheduled again while running: run once more when done
+        self._rerun: Set[str] = set()
+        self._stopping = False
+        self.prefetched = 0
+        self.skipped = 0
+        self.failed = 0
+        # Generated but not stored (fallback, or no case context)
+        self.discarded = 0
+        # Default assist requests answered from / not found in the store
+        self.served = 0
+        self.missed = 0
+
+    def schedule(self, task_id: str):
+        """Prefetch the task's answer in the background (no-op unless enabled)."""
+        if not self.enabled or self._stopping:
+            return
+        if task_id in self._tasks:
+            self._rerun.add(task_id)
+            return
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        task = asyncio.get_running_loop().create_task(self._run(task_id))
+        self._tasks[task_id] = task
+        task.add_done_callback(lambda _: self._finished(task_id))
+
+    def _finished(self, task_id: str):
+        self._tasks.pop(task_id, None)
+        if task_id in self._rerun:
+            self._rerun.discard(task_id)
+            self.schedule(task_id)
+
+    async def _run(self, task_id: str):
+        async with self._semaphore:
+            try:
+                await self.prefetch(task_id)
+            except Exception as e:
+                self.failed += 1
+                logger.warning(f"Assist prefetch for task {task_id} failed: {e}")
+
+    async def prefetch(self, task_id: str) -> bool:
+        """Compute and store the default answer unless a fresh one exists.
+
+        Returns:
+            True if an answer was stored
+        """
+        from services.ai_service import assist_task_data, assist_with_task
+        from services.gemini_client import PRIORITY_BACKGROUND
+
+        async with self.session_factory() as session:
+            task = await session.get(Task, task_id)
+            if task is None or task.status == "done":
+                return False
+            if await get_fresh_suggestion(session, task_id, task.updated_at) is not None:
+                self.skipped += 1
+                return False
+            task_data = assist_task_data(task)
+
+        result = await assist_with_task(task_data, priority=PRIORITY_BACKGROUND)
+        if result["model"] == "fallback" or result["retrieval"] != "ok":
+            self.discarded += 1
+            return False
+
+        # Tagged with the updated_at read before generating: if the task
+        # changed meanwhile, the answer is stale and never served
+        async with self.session_factory() as session:
+            await session.merge(AssistSuggestion(
+                task_id=task_id,
+                task_updated_at=task_data["updated_at"],
+                response=result,
+                created_at=datetime.utcnow(),
+            ))
+            await session.commit()
+        self.prefetched += 1
+        logger.info(f"Prefetched AI assist for task {task_id} ({result['model']})")
+        return True
+
+    async def join(self):
+        """Wait until no prefetch is scheduled (tests, scripts)."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks.values()), return_exceptions=True)
+
+    async def stop(self):
+        """Cancel pending prefetches (shutdown)."""
+        self._stopping = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def record_lookup(self, served: bool):
+        """Count a default assist request that was (or was not) served from the store."""
+        if served:
+            self.served += 1
+        else:
+            self.missed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.served + self.missed
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._tasks),
+            "prefetched": self.prefetched,
+            "skipped": self.skipped,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "served": self.served,
+            "missed": self.missed,
+            "hit_rate": round(self.served / lookups, 4) if lookups else 0.0,
+        }
+
+
+# Singleton
+_prefetcher: Optional[AssistPrefetcher] = None
+
+
+def get_assist_prefetcher() -> AssistPrefetcher:
+    global _prefetcher
+    if _prefetcher is None:
+        _prefetcher = AssistPrefetcher()
+    return _prefetcher
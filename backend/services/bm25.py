@@ -0,0 +1,168 @@
+"""
+BM25 Lexical Index — Intelligence Flywheel
+
+Okapi BM25 over case study indexed_text, kept next to the vector index so
+exact identifiers (service names, ticket numbers) that dense embeddings blur
+still rank. Like IndexSnapshot, a LexicalIndex is immutable: with_document
+returns a new index and only re-allocates the postings of the added terms.
+
+Tokens are lower-cased word runs; compound identifiers such as
+"payments-gateway" or "OPS-1432" are kept whole *and* split into parts, so
+both the exact identifier and its pieces match.
+
+Usage:
+    from services.bm25 import LexicalIndex, tokenize
+    index = LexicalIndex.from_documents([tokenize(t) for t in texts])
+    rows, scores = index.scores(tokenize("OPS-1432 timeout"))
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# BM25 parameters (common defaults)
+K1 = 1.2
+B = 0.75
+
+_COMPOUND_RE = re.compile(r"\w+(?:[-./:#]\w+)*", re.UNICODE)
+_SPLIT_RE = re.compile(r"[-./:#]")
+
+
+def tokenize(text: str) -> Dict[str, int]:
+    """Term frequencies for a text."""
+    terms: Counter = Counter()
+    for match in _COMPOUND_RE.findall(text.lower()):
+        terms[match] += 1
+        parts = _SPLIT_RE.split(match)
+        if len(parts) > 1:
+            terms.update(p for p in parts if p)
+    return dict(terms)
+
+
+class LexicalIndex:
+    """Immutable BM25 index over row-aligned documents."""
+
+    __slots__ = ("postings", "doc_lengths", "total_length", "_documents")
+
+    def __init__(
+        self,
+        postings: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        doc_lengths: np.ndarray,
+    ):
+        # term -> (row ids ascending, term frequencies)
+        self.postings = postings
+        self.doc_lengths = doc_lengths
+        self.doc_lengths.flags.writeable = False
+        self.total_length = float(doc_lengths.sum()) if len(doc_lengths) else 0.0
+        # Per-row term frequencies, inverted from the postings on first use
+        self._documents: Optional[List[Dict[str, int]]] = None
+
+    @classmethod
+    def empty(cls) -> "LexicalIndex":
+        return cls({}, np.zeros(0, dtype=np.float32))
+
+    @classmethod
+    def from_documents(cls, documents: Sequence[Dict[str, int]]) -> "LexicalIndex":
+        """Build from per-row term frequency dicts (see tokenize)."""
+        rows: Dict[str, List[int]] = {}
+        tfs: Dict[str, List[int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for row, terms in enumerate(documents):
+            lengths[row] = sum(terms.values())
+            for term, tf in terms.items():
+                rows.setdefault(term, []).append(row)
+                tfs.setdefault(term, []).append(tf)
+        postings = {
+            term: (_frozen(np.asarray(rows[term], dtype=np.int64)), _frozen(np.asarray(tfs[term], dtype=np.float32)))
+            for term in rows
+        }
+        index = cls(postings, lengths)
+        index._documents = list(documents)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def with_document(self, terms: Dict[str, int]) -> "LexicalIndex":
+        """Return a new index with one document appended as the next row."""
+        row = len(self.doc_lengths)
+        postings = dict(self.postings)  # shallow copy; untouched terms are shared
+        for term, tf in terms.items():
+            old_rows, old_tfs = postings.get(term, (_EMPTY_ROWS, _EMPTY_TFS))
+            postings[term] = (
+                _frozen(np.append(old_rows, row)),
+                _frozen(np.append(old_tfs, np.float32(tf))),
+            )
+        lengths = np.append(self.doc_lengths, np.float32(sum(terms.values())))
+        index = LexicalIndex(postings, lengths)
+        if self._documents is not None:
+            index._documents = self._documents + [dict(terms)]
+        return index
+
+    def document_terms(self) -> List[Dict[str, int]]:
+        """Per-row term frequencies (for saving and compaction).
+
+        Inverted from the postings once and cached; callers must not modify
+        the returned dicts.
+        """
+        if self._documents is None:
+            documents: List[Dict[str, int]] = [{} for _ in range(len(self.doc_lengths))]
+            for term, (rows, tfs) in self.postings.items():
+                for row, tf in zip(rows.tolist(), tfs.tolist()):
+                    documents[row][term] = int(tf)
+            self._documents = documents
+        return self._documents
+
+    def scores(
+        self,
+        query_terms: Dict[str, int],
+        rows: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 scores for rows matching at least one query term.
+
+        Args:
+            query_terms: Output of tokenize(query)
+            rows: Optional sorted candidate rows to restrict scoring to
+
+        Returns:
+            (row ids, scores), both unsorted; only rows with score > 0
+        """
+        n_docs = len(self.doc_lengths)
+        if n_docs == 0 or not query_terms:
+            return _EMPTY_ROWS, _EMPTY_TFS
+
+        avg_length = self.total_length / n_docs or 1.0
+        # Accumulate into one slot per candidate (or per row when unfiltered)
+        totals = np.zeros(n_docs if rows is None else len(rows), dtype=np.float32)
+        for term in query_terms:
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            term_rows, tfs = posting
+            idf = math.log(1.0 + (n_docs - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            slots = term_rows
+            if rows is not None:
+                # Both are sorted: keep the posting entries among the candidates
+                slots = np.searchsorted(rows, term_rows)
+                hit = slots < len(rows)
+                hit[hit] = rows[slots[hit]] == term_rows[hit]
+                slots, term_rows, tfs = slots[hit], term_rows[hit], tfs[hit]
+            norm = K1 * (1.0 - B + B * self.doc_lengths[term_rows] / avg_length)
+            totals[slots] += idf * tfs * (K1 + 1.0) / (tfs + norm)
+
+        matched = np.flatnonzero(totals > 0)
+        if rows is not None:
+            return rows[matched], totals[matched]
+        return matched, totals[matched]
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.flags.writeable = False
+    return array
+
+
+_EMPTY_ROWS = _frozen(np.zeros(0, dtype=np.int64))
+_EMPTY_TFS = _frozen(np.zeros(0, dtype=np.float32))
@@ -0,0 +1,198 @@
+"""
+Case Context Builder — Intelligence Flywheel
+
+Assembles the "Similar Past Tasks" section of the AI assist prompt under a
+token budget (AI_CONTEXT_TOKEN_BUDGET), instead of pasting every matched
+case's full description and notes:
+
+  - Cases are taken most-similar first; budget a case does not use rolls
+    over to the next one.
+  - Near-identical cases (recurring tasks, re-completions) are dropped so
+    they do not spend the budget twice.
+  - A description or notes field that does not fit its share keeps the
+    sentences that share the most terms with the query, in their original
+    order; a single over-long sentence is truncated at a word boundary.
+
+Tokens are estimated at 4 characters per token, the same estimate
+UsageStats falls back to when Gemini reports no token counts.
+
+Usage:
+    from services.case_context import build_case_context
+    context = build_case_context(similar_cases, query)
+    prompt += context.text
+"""
+
+import os
+import re
+from typing import List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from services.bm25 import tokenize
+
+DEFAULT_TOKEN_BUDGET = 800
+# Jaccard similarity of case terms above which a lower-ranked case is a duplicate
+DUPLICATE_THRESHOLD = 0.85
+# A field with a smaller share than this is left out rather than mangled
+MIN_FIELD_TOKENS = 12
+
+SECTION_HEADER = "\n\n## Similar Past Tasks\n"
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+class CaseContext(BaseModel):
+    """Prompt section for similar cases, plus what the budget cost and saved."""
+    text: str = ""
+    cases: List[Tuple[dict, float]] = []
+    deduplicated: int = 0
+    tokens: int = 0
+    full_tokens: int = 0
+
+    @property
+    def saved_tokens(self) -> int:
+        return max(self.full_tokens - self.tokens, 0)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def context_token_budget() -> int:
+    return int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", str(DEFAULT_TOKEN_BUDGET)))
+
+
+def _case_header(index: int, meta: dict, score: float) -> str:
+    return f"\n### {index}. {meta.get('title', 'Untitled')} (similarity: {score:.2f})\n"
+
+
+def _case_footer(meta: dict) -> str:
+    text = ""
+    if meta.get("assignee"):
+        text += f"Assignee: {meta['assignee']}\n"
+    if meta.get("completed_at"):
+        text += f"Completed: {meta['completed_at']}\n"
+    return text
+
+
+def _render_full(cases: List[Tuple[dict, float]]) -> str:
+    """The unbudgeted rendering (every field in full)."""
+    if not cases:
+        return ""
+    text = SECTION_HEADER
+    for i, (meta, score) in enumerate(cases, 1):
+        text += _case_header(i, meta, score)
+        if meta.get("description"):
+            text += f"Description: {meta['description']}\n"
+        if meta.get("notes"):
+            text += f"Notes: {meta['notes']}\n"
+        text += _case_footer(meta)
+    return text
+
+
+def _case_terms(meta: dict) -> Set[str]:
+    text = " ".join(meta.get(field) or "" for field in ("title", "description", "notes"))
+    return set(tokenize(text))
+
+
+def _deduplicate(cases: List[Tuple[dict, float]]) -> List[Tuple[dict, float]]:
+    kept: List[Tuple[dict, float]] = []
+    kept_terms: List[Set[str]] = []
+    for meta, score in cases:
+        terms = _case_terms(meta)
+        duplicate = any(
+            terms and other and len(terms & other) / len(terms | other) >= DUPLICATE_THRESHOLD
+            for other in kept_terms
+        )
+        if not duplicate:
+            kept.append((meta, score))
+            kept_terms.append(terms)
+    return kept
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    max_chars = max_tokens * 4 - 1
+    cut = text[:max_chars].rsplit(" ", 1)[0] if " " in text[:max_chars] else text[:max_chars]
+    return cut.rstrip(" ,;:") + "…"
+
+
+def condense(text: str, query_terms: Set[str], max_tokens: int) -> str:
+    """Fit text into max_tokens, keeping the sentences most relevant to the query."""
+    text = text.strip()
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda i: (-len(query_terms & set(tokenize(sentences[i]))), i),
+    )
+    chosen, seen, used = [], set(), 0
+    for i in ranked:
+        cost = estimate_tokens(sentences[i]) + 1
+        if sentences[i] not in seen and used + cost <= max_tokens:
+            chosen.append(i)
+            seen.add(sentences[i])
+            used += cost
+    if not chosen:
+        return _truncate(sentences[ranked[0]], max_tokens)
+    return " ".join(sentences[i] for i in sorted(chosen))
+
+
+def build_case_context(
+    similar_cases: List[Tuple[dict, float]],
+    query: str,
+    budget: Optional[int] = None,
+) -> CaseContext:
+    """Render similar cases for the prompt within a token budget.
+
+    Args:
+        similar_cases: (metadata, score) pairs from the search
+        query: The search query; sentences sharing its terms are kept first
+        budget: Token budget for the whole section (AI_CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        CaseContext with the prompt text, the cases that made it in, and
+        token counts for the budgeted and full renderings
+    """
+    budget = context_token_budget() if budget is None else budget
+    ordered = sorted(similar_cases, key=lambda case: case[1], reverse=True)
+    full_tokens = estimate_tokens(_render_full(ordered))
+    unique = _deduplicate(ordered)
+
+    query_terms = set(tokenize(query))
+    remaining = budget - estimate_tokens(SECTION_HEADER)
+    blocks: List[str] = []
+    included: List[Tuple[dict, float]] = []
+    for position, (meta, score) in enumerate(unique):
+        # Even share of what is left; unused budget rolls over to later cases
+        allowance = remaining // (len(unique) - position)
+        block = _case_header(len(included) + 1, meta, score)
+        footer = _case_footer(meta)
+        field_budget = allowance - estimate_tokens(block + footer)
+        if field_budget < 0:
+            continue
+
+        fields = [(label, meta.get(key)) for label, key in (("Description", "description"), ("Notes", "notes"))]
+        fields = [(label, value) for label, value in fields if value]
+        for n, (label, value) in enumerate(fields):
+            share = field_budget // (len(fields) - n) - estimate_tokens(f"{label}: \n")
+            if share < MIN_FIELD_TOKENS and estimate_tokens(value) > share:
+                continue
+            line = f"{label}: {condense(value, query_terms, share)}\n"
+            block += line
+            field_budget -= estimate_tokens(line)
+
+        block += footer
+        remaining -= estimate_tokens(block)
+        blocks.append(block)
+        included.append((meta, score))
+
+    text = SECTION_HEADER + "".join(blocks) if blocks else ""
+    return CaseContext(
+        text=text,
+        cases=included,
+        deduplicated=len(ordered) - len(unique),
+        tokens=estimate_tokens(text),
+        full_tokens=full_tokens,
+    )
@@ -2,28 +2,51 @@
 Case Memory Service — Intelligence Flywheel
 
 When a task is completed (status → "done"), this service archives it as a
-searchable case study on disk. Each case study has:
-
-  backend/case_studies/MMDD_task-slug/
-  ├── README.md       # Human-readable summary
-  ├── metadata.json   # Structured data for indexing
-  └── artifacts/      # Empty dir for future attachments
+searchable case study in the packed case store (services/case_store.py):
+one manifest row plus a JSON metadata document per case. The README is
+rendered on request (GET /api/cases/{slug}/readme) rather than stored.
 
 The slug is derived from the task title, date-prefixed for chronological order.
+Case studies are keyed by task id: completing a task again rewrites its
+existing case (the slug stays stable), and deleting the task tombstones the
+case study rather than removing it.
+
+CASE_STUDIES_DIR is where older versions wrote one directory per case study;
+scripts/import_case_studies.py moves those into the store.
 """
 
-import os
 import re
-import json
+import asyncio
 import logging
 from datetime import datetime
 from pathlib import Path
+from typing import List, Optional
+
+from services.case_store import CaseStore, get_case_store
 
 logger = logging.getLogger(__name__)
 
 CASE_STUDIES_DIR = Path(__file__).parent.parent / "case_studies"
 
 
+def _existing_slug(task_data: dict, store: CaseStore) -> Optional[str]:
+    """The task's current case study slug, if it has one."""
+    task_id = task_data.get("id")
+    slug = task_data.get("case_study_slug")
+    if slug and store.slug_owner(slug) == task_id:
+        return slug
+    return store.slug_for_task(task_id) if task_id else None
+
+
+def _new_slug(title: str, now: datetime, task_id: Optional[str], store: CaseStore) -> str:
+    """Date-prefixed slug for a new case, suffixed if another task already has it."""
+    base = f"{now.strftime('%m%d')}_{slugify(title or 'untitled')}"
+    slug, n = base, 2
+    while store.slug_owner(slug) not in (None, task_id):
+        slug, n = f"{base}-{n}", n + 1
+    return slug
+
+
 def slugify(text: str, max_length: int = 50) -> str:
     """Convert text to a filesystem-safe slug."""
     slug = text.lower().strip()
@@ -35,81 +58,51 @@ def slugify(text: str, max_length: int = 50) -> str:
 
 
 async def create_case_study(task_data: dict) -> dict:
-    """Create a case study directory from a completed task.
+    """Create a case study (see write_case_study) without blocking the event loop."""
+    return await asyncio.to_thread(write_case_study, task_data)
+
+
+def write_case_study(task_data: dict) -> dict:
+    """Store a case study for a completed task and index it.
+
+    Blocking (SQLite write and embedding); the flywheel worker runs it in a
+    thread. If the task already has a case study, it is rewritten in place
+    instead of creating a new one.
 
     Args:
         task_data: Dict with keys: id, title, description, notes, assignee,
-                   value_stream, start_date, due_date, created_at, comments
+                   value_stream, start_date, due_date, created_at, comments,
+                   case_study_slug (optional)
 
     Returns:
-        {"case_dir": str, "slug": str}
+        {"slug": str}
     """
+    store = get_case_store()
     now = datetime.utcnow()
-    date_prefix = now.strftime("%m%d")
-    title_slug = slugify(task_data.get("title", "untitled"))
-    slug = f"{date_prefix}_{title_slug}"
-
-    case_dir = CASE_STUDIES_DIR / slug
-    case_dir.mkdir(parents=True, exist_ok=True)
-    (case_dir / "artifacts").mkdir(exist_ok=True)
-
-    # Build README.md
     title = task_data.get("title", "Untitled Task")
+    slug = _existing_slug(task_data, store) or _new_slug(title, now, task_data.get("id"), store)
+
     description = task_data.get("description") or ""
     notes = task_data.get("notes") or ""
-    assignee = task_data.get("assignee") or "Unknown"
-    value_stream = task_data.get("value_stream") or "None"
-    start_date = task_data.get("start_date") or "N/A"
-    due_date = task_data.get("due_date") or "N/A"
-    created_at = task_data.get("created_at") or "N/A"
     comments = task_data.get("comments") or []
 
-    readme_lines = [
-        f"# {title}",
-        "",
-        f"**Assignee:** {assignee}",
-        f"**Value Stream:** {value_stream}",
-        f"**Created:** {created_at}",
-        f"**Started:** {start_date}",
-        f"**Due:** {due_date}",
-        f"**Completed:** {now.isoformat()}",
-        "",
-    ]
-
-    if description:
-        readme_lines += ["## Description", "", description, ""]
-
-    if notes:
-        readme_lines += ["## Notes", "", notes, ""]
-
-    if comments:
-        readme_lines += ["## Discussion", ""]
-        for c in comments:
-            readme_lines.append(f"- **{c.get('author', 'Unknown')}:** {c.get('text', '')}")
-        readme_lines.append("")
-
-    readme_path = case_dir / "README.md"
-    readme_path.write_text("\n".join(readme_lines), encoding="utf-8")
-
-    # Build metadata.json
     metadata = {
         "id": task_data.get("id"),
         "title": title,
         "slug": slug,
         "description": description,
         "notes": notes,
-        "assignee": assignee,
-        "value_stream": value_stream,
-        "start_date": start_date,
-        "due_date": due_date,
-        "created_at": created_at,
+        "assignee": task_data.get("assignee") or "Unknown",
+        "value_stream": task_data.get("value_stream") or "None",
+        "start_date": task_data.get("start_date") or "N/A",
+        "due_date": task_data.get("due_date") or "N/A",
+        "created_at": task_data.get("created_at") or "N/A",
         "completed_at": now.isoformat(),
+        "comments": [{"author": c.get("author"), "text": c.get("text")} for c in comments],
         "comment_count": len(comments),
         "indexed_text": f"{title} {description} {notes}".strip(),
     }
-
-    metadata_path = case_dir / "metadata.json"
-    metadata_path.write_text(json.dumps(metadata, indent=2), encoding="utf-8")
+    store.upsert(metadata)
 
     logger.info(f"Case study created: {slug}")
 
@@ -117,8 +110,35 @@ async def create_case_study(task_data: dict) -> dict:
     try:
         from services.semantic_rag import get_rag_service
         rag = get_rag_service()
-        rag.add_to_index(str(case_dir))
+        rag.add_to_index(slug)
     except Exception as e:
         logger.warning(f"RAG indexing skipped for {slug}: {e}")
 
-    return {"case_dir": str(case_dir), "slug": slug}
+    return {"slug": slug}
+
+
+async def delete_case_study(task_id: str) -> List[str]:
+    """Tombstone a task's case studies (see tombstone_case_studies) in a thread."""
+    return await asyncio.to_thread(tombstone_case_studies, task_id)
+
+
+def tombstone_case_studies(task_id: str) -> List[str]:
+    """Tombstone the case studies of a deleted task and drop them from the index.
+
+    Every case belonging to the task is marked (older installs may hold
+    several per task), so a full reindex skips them too.
+
+    Returns:
+        Slugs of the tombstoned case studies
+    """
+    tombstoned = get_case_store().tombstone_task(task_id, datetime.utcnow().isoformat())
+
+    try:
+        from services.semantic_rag import get_rag_service
+        get_rag_service().remove_from_index(task_id)
+    except Exception as e:
+        logger.warning(f"RAG removal skipped for task {task_id}: {e}")
+
+    if tombstoned:
+        logger.info(f"Case studies tombstoned for task {task_id}: {tombstoned}")
+    return tombstoned
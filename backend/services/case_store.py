@@ -0,0 +1,257 @@
+"""
+Case Store — Intelligence Flywheel
+
+Packed storage for case studies: one SQLite file (backend/case_studies.db)
+instead of a directory with README.md, metadata.json and artifacts/ per
+completed task.
+
+  - case_manifest: one narrow row per case (slug, task id, title,
+    completed/updated/deleted timestamps). Listing, counting and scanning
+    for changes never touch the case bodies.
+  - case_bodies: the full metadata document per slug as JSON (the same
+    fields metadata.json used to hold, plus the comment thread).
+
+READMEs are not stored; render_readme() builds the markdown on request.
+Case studies written as directories by older versions are brought in with
+import_directory() (see scripts/import_case_studies.py).
+
+Usage:
+    from services.case_store import get_case_store
+    store = get_case_store()
+    store.upsert(metadata)
+    for metadata in store.iter_cases():
+        ...
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CASE_STORE_PATH = Path(__file__).parent.parent / "case_studies.db"
+# Bodies fetched per query while streaming the whole store
+ITER_BATCH_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS case_manifest (
+    slug TEXT PRIMARY KEY,
+    task_id TEXT,
+    title TEXT,
+    completed_at TEXT,
+    updated_at TEXT NOT NULL,
+    deleted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_case_manifest_task ON case_manifest (task_id);
+CREATE TABLE IF NOT EXISTS case_bodies (
+    slug TEXT PRIMARY KEY REFERENCES case_manifest (slug),
+    metadata TEXT NOT NULL
+);
+"""
+
+
+class CaseStore:
+    """SQLite-backed case study store. Safe to share between threads."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def upsert(self, metadata: Dict[str, Any]) -> None:
+        """Insert or replace a case study (keyed by metadata["slug"]).
+
+        Writing a case clears any tombstone on it.
+        """
+        self._write(metadata, deleted_at=None)
+
+    def _write(self, metadata: Dict[str, Any], deleted_at: Optional[str]) -> None:
+        """Insert or replace a case study and its tombstone in one transaction."""
+        slug = metadata["slug"]
+        document = {k: v for k, v in metadata.items() if k != "deleted_at"}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO case_manifest "
+                    "(slug, task_id, title, completed_at, updated_at, deleted_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        slug,
+                        document.get("id"),
+                        document.get("title"),
+                        document.get("completed_at"),
+                        datetime.utcnow().isoformat(),
+                        deleted_at,
+                    ),
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO case_bodies (slug, metadata) VALUES (?, ?)",
+                    (slug, json.dumps(document)),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, slug: str, include_deleted: bool = False) -> Optional[Dict[str, Any]]:
+        """Full metadata of a case study, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT b.metadata, m.deleted_at FROM case_bodies b "
+                "JOIN case_manifest m ON m.slug = b.slug WHERE b.slug = ?",
+                (slug,),
+            ).fetchone()
+        if row is None or (row[1] and not include_deleted):
+            return None
+        return _document(row[0], row[1])
+
+    def slug_for_task(self, task_id: str) -> Optional[str]:
+        """Slug of the task's live case study (the most recently completed)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT slug FROM case_manifest WHERE task_id = ? AND deleted_at IS NULL "
+                "ORDER BY completed_at DESC LIMIT 1",
+                (task_id,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def slug_owner(self, slug: str) -> Optional[str]:
+        """Task id that a slug belongs to (including tombstoned cases)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT task_id FROM case_manifest WHERE slug = ?", (slug,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def tombstone_task(self, task_id: str, deleted_at: str) -> List[str]:
+        """Mark all live case studies of a task deleted; returns their slugs."""
+        with self._lock:
+            slugs = [r[0] for r in self._conn.execute(
+                "SELECT slug FROM case_manifest WHERE task_id = ? AND deleted_at IS NULL",
+                (task_id,),
+            )]
+            if slugs:
+                self._conn.execute(
+                    "UPDATE case_manifest SET deleted_at = ?, updated_at = ? "
+                    "WHERE task_id = ? AND deleted_at IS NULL",
+                    (deleted_at, deleted_at, task_id),
+                )
+        return slugs
+
+    def manifest(self, include_deleted: bool = False) -> List[Dict[str, Any]]:
+        """All manifest rows, ordered by slug."""
+        query = "SELECT slug, task_id, title, completed_at, updated_at, deleted_at FROM case_manifest"
+        if not include_deleted:
+            query += " WHERE deleted_at IS NULL"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY slug").fetchall()
+        keys = ("slug", "task_id", "title", "completed_at", "updated_at", "deleted_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self, include_deleted: bool = False) -> int:
+        query = "SELECT COUNT(*) FROM case_manifest"
+        if not include_deleted:
+            query += " WHERE deleted_at IS NULL"
+        with self._lock:
+            return self._conn.execute(query).fetchone()[0]
+
+    def iter_cases(self, include_deleted: bool = False) -> Iterator[Dict[str, Any]]:
+        """Stream full metadata documents in slug order, ITER_BATCH_SIZE at a time."""
+        last = ""
+        where = "" if include_deleted else "AND m.deleted_at IS NULL"
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT b.slug, b.metadata, m.deleted_at FROM case_bodies b "
+                    "JOIN case_manifest m ON m.slug = b.slug "
+                    f"WHERE b.slug > ? {where} ORDER BY b.slug LIMIT ?",
+                    (last, ITER_BATCH_SIZE),
+                ).fetchall()
+            if not rows:
+                return
+            for slug, body, deleted_at in rows:
+                yield _document(body, deleted_at)
+            last = rows[-1][0]
+
+    def import_directory(self, root: Path) -> int:
+        """Import case study directories (slug/metadata.json) written by older versions.
+
+        Existing slugs are overwritten, so importing twice is harmless.
+
+        Returns:
+            Number of case studies imported
+        """
+        imported = 0
+        for metadata_path in sorted(Path(root).glob("*/metadata.json")):
+            try:
+                metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+                metadata.setdefault("slug", metadata_path.parent.name)
+                # A deleted case is never visible without its tombstone
+                self._write(metadata, deleted_at=metadata.get("deleted_at") or None)
+                imported += 1
+            except Exception as e:
+                logger.warning(f"Failed to import {metadata_path}: {e}")
+        logger.info(f"Imported {imported} case studies from {root}")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _document(body: str, deleted_at: Optional[str]) -> Dict[str, Any]:
+    document = json.loads(body)
+    if deleted_at:
+        document["deleted_at"] = deleted_at
+    return document
+
+
+def render_readme(metadata: Dict[str, Any]) -> str:
+    """Human-readable markdown summary of a case study."""
+    lines = [
+        f"# {metadata.get('title', 'Untitled Task')}",
+        "",
+        f"**Assignee:** {metadata.get('assignee') or 'Unknown'}",
+        f"**Value Stream:** {metadata.get('value_stream') or 'None'}",
+        f"**Created:** {metadata.get('created_at') or 'N/A'}",
+        f"**Started:** {metadata.get('start_date') or 'N/A'}",
+        f"**Due:** {metadata.get('due_date') or 'N/A'}",
+        f"**Completed:** {metadata.get('completed_at') or 'N/A'}",
+        "",
+    ]
+
+    if metadata.get("description"):
+        lines += ["## Description", "", metadata["description"], ""]
+
+    if metadata.get("notes"):
+        lines += ["## Notes", "", metadata["notes"], ""]
+
+    comments = metadata.get("comments") or []
+    if comments:
+        lines += ["## Discussion", ""]
+        for c in comments:
+            lines.append(f"- **{c.get('author', 'Unknown')}:** {c.get('text', '')}")
+        lines.append("")
+
+    return "\n".join(lines)
+
+
+# Singleton (re-opened if CASE_STORE_PATH changes, e.g. in tests)
+_store: Optional[CaseStore] = None
+_store_lock = threading.Lock()
+
+
+def get_case_store() -> CaseStore:
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != Path(CASE_STORE_PATH):
+            _store = CaseStore(CASE_STORE_PATH)
+        return _store
@@ -0,0 +1,204 @@
+"""
+Embedders — Intelligence Flywheel
+
+Pluggable text embedding backends for the semantic RAG index.
+
+  - "sentence-transformers": all-MiniLM-L6-v2 (default). Best quality, but
+    pulls in torch and takes seconds and hundreds of MB to load.
+  - "hashing": pure-NumPy hashing vectorizer with sublinear TF-IDF weighting.
+    Loads instantly and needs no extra dependencies — meant for small
+    CPU-only workers.
+
+Select with RAG_EMBEDDER. Every embedder has a descriptor (name + parameters)
+that is written into the index file, so an index is never searched with
+vectors from a different embedder.
+
+Usage:
+    from services.embedders import create_embedder
+    embedder = create_embedder()
+    vectors = embedder.encode_batch(["deploy pipeline", "db migration"])
+"""
+
+import abc
+import os
+import re
+import zlib
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_TRANSFORMERS = "sentence-transformers"
+HASHING = "hashing"
+
+DEFAULT_EMBEDDER = SENTENCE_TRANSFORMERS
+DEFAULT_SENTENCE_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_HASHING_FEATURES = 1024
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Embedder(abc.ABC):
+    """Base interface for embedding backends."""
+
+    name: str = ""
+    # Whether encoding is heavy enough to run in the embedding worker process
+    offload: bool = False
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embed a single text as a 1-D float32 vector."""
+        return self.encode_batch([text])[0]
+
+    @abc.abstractmethod
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """Embed texts as a 2-D float32 array, one row per text."""
+
+    def load(self):
+        """Eagerly load heavy resources. No-op for lightweight embedders."""
+        return self
+
+    def fitted(self, texts: Sequence[str]) -> "Embedder":
+        """Return an embedder fitted to `texts` for a full rebuild.
+
+        Stateless embedders return themselves; stateful ones return a new
+        instance so the live embedder keeps serving until the swap.
+        """
+        return self
+
+    def descriptor(self) -> Dict[str, Any]:
+        """Identity of this embedder, recorded in the index file."""
+        return {"name": self.name}
+
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        """Fitted state to persist alongside the index, if any."""
+        return None
+
+    def set_state(self, state: Optional[Dict[str, Any]]):
+        """Restore fitted state loaded from the index file."""
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """Dense embeddings from a sentence-transformers model (lazy-loaded)."""
+
+    name = SENTENCE_TRANSFORMERS
+    offload = True
+
+    def __init__(self, model_name: str = DEFAULT_SENTENCE_MODEL):
+        self.model_name = model_name
+        self._model = None
+
+    def load(self):
+        if self._model is None:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name)
+                logger.info(f"Loaded embedding model: {self.model_name}")
+            except Exception as e:
+                logger.error(f"Failed to load embedding model: {e}")
+                raise
+        return self
+
+    def encode(self, text: str) -> np.ndarray:
+        self.load()
+        return np.asarray(self._model.encode(text), dtype=np.float32)
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        self.load()
+        return np.asarray(self._model.encode(list(texts)), dtype=np.float32)
+
+    def descriptor(self) -> Dict[str, Any]:
+        return {"name": self.name, "model": self.model_name}
+
+
+class HashingEmbedder(Embedder):
+    """Hashing vectorizer with sublinear TF-IDF, in NumPy.
+
+    Unigrams and bigrams are hashed (crc32, stable across processes) into
+    n_features buckets with a sign bit to reduce collision bias. Term
+    frequency is damped as 1 + log(tf) and weighted by smoothed IDF learned
+    in fitted(); rows are L2-normalized.
+
+    IDF is fitted on full rebuilds only. Cases added incrementally are
+    encoded with the current IDF, which is refreshed on the next reindex.
+    """
+
+    name = HASHING
+
+    def __init__(self, n_features: int = DEFAULT_HASHING_FEATURES):
+        self.n_features = n_features
+        self._n_docs = 0
+        self._df = np.zeros(n_features, dtype=np.float32)
+        self._idf = np.ones(n_features, dtype=np.float32)
+
+    def _features(self, text: str) -> Dict[int, float]:
+        """Signed bucket counts for one text."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        counts: Dict[int, float] = {}
+        for gram in grams:
+            h = zlib.crc32(gram.encode("utf-8"))
+            bucket = h % self.n_features
+            sign = 1.0 if (h >> 31) & 1 == 0 else -1.0
+            counts[bucket] = counts.get(bucket, 0.0) + sign
+        return counts
+
+    def _tf(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.n_features), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for bucket, count in self._features(text).items():
+                if count != 0:
+                    matrix[i, bucket] = np.sign(count) * (1.0 + np.log(abs(count)))
+        return matrix
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = self._tf(texts) * self._idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+    def fitted(self, texts: Sequence[str]) -> "HashingEmbedder":
+        df = np.zeros(self.n_features, dtype=np.float32)
+        for text in texts:
+            buckets = [b for b, c in self._features(text).items() if c != 0]
+            df[buckets] += 1
+        embedder = HashingEmbedder(self.n_features)
+        embedder.set_state({"n_docs": len(texts), "df": df.tolist()})
+        return embedder
+
+    def descriptor(self) -> Dict[str, Any]:
+        return {"name": self.name, "n_features": self.n_features}
+
+    def get_state(self) -> Optional[Dict[str, Any]]:
+        return {"n_docs": self._n_docs, "df": self._df.tolist()}
+
+    def set_state(self, state: Optional[Dict[str, Any]]):
+        if not state:
+            return
+        self._n_docs = int(state.get("n_docs", 0))
+        self._df = np.asarray(state.get("df", np.zeros(self.n_features)), dtype=np.float32)
+        # Smoothed IDF, as in scikit-learn: ln((1 + n) / (1 + df)) + 1
+        self._idf = (np.log((1.0 + self._n_docs) / (1.0 + self._df)) + 1.0).astype(np.float32)
+
+
+def create_embedder(name: Optional[str] = None) -> Embedder:
+    """Create the embedder selected by `name` or RAG_EMBEDDER."""
+    name = (name or os.getenv("RAG_EMBEDDER", DEFAULT_EMBEDDER)).lower()
+    if name == HASHING:
+        n_features = int(os.getenv("RAG_HASHING_FEATURES", str(DEFAULT_HASHING_FEATURES)))
+        return HashingEmbedder(n_features=n_features)
+    if name != SENTENCE_TRANSFORMERS:
+        logger.warning(f"Unknown RAG_EMBEDDER '{name}', using {SENTENCE_TRANSFORMERS}")
+    return SentenceTransformerEmbedder(os.getenv("RAG_EMBEDDING_MODEL", DEFAULT_SENTENCE_MODEL))
+
+
+def create_embedder_from_descriptor(descriptor: Dict[str, Any]) -> Embedder:
+    """Recreate an (unfitted) embedder from its descriptor, e.g. in a worker process."""
+    if descriptor.get("name") == HASHING:
+        return HashingEmbedder(n_features=int(descriptor.get("n_features", DEFAULT_HASHING_FEATURES)))
+    return SentenceTransformerEmbedder(descriptor.get("model", DEFAULT_SENTENCE_MODEL))
+
+
+def legacy_descriptor() -> Dict[str, Any]:
+    """Descriptor assumed for index files written before embedders were recorded."""
+    return {"name": SENTENCE_TRANSFORMERS, "model": DEFAULT_SENTENCE_MODEL}
@@ -0,0 +1,179 @@
+"""
+Embedding Worker — Intelligence Flywheel
+
+Micro-batching query encoder backed by a dedicated worker process.
+
+Concurrent /api/ai/assist requests used to call model.encode one by one on
+the event loop thread, serializing on the GIL. The EmbeddingBatcher instead
+collects encode requests for up to RAG_EMBED_BATCH_WAIT_MS (or until
+RAG_EMBED_MAX_BATCH are queued), sends them to a worker process as a single
+batch, and resolves each caller's future with its row.
+
+Enabled with RAG_EMBED_WORKER=process, and only used for embedders that are
+expensive enough to offload (sentence-transformers). The hashing embedder
+encodes inline in microseconds, so it never goes through the worker.
+
+Usage:
+    from services.embedding_worker import get_embedding_batcher
+    batcher = get_embedding_batcher()
+    if batcher:
+        vector = await batcher.encode("deploy pipeline failing")
+"""
+
+import os
+import asyncio
+import logging
+import multiprocessing
+import concurrent.futures
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_BATCH_WAIT_MS = 5.0
+
+# Embedder instance inside the worker process (set by _init_worker)
+_worker_embedder = None
+
+
+def _init_worker(descriptor: Dict[str, Any]):
+    """Worker process initializer: build and load the embedder once."""
+    global _worker_embedder
+    from services.embedders import create_embedder_from_descriptor
+    _worker_embedder = create_embedder_from_descriptor(descriptor).load()
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_embedder.encode_batch(texts)
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent encode calls into batches run in a worker process."""
+
+    def __init__(
+        self,
+        descriptor: Dict[str, Any],
+        max_batch: int = DEFAULT_MAX_BATCH,
+        max_wait_ms: float = DEFAULT_BATCH_WAIT_MS,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ):
+        self.descriptor = descriptor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        # Spawn, not fork: the parent may already hold torch / thread state
+        self._executor = executor or concurrent.futures.ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(descriptor,),
+        )
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Batches in flight, held so they are not garbage-collected mid-run
+        self._batches: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.requests = 0
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode one text; resolves when its batch comes back from the worker."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (tests): start with a clean queue
+            self._loop = loop
+            self._pending = []
+            self._flush_handle = None
+
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.batches += 1
+            task = self._loop.create_task(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        texts = [text for text, _ in batch]
+        try:
+            vectors = await self._loop.run_in_executor(self._executor, _encode_in_worker, texts)
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done():
+                future.set_result(np.asarray(vector, dtype=np.float32))
+
+    def warm_up(self, timeout: Optional[float] = None):
+        """Start the worker process and load its model. Blocking."""
+        self._executor.submit(_encode_in_worker, ["warm-up"]).result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def close(self):
+        """Stop the worker; callers of batches still in flight are cancelled."""
+        for task in list(self._batches):
+            loop = task.get_loop()
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(task.cancel)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton
+_batcher: Optional[EmbeddingBatcher] = None
+
+
+def get_embedding_batcher() -> Optional[EmbeddingBatcher]:
+    """The shared batcher, or None when disabled or not useful for this embedder."""
+    global _batcher
+    if os.getenv("RAG_EMBED_WORKER", "inline").lower() != "process":
+        return None
+    if _batcher is None:
+        from services.semantic_rag import get_rag_service
+        embedder = get_rag_service().embedder
+        if not embedder.offload:
+            return None
+        _batcher = EmbeddingBatcher(
+            embedder.descriptor(),
+            max_batch=int(os.getenv("RAG_EMBED_MAX_BATCH", str(DEFAULT_MAX_BATCH))),
+            max_wait_ms=float(os.getenv("RAG_EMBED_BATCH_WAIT_MS", str(DEFAULT_BATCH_WAIT_MS))),
+        )
+        logger.info(f"Embedding worker process enabled for {embedder.descriptor()}")
+    return _batcher
+
+
+def shutdown_embedding_batcher():
+    global _batcher
+    if _batcher is not None:
+        _batcher.close()
+        _batcher = None
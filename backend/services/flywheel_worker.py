@@ -0,0 +1,198 @@
+"""
+Flywheel Worker — Intelligence Flywheel
+
+Processes the flywheel outbox off the request path. update_task and
+delete_task only insert a FlywheelOutbox row in the same transaction as the
+task change; this worker picks rows up in order and runs the blocking work
+(case study files, embedding, index publish) in a thread.
+
+Delivery is at-least-once: a row is marked done only after its handler
+returns, and handlers are idempotent (case studies are upserted by task id),
+so rows left behind by a crash are simply processed again on the next start.
+Failed rows are retried up to FLYWHEEL_MAX_ATTEMPTS times.
+
+On shutdown the worker stops waiting for new work and drains what is already
+pending for up to FLYWHEEL_DRAIN_TIMEOUT seconds.
+
+Usage:
+    from services.flywheel_worker import get_flywheel_worker
+    get_flywheel_worker().notify()        # after committing an outbox row
+    await process_outbox()                # run pending rows once (tests, scripts)
+"""
+
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, update
+
+from db.database import AsyncSessionLocal
+from db.models import FlywheelOutbox, Task
+
+logger = logging.getLogger(__name__)
+
+EVENT_CASE_STUDY_UPSERT = "case_study.upsert"
+EVENT_CASE_STUDY_DELETE = "case_study.delete"
+
+OUTBOX_PENDING = "pending"
+OUTBOX_DONE = "done"
+OUTBOX_FAILED = "failed"
+
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_DRAIN_TIMEOUT = 10.0
+DEFAULT_MAX_ATTEMPTS = 5
+# Rows fetched per pass
+OUTBOX_BATCH_SIZE = 20
+
+
+async def _handle(row: FlywheelOutbox, session_factory) -> None:
+    """Run the blocking work for one outbox row in a thread."""
+    from services.case_memory import write_case_study, tombstone_case_studies
+
+    if row.event == EVENT_CASE_STUDY_UPSERT:
+        task_data = dict(row.payload or {})
+        # Re-read the slug: an earlier row for this task may have set it
+        async with session_factory() as session:
+            slug = await session.scalar(select(Task.case_study_slug).where(Task.id == row.task_id))
+        if slug:
+            task_data["case_study_slug"] = slug
+
+        # No session is held open across the slow part
+        result = await asyncio.to_thread(write_case_study, task_data)
+
+        async with session_factory() as session:
+            await session.execute(
+                update(Task).where(Task.id == row.task_id).values(case_study_slug=result.get("slug"))
+            )
+            await session.commit()
+        logger.info(f"Case study created for task {row.task_id}: {result.get('slug')}")
+    elif row.event == EVENT_CASE_STUDY_DELETE:
+        await asyncio.to_thread(tombstone_case_studies, row.task_id)
+    else:
+        raise ValueError(f"Unknown flywheel event: {row.event}")
+
+
+async def process_outbox(
+    session_factory=AsyncSessionLocal,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> int:
+    """Process pending outbox rows in insertion order until none are left.
+
+    Returns:
+        Number of rows processed (successfully or not)
+    """
+    processed = 0
+    while True:
+        async with session_factory() as session:
+            result = await session.execute(
+                select(FlywheelOutbox)
+                .where(FlywheelOutbox.status == OUTBOX_PENDING)
+                .order_by(FlywheelOutbox.id)
+                .limit(OUTBOX_BATCH_SIZE)
+            )
+            rows = result.scalars().all()
+        if not rows:
+            return processed
+
+        for row in rows:
+            error = None
+            try:
+                await _handle(row, session_factory)
+            except Exception as e:
+                error = str(e)
+                logger.error(f"Flywheel event {row.id} ({row.event}) failed: {e}")
+
+            attempts = row.attempts + 1
+            if error is None:
+                status = OUTBOX_DONE
+            elif attempts >= max_attempts:
+                status = OUTBOX_FAILED
+            else:
+                status = OUTBOX_PENDING
+            async with session_factory() as session:
+                await session.execute(
+                    update(FlywheelOutbox)
+                    .where(FlywheelOutbox.id == row.id)
+                    .values(
+                        status=status,
+                        attempts=attempts,
+                        last_error=error,
+                        processed_at=datetime.utcnow(),
+                    )
+                )
+                await session.commit()
+            processed += 1
+            if error is not None and status == OUTBOX_PENDING:
+                # Leave the retry for the next pass rather than spinning on it
+                return processed
+
+
+class FlywheelWorker:
+    """Background task that drains the flywheel outbox."""
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.poll_interval = float(os.getenv("FLYWHEEL_POLL_INTERVAL", str(DEFAULT_POLL_INTERVAL)))
+        self.drain_timeout = float(os.getenv("FLYWHEEL_DRAIN_TIMEOUT", str(DEFAULT_DRAIN_TIMEOUT)))
+        self.max_attempts = int(os.getenv("FLYWHEEL_MAX_ATTEMPTS", str(DEFAULT_MAX_ATTEMPTS)))
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info("Flywheel worker started")
+
+    def notify(self):
+        """Wake the worker after an outbox row was committed."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        # Always one more pass after stop() so pending rows are drained
+        while True:
+            self._wake.clear()
+            try:
+                await process_outbox(self.session_factory, self.max_attempts)
+            except Exception as e:
+                logger.error(f"Flywheel outbox pass failed: {e}")
+            if self._stopping:
+                break
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stop(self):
+        """Finish pending work (bounded by drain_timeout), then stop."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        try:
+            # The current pass keeps going until the outbox is empty
+            await asyncio.wait_for(asyncio.shield(self._task), timeout=self.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Flywheel outbox not drained after {self.drain_timeout}s; "
+                "remaining rows are processed on next start"
+            )
+            self._task.cancel()
+        self._task = None
+        logger.info("Flywheel worker stopped")
+
+
+# Singleton
+_worker: Optional[FlywheelWorker] = None
+
+
+def get_flywheel_worker() -> FlywheelWorker:
+    global _worker
+    if _worker is None:
+        _worker = FlywheelWorker()
+    return _worker
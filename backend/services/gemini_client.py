@@ -3,9 +3,26 @@ Gemini Client Service — Lotus v2
 
 Clean interface to Google's Gemini 2.0 Flash API with:
 - Structured output generation (JSON matching Pydantic schemas)
-- Raw text generation
+- Raw text generation, complete or streamed
 - Cost tracking and usage monitoring
-- Async-safe execution via thread pool
+- Native async REST transport with pooled keep-alive connections
+  (GEMINI_TRANSPORT=rest, the default; see gemini_transport.py), or the
+  synchronous google-generativeai SDK on a thread pool (GEMINI_TRANSPORT=sdk),
+  or a local fake backend for load tests (GEMINI_TRANSPORT=fake; see
+  gemini_fake.py)
+- Persistent response cache for repeated prompts (see response_cache.py)
+- A scheduler in front of the transport: identical in-flight requests share
+  one call, interactive requests run before background ones, and a bounded
+  wait queue rejects with GeminiOverloaded when saturated
+- End-to-end deadlines (GEMINI_TIMEOUT), retries and optional hedged
+  attempts within that budget, and a circuit breaker that fails fast with
+  GeminiUnavailable during an outage so callers go straight to a fallback
+- Tiered model routing by input size, caller tier or latency SLO, with
+  per-model pricing and latency accounting (see model_router.py)
+- Token counts from the response usage metadata (estimated only when
+  Gemini reports none), latency histograms per model and method, and a
+  usage history flushed to SQLite every GEMINI_USAGE_FLUSH_INTERVAL
+  seconds for time-window queries (see usage_store.py)
 
 Usage:
     from services.gemini_client import get_gemini_client
@@ -15,21 +32,322 @@ Usage:
 
 import os
 import json
+import heapq
 import asyncio
 import logging
+import itertools
+import threading
+import time
 import concurrent.futures
-from typing import Type, TypeVar, Optional, Dict, Any
-from pydantic import BaseModel
-import google.generativeai as genai
+from contextlib import asynccontextmanager
+from typing import Type, TypeVar, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, List, Tuple
+from pydantic import BaseModel, Field
 from datetime import datetime
 
+from services.usage_store import PendingUsage, RecentLatency, UsageBucket, merge_pending
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar('T', bound=BaseModel)
 
-# Shared thread pool for Gemini SDK calls (sync SDK, async wrapper)
+# Shared thread pool for Gemini SDK calls (GEMINI_TRANSPORT=sdk only)
 _thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
 
+# Marks the end of a streamed response on the bridge queue
+_STREAM_END = object()
+
+# Methods, as reported in usage statistics
+METHOD_GENERATE = "generate"
+METHOD_STRUCTURED = "generate_structured"
+METHOD_STREAM = "generate_stream"
+
+# Scheduler priorities (lower runs first)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+# HTTP statuses worth another attempt (rate limit, server-side errors)
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Retryable google-api-core / httpx errors, matched by name (both imports are optional)
+_RETRYABLE_ERROR_NAMES = {
+    "DeadlineExceeded", "ServiceUnavailable", "ResourceExhausted", "InternalServerError",
+    "TooManyRequests", "TransportError", "TimeoutException", "NetworkError",
+}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class GeminiOverloaded(Exception):
+    """The scheduler's wait queue is full; answer 503 and let the caller retry."""
+
+
+class GeminiUnavailable(Exception):
+    """The circuit breaker is open; Gemini is not being called right now."""
+
+
+def _retryable(error: BaseException) -> bool:
+    """Whether a failed attempt may succeed if tried again (transient errors)."""
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES
+    return any(cls.__name__ in _RETRYABLE_ERROR_NAMES for cls in type(error).__mro__)
+
+
+class CircuitBreaker:
+    """Trips after consecutive failed calls, then fails fast until a probe succeeds.
+
+    closed -> open after failure_threshold consecutive failures; open ->
+    half_open after reset_timeout seconds, when one probe call is let
+    through; the probe's outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self.short_circuited = 0
+        self._probe_started: Optional[float] = None
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (counts rejected calls)."""
+        now = time.monotonic()
+        if self.state == CIRCUIT_OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = CIRCUIT_HALF_OPEN
+            self._probe_started = None
+        if self.state == CIRCUIT_HALF_OPEN:
+            # One probe at a time; a probe that never reported back is replaced
+            if self._probe_started is None or now - self._probe_started >= self.reset_timeout:
+                self._probe_started = now
+                return True
+        elif self.state == CIRCUIT_CLOSED:
+            return True
+        self.short_circuited += 1
+        return False
+
+    def record_success(self):
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_started = None
+
+    def release(self):
+        """A call let through by allow() ended without an outcome (e.g. cancelled).
+
+        If it was the half-open probe, the next call may probe instead.
+        """
+        if self.state == CIRCUIT_HALF_OPEN:
+            self._probe_started = None
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == CIRCUIT_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != CIRCUIT_OPEN:
+                self.trips += 1
+                logger.warning(f"Gemini circuit opened after {self.consecutive_failures} failures")
+            self.state = CIRCUIT_OPEN
+            self.opened_at = time.monotonic()
+            self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = None
+        if self.state == CIRCUIT_OPEN:
+            retry_in = round(max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0), 1)
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failure_threshold": self.failure_threshold,
+            "reset_timeout_seconds": self.reset_timeout,
+            "retry_in_seconds": retry_in,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited,
+        }
+
+
+class _Flight:
+    """A shared call in GeminiScheduler.run and what its callers asked for."""
+
+    __slots__ = ("task", "priority", "deadline", "waiter")
+
+    def __init__(self, priority: int, deadline: Optional[float]):
+        self.task: Optional[asyncio.Task] = None
+        self.priority = priority
+        self.deadline = deadline
+        # Its entry in the wait queue, while waiting for a slot
+        self.waiter: Optional[list] = None
+
+
+class GeminiScheduler:
+    """Admission control for Gemini calls.
+
+    At most max_concurrency calls run at once. Further callers wait in a
+    priority queue (interactive before background, FIFO within a
+    priority); once max_queue callers are waiting, new ones are rejected
+    with GeminiOverloaded instead of piling up. run() also coalesces
+    identical in-flight requests (singleflight): callers with the same key
+    share one call and its result or error. The shared call runs at the
+    highest priority and until the latest deadline of its callers.
+
+    State belongs to one event loop and is reset if used from another.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.peak_queue_depth = 0
+        # heap of [priority, sequence, future resolved when a slot is handed
+        # over]; the future is None in an entry superseded by a promotion
+        self._waiters: List[list] = []
+        self._sequence = itertools.count()
+        self._inflight: Dict[str, _Flight] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self.active = 0
+            self._waiters = []
+            self._inflight = {}
+
+    def _queued(self, priority: Optional[int] = None) -> int:
+        return sum(
+            1 for p, _, future in self._waiters
+            if future is not None and not future.done() and (priority is None or p == priority)
+        )
+
+    @property
+    def saturated(self) -> bool:
+        """Whether a new call would be rejected right now."""
+        return self.active >= self.max_concurrency and self._queued() >= self.max_queue
+
+    async def _acquire(self, priority: int, flight: Optional[_Flight] = None):
+        if self.active < self.max_concurrency and not self._queued():
+            self.active += 1
+            return
+        depth = self._queued()
+        if depth >= self.max_queue:
+            self.rejected += 1
+            raise GeminiOverloaded(f"Gemini queue is full ({depth} waiting)")
+
+        future = self._loop.create_future()
+        entry = [priority, next(self._sequence), future]
+        heapq.heappush(self._waiters, entry)
+        if flight is not None:
+            flight.waiter = entry
+        self.peak_queue_depth = max(self.peak_queue_depth, depth + 1)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # A slot was handed over as we were cancelled; pass it on
+            raise
+        finally:
+            if flight is not None:
+                flight.waiter = None
+
+    def _release(self):
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if future is not None and not future.done():
+                future.set_result(None)  # The slot moves to the waiter; active is unchanged
+                return
+        self.active -= 1
+
+    def _promote(self, flight: _Flight, priority: int):
+        """Move a shared call up to a higher priority (lower value)."""
+        flight.priority = priority
+        entry = flight.waiter
+        if entry is not None:
+            future, entry[2] = entry[2], None
+            flight.waiter = [priority, next(self._sequence), future]
+            heapq.heappush(self._waiters, flight.waiter)
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """Hold one of the max_concurrency slots (e.g. for a whole stream)."""
+        self._bind_loop()
+        await self._acquire(priority)
+        try:
+            yield
+        finally:
+            self._release()
+            self.completed += 1
+
+    async def run(
+        self,
+        key: str,
+        priority: int,
+        call: Callable[[], Awaitable[Any]],
+        deadline: Optional[float] = None,
+    ) -> Any:
+        """Run call() in a slot, sharing it with concurrent runs of the same key.
+
+        A caller joining a shared call raises its priority if higher, and
+        extends deadline(key) to its own deadline (loop time; None for no
+        deadline) if later. Each caller still bounds its own wait.
+        """
+        self._bind_loop()
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.coalesced += 1
+            if priority < flight.priority:
+                self._promote(flight, priority)
+            if flight.deadline is not None:
+                flight.deadline = None if deadline is None else max(flight.deadline, deadline)
+        else:
+            flight = _Flight(priority, deadline)
+
+            async def _run():
+                await self._acquire(flight.priority, flight)
+                try:
+                    return await call()
+                finally:
+                    self._release()
+                    self.completed += 1
+
+            flight.task = asyncio.ensure_future(_run())
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda done: self._finished(key, done))
+        # A caller giving up (timeout, disconnect) must not cancel the shared call
+        return await asyncio.shield(flight.task)
+
+    def deadline(self, key: str, default: Optional[float] = None) -> Optional[float]:
+        """Latest deadline among the callers sharing key's call (default if none is running)."""
+        flight = self._inflight.get(key)
+        return default if flight is None else flight.deadline
+
+    def _finished(self, key: str, task: asyncio.Task):
+        flight = self._inflight.get(key)
+        if flight is not None and flight.task is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here in case every caller has gone
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self._queued(),
+            "queued_interactive": self._queued(PRIORITY_INTERACTIVE),
+            "queued_background": self._queued(PRIORITY_BACKGROUND),
+            "max_queue": self.max_queue,
+            "peak_queue_depth": self.peak_queue_depth,
+            "completed": self.completed,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+        }
+
 
 class UsageStats(BaseModel):
     """Track Gemini API usage for cost monitoring."""
@@ -38,19 +356,61 @@ class UsageStats(BaseModel):
     total_output_tokens: int = 0
     total_cost_usd: float = 0.0
     last_reset: datetime = datetime.now()
+    by_model: Dict[str, UsageBucket] = {}
+    by_method: Dict[str, UsageBucket] = {}
+    # Not yet written to the usage store: model -> method -> bucket
+    pending: PendingUsage = {}
+    # Per-model latency of the last few minutes, for latency-SLO routing
+    recent_latency: RecentLatency = Field(default_factory=RecentLatency)
+
+    def log_request(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        model_name: str = "",
+        latency_ms: Optional[float] = None,
+        method: str = METHOD_GENERATE,
+        estimated: bool = False,
+    ):
+        from services.model_router import request_cost
 
-    def log_request(self, input_tokens: int, output_tokens: int):
         self.total_requests += 1
         self.total_input_tokens += input_tokens
         self.total_output_tokens += output_tokens
-        # Gemini 2.0 Flash pricing: $0.075/1M input, $0.30/1M output
-        cost = (input_tokens / 1_000_000) * 0.075 + (output_tokens / 1_000_000) * 0.30
+        # Priced per model (see MODEL_PRICING)
+        cost = request_cost(model_name, input_tokens, output_tokens)
         self.total_cost_usd += cost
+
+        for bucket in (
+            self.by_model.setdefault(model_name, UsageBucket()),
+            self.by_method.setdefault(method, UsageBucket()),
+            self.pending.setdefault(model_name, {}).setdefault(method, UsageBucket()),
+        ):
+            bucket.add(input_tokens, output_tokens, cost, latency_ms, estimated)
+        if latency_ms is not None:
+            self.recent_latency.observe(model_name, latency_ms)
+
         logger.info(
-            f"Gemini request: {input_tokens} in, {output_tokens} out, "
+            f"Gemini {method} ({model_name}): {input_tokens} in, {output_tokens} out"
+            f"{' (estimated)' if estimated else ''}, "
             f"cost: ${cost:.6f} (total: ${self.total_cost_usd:.4f})"
         )
 
+    def drain_pending(self) -> PendingUsage:
+        pending, self.pending = self.pending, {}
+        return pending
+
+    def latency_by_model(self) -> Dict[str, float]:
+        """p95 latency per model over the last few minutes."""
+        return self.recent_latency.percentile(0.95)
+
+
+def _token_counts(completion, prompt: str, text: str) -> Tuple[int, int, bool]:
+    """(input, output, estimated): reported counts, else 4 characters per token."""
+    if completion is not None and completion.input_tokens is not None and completion.output_tokens is not None:
+        return completion.input_tokens, completion.output_tokens, False
+    return len(prompt) // 4, len(text) // 4, True
+
 
 class GeminiClient:
     """Client for Google Gemini 2.0 Flash API."""
@@ -59,32 +419,110 @@ class GeminiClient:
         # Prefer the new env var name, but allow the legacy one with a warning.
         self.api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GOOGLE_AI_API_KEY", "")
         self.model_name = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+        self.transport = os.getenv("GEMINI_TRANSPORT", "rest").lower()
         self.usage_stats = UsageStats()
+        self.model = None
+        self._sdk_models: Dict[str, Any] = {}
+        self._rest = None
+
+        from services.model_router import ModelRouter
+        self.router = ModelRouter.from_env(self.model_name)
+
+        # Identical requests within the TTL are answered from disk
+        self.response_cache = None
+        cache_ttl = float(os.getenv("GEMINI_CACHE_TTL", "86400"))
+        if cache_ttl > 0:
+            from services.response_cache import RESPONSE_CACHE_PATH, ResponseCache
+            try:
+                self.response_cache = ResponseCache(
+                    RESPONSE_CACHE_PATH,
+                    ttl_seconds=cache_ttl,
+                    max_entries=int(os.getenv("GEMINI_CACHE_MAX_ENTRIES", "1000")),
+                )
+            except Exception as e:
+                logger.warning(f"Gemini response cache unavailable: {e}")
 
         if not os.getenv("GOOGLE_API_KEY") and os.getenv("GOOGLE_AI_API_KEY"):
             logger.warning("GOOGLE_AI_API_KEY is deprecated; use GOOGLE_API_KEY instead")
 
-        if self.api_key and self.api_key != "your_gemini_key_here":
+        if self.transport == "fake":
+            # No API key or network: answers come from the local fake backend
+            from services.gemini_fake import FakeGeminiTransport
+            self._rest = FakeGeminiTransport.from_env(executor=_thread_pool)
+            self.available = True
+            logger.warning("Gemini client is using the FAKE backend (GEMINI_TRANSPORT=fake)")
+        elif self.api_key and self.api_key != "your_gemini_key_here":
             try:
-                genai.configure(api_key=self.api_key)
-                self.model = genai.GenerativeModel(self.model_name)
+                if self.transport == "sdk":
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self.model = genai.GenerativeModel(self.model_name)
+                else:
+                    from services.gemini_transport import DEFAULT_API_BASE, GeminiRestTransport
+                    self._rest = GeminiRestTransport(
+                        self.api_key,
+                        base_url=os.getenv("GEMINI_API_BASE", DEFAULT_API_BASE),
+                        max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "16")),
+                    )
                 self.available = True
-                logger.info(f"Gemini client initialized with model: {self.model_name}")
+                logger.info(
+                    f"Gemini client initialized with models: "
+                    f"{', '.join(f'{t}={m}' for t, m in self.router.models.items())} ({self.transport})"
+                )
             except Exception as e:
                 logger.error(f"Failed to initialize Gemini: {e}")
                 self.available = False
                 self.model = None
+                self._rest = None
         else:
             logger.warning("Gemini API key not configured — AI features will be unavailable")
             self.available = False
-            self.model = None
+
+        # The SDK transport (and the blocking fake) runs on the shared thread
+        # pool, so it cannot go wider
+        max_concurrency = (
+            _thread_pool._max_workers if self._rest is None or getattr(self._rest, "blocking", False)
+            else int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+        )
+        self.scheduler = GeminiScheduler(
+            max_concurrency=max_concurrency,
+            max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "64")),
+        )
+
+        # Deadlines, retries and the circuit breaker
+        self.timeout = float(os.getenv("GEMINI_TIMEOUT", "20"))
+        self.max_attempts = max(int(os.getenv("GEMINI_MAX_ATTEMPTS", "2")), 1)
+        # Start a parallel attempt if one has not answered after this many seconds (0 = off)
+        self.hedge_after = float(os.getenv("GEMINI_HEDGE_AFTER", "0"))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("GEMINI_BREAKER_RESET", "30")),
+        )
+        self.timeouts = 0
+        self.retries = 0
+        self.hedges = 0
+
+        # Usage history (0 = keep statistics in memory only)
+        self.usage_flush_interval = float(os.getenv("GEMINI_USAGE_FLUSH_INTERVAL", "60"))
+        self.usage_retention_days = float(os.getenv("GEMINI_USAGE_RETENTION_DAYS", "30"))
+        self._usage_store = None
+        self._usage_store_lock = threading.Lock()
+        self._usage_period_start = time.time()
+        self._usage_flusher: Optional[asyncio.Task] = None
+        # The usage store write in progress, if any
+        self._usage_write: Optional[asyncio.Task] = None
 
     async def generate_structured(
         self,
         prompt: str,
         schema: Type[T],
         temperature: float = 0.1,
-        timeout: int = 10,
+        max_tokens: int = 2048,
+        timeout: float = 10,
+        priority: int = PRIORITY_INTERACTIVE,
+        model: Optional[str] = None,
+        tier: Optional[str] = None,
+        latency_slo_ms: Optional[float] = None,
     ) -> T:
         """Generate structured output matching a Pydantic schema.
 
@@ -92,12 +530,21 @@ class GeminiClient:
             prompt: Input prompt for the model
             schema: Pydantic BaseModel class to validate against
             temperature: Sampling temperature (0.0-1.0)
-            timeout: Maximum seconds to wait
+            max_tokens: Maximum tokens to generate; the whole JSON must fit
+            timeout: Maximum seconds to wait, queueing and retries included
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            model: Model to use; routed by tier, latency SLO or prompt size if omitted
+            tier: Requested model tier (light, standard, heavy)
+            latency_slo_ms: Target latency; routes to the most capable model
+                            whose recent p95 latency meets it
 
         Returns:
             Instance of the schema class
 
         Raises:
+            GeminiOverloaded: If the scheduler queue is full
+            GeminiUnavailable: If the circuit breaker is open
+            asyncio.TimeoutError: If the deadline passed
             Exception: If Gemini is unavailable or generation fails
         """
         if not self.available:
@@ -107,42 +554,61 @@ class GeminiClient:
 
 IMPORTANT: Return ONLY valid JSON matching the requested schema. Do not include markdown formatting or explanations."""
 
-        loop = asyncio.get_event_loop()
-
-        async def _generate():
-            return await loop.run_in_executor(
-                _thread_pool,
-                lambda: self.model.generate_content(
-                    enhanced_prompt,
-                    generation_config=genai.GenerationConfig(
-                        temperature=temperature,
-                        max_output_tokens=2048,
-                    ),
-                ),
+        model_name = model or self.route(enhanced_prompt, tier=tier, latency_slo_ms=latency_slo_ms)
+        from services.response_cache import cache_key
+        key = cache_key(
+            model_name, temperature, max_tokens, enhanced_prompt, kind=f"structured:{schema.__name__}"
+        )
+        cached = await self._cached_response(key)
+        if cached is not None:
+            try:
+                return schema.model_validate_json(cached)
+            except Exception:
+                pass  # Schema changed since the entry was written; regenerate
+
+        deadline = self._deadline(timeout)
+
+        async def _call() -> str:
+            started = time.perf_counter()
+            completion = await self._attempts(
+                lambda: self._complete(enhanced_prompt, temperature, max_tokens, model_name),
+                lambda: self.scheduler.deadline(key, deadline),
             )
+            latency_ms = (time.perf_counter() - started) * 1000
 
-        response = await asyncio.wait_for(_generate(), timeout=timeout)
+            result_json = completion.text.strip()
+            if result_json.startswith("```json"):
+                result_json = result_json.split("```json")[1].split("```")[0].strip()
+            elif result_json.startswith("```"):
+                result_json = result_json.split("```")[1].split("```")[0].strip()
 
-        result_json = response.text.strip()
-        if result_json.startswith("```json"):
-            result_json = result_json.split("```json")[1].split("```")[0].strip()
-        elif result_json.startswith("```"):
-            result_json = result_json.split("```")[1].split("```")[0].strip()
+            schema.model_validate_json(result_json)
 
-        result = schema.model_validate_json(result_json)
+            input_tokens, output_tokens, estimated = _token_counts(
+                completion, enhanced_prompt, completion.text
+            )
+            self.usage_stats.log_request(
+                input_tokens, output_tokens, model_name, latency_ms, METHOD_STRUCTURED, estimated
+            )
 
-        # Track usage (rough estimate: 4 chars per token)
-        input_tokens = len(prompt) // 4
-        output_tokens = len(result_json) // 4
-        self.usage_stats.log_request(input_tokens, output_tokens)
+            await self._remember_response(key, model_name, result_json)
+            return result_json
 
-        return result
+        result_json = await self._run_until(
+            deadline, self.scheduler.run(key, priority, _call, deadline)
+        )
+        return schema.model_validate_json(result_json)
 
     async def generate(
         self,
         prompt: str,
         temperature: float = 0.3,
         max_tokens: int = 1024,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+        tier: Optional[str] = None,
+        latency_slo_ms: Optional[float] = None,
     ) -> str:
         """Generate raw text response.
 
@@ -150,50 +616,517 @@ IMPORTANT: Return ONLY valid JSON matching the requested schema. Do not include
             prompt: Input prompt
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            priority: PRIORITY_INTERACTIVE or PRIORITY_BACKGROUND
+            timeout: Maximum seconds to wait, queueing and retries included
+                     (default GEMINI_TIMEOUT)
+            model: Model to use; routed by tier, latency SLO or prompt size if omitted
+            tier: Requested model tier (light, standard, heavy)
+            latency_slo_ms: Target latency; routes to the most capable model
+                            whose recent p95 latency meets it
 
         Returns:
             Generated text response
 
         Raises:
+            GeminiOverloaded: If the scheduler queue is full
+            GeminiUnavailable: If the circuit breaker is open
+            asyncio.TimeoutError: If the deadline passed
             Exception: If Gemini is unavailable or generation fails
         """
         if not self.available:
             raise Exception("Gemini not available — set GOOGLE_API_KEY")
 
-        loop = asyncio.get_event_loop()
+        model_name = model or self.route(prompt, tier=tier, latency_slo_ms=latency_slo_ms)
+        from services.response_cache import cache_key
+        key = cache_key(model_name, temperature, max_tokens, prompt)
+        cached = await self._cached_response(key)
+        if cached is not None:
+            return cached
+
+        deadline = self._deadline(timeout)
+
+        async def _call() -> str:
+            started = time.perf_counter()
+            completion = await self._attempts(
+                lambda: self._complete(prompt, temperature, max_tokens, model_name),
+                lambda: self.scheduler.deadline(key, deadline),
+            )
+            latency_ms = (time.perf_counter() - started) * 1000
+
+            result_text = completion.text.strip()
+
+            input_tokens, output_tokens, estimated = _token_counts(completion, prompt, completion.text)
+            self.usage_stats.log_request(
+                input_tokens, output_tokens, model_name, latency_ms, METHOD_GENERATE, estimated
+            )
+
+            await self._remember_response(key, model_name, result_text)
+            return result_text
+
+        return await self._run_until(deadline, self.scheduler.run(key, priority, _call, deadline))
+
+    async def generate_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.3,
+        max_tokens: int = 1024,
+        priority: int = PRIORITY_INTERACTIVE,
+        timeout: Optional[float] = None,
+        model: Optional[str] = None,
+        tier: Optional[str] = None,
+        latency_slo_ms: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Generate a raw text response, yielding chunks as they arrive.
+
+        Closing the async iterator early (e.g. the HTTP client went away)
+        cancels the generation upstream. A cached response is yielded as a
+        single chunk. Streams are not coalesced or retried, and hold a
+        scheduler slot until they finish. The deadline (default
+        GEMINI_TIMEOUT) applies to the first chunk. model, tier and
+        latency_slo_ms work as in generate().
+
+        Raises:
+            GeminiOverloaded: If the scheduler queue is full
+            GeminiUnavailable: If the circuit breaker is open
+            asyncio.TimeoutError: If no chunk arrived before the deadline
+            Exception: If Gemini is unavailable or generation fails
+        """
+        if not self.available:
+            raise Exception("Gemini not available — set GOOGLE_API_KEY")
+
+        model_name = model or self.route(prompt, tier=tier, latency_slo_ms=latency_slo_ms)
+        from services.response_cache import cache_key
+        key = cache_key(model_name, temperature, max_tokens, prompt)
+        cached = await self._cached_response(key)
+        if cached is not None:
+            yield cached
+            return
+
+        deadline = self._deadline(timeout)
+        if not self.breaker.allow():
+            raise GeminiUnavailable("Gemini circuit is open")
+
+        # Whether the breaker has this call's outcome; if not, allow() is released
+        reported = False
+        try:
+            async with self.scheduler.slot(priority):
+                if deadline - asyncio.get_running_loop().time() <= 0:
+                    # Spent waiting for a slot; Gemini was never called
+                    self.timeouts += 1
+                    raise asyncio.TimeoutError()
+
+                stream = self._complete_stream(prompt, temperature, max_tokens, model_name)
+                pieces = []
+                last = None  # The latest chunk carries the running token counts
+                started = time.perf_counter()
+                try:
+                    try:
+                        first = await self._run_until(deadline, stream.__anext__())
+                    except StopAsyncIteration:
+                        first = None
+                    except Exception as e:
+                        reported = True
+                        if _retryable(e):
+                            self.breaker.record_failure()
+                        else:
+                            self.breaker.record_success()
+                        raise
+                    # Gemini is answering
+                    reported = True
+                    self.breaker.record_success()
+                    if first is not None:
+                        last = first
+                        pieces.append(first.text)
+                        if first.text:
+                            yield first.text
+                        async for chunk in stream:
+                            if chunk.input_tokens is not None:
+                                last = chunk
+                            pieces.append(chunk.text)
+                            if chunk.text:
+                                yield chunk.text
+                    # Only complete responses are cached
+                    await self._remember_response(key, model_name, "".join(pieces).strip())
+                finally:
+                    await stream.aclose()
+                    # Track usage, including partial output of an interrupted stream
+                    if pieces:
+                        input_tokens, output_tokens, estimated = _token_counts(
+                            last, prompt, "".join(pieces)
+                        )
+                        self.usage_stats.log_request(
+                            input_tokens,
+                            output_tokens,
+                            model_name,
+                            (time.perf_counter() - started) * 1000,
+                            METHOD_STREAM,
+                            estimated,
+                        )
+        finally:
+            if not reported:
+                self.breaker.release()
+
+    def route(
+        self,
+        prompt: str,
+        tier: Optional[str] = None,
+        latency_slo_ms: Optional[float] = None,
+    ) -> str:
+        """Model for a prompt: by tier, by latency SLO, or by estimated input tokens."""
+        return self.router.route(
+            input_tokens=len(prompt) // 4,
+            tier=tier,
+            latency_slo_ms=latency_slo_ms,
+            observed_latency_ms=self.usage_stats.latency_by_model(),
+        )
+
+    def _deadline(self, timeout: Optional[float]) -> float:
+        return asyncio.get_running_loop().time() + (self.timeout if timeout is None else timeout)
+
+    async def _run_until(self, deadline: float, awaitable: Awaitable[Any]) -> Any:
+        try:
+            return await asyncio.wait_for(awaitable, timeout=max(deadline - asyncio.get_running_loop().time(), 0))
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+
+    async def _attempts(
+        self, attempt: Callable[[], Awaitable[Any]], deadline: Callable[[], float]
+    ) -> Any:
+        """Run attempt() until one succeeds, within the deadline.
+
+        deadline() is read again on every wait, so a caller joining the
+        shared call with a longer budget extends it.
+
+        A new attempt starts when the previous one failed with a transient
+        error (after a short backoff) or, with hedging on, has not answered
+        within hedge_after seconds; the first success wins and the others
+        are cancelled. At most max_attempts are made. The outcome is
+        recorded on the circuit breaker, which is checked first: transient
+        errors, and timeouts of attempts in flight, count as failures; any
+        other answer from Gemini (even an error such as a 400) as success.
+
+        A deadline already spent waiting for a scheduler slot fails with
+        asyncio.TimeoutError before anything is sent. Local queueing is not
+        Gemini's failure, so the breaker is left alone.
+        """
+        loop = asyncio.get_running_loop()
+        if deadline() - loop.time() <= 0:
+            raise asyncio.TimeoutError()
+        if not self.breaker.allow():
+            raise GeminiUnavailable("Gemini circuit is open")
+
+        pending: set = set()
+        started = 0
+        last_error: Optional[BaseException] = None
+        launch = True
+        try:
+            while True:
+                remaining = deadline() - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                if launch and started < self.max_attempts:
+                    if started:
+                        if pending:
+                            self.hedges += 1
+                        else:
+                            self.retries += 1
+                    pending.add(asyncio.ensure_future(attempt()))
+                    started += 1
+
+                hedge = self.hedge_after > 0 and started < self.max_attempts
+                wait = min(remaining, self.hedge_after) if hedge else remaining
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+                # Nothing finished: time to hedge (or to check the deadline again)
+                launch = not done and hedge
+                for task in done:
+                    if task.exception() is None:
+                        self.breaker.record_success()
+                        return task.result()
+                    last_error = task.exception()
+                    if not _retryable(last_error):
+                        raise last_error
+                if done and not pending:
+                    if started >= self.max_attempts:
+                        raise last_error
+                    # Back off briefly before retrying a transient failure
+                    await asyncio.sleep(min(0.2 * started, max(deadline() - loop.time(), 0)))
+                    launch = True
+        except BaseException as e:
+            if isinstance(e, Exception):
+                if _retryable(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()  # Gemini answered; the request was at fault
+            else:
+                self.breaker.release()
+            raise
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _sdk_model(self, model_name: str):
+        """SDK model object per model name (GEMINI_TRANSPORT=sdk)."""
+        if model_name == self.model_name:
+            return self.model
+        if model_name not in self._sdk_models:
+            import google.generativeai as genai
+            self._sdk_models[model_name] = genai.GenerativeModel(model_name)
+        return self._sdk_models[model_name]
+
+    async def _complete(
+        self, prompt: str, temperature: float, max_tokens: int, model_name: Optional[str] = None
+    ):
+        """One generation over the configured transport, as a Completion."""
+        model_name = model_name or self.model_name
+        if self._rest is not None:
+            return await self._rest.generate_content(model_name, prompt, temperature, max_tokens)
+
+        sdk_model = self._sdk_model(model_name)
+        loop = asyncio.get_running_loop()
         response = await loop.run_in_executor(
             _thread_pool,
-            lambda: self.model.generate_content(
-                prompt,
-                generation_config=genai.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=max_tokens,
-                ),
+            lambda: sdk_model.generate_content(
+                prompt, generation_config=_sdk_config(temperature, max_tokens)
             ),
         )
+        return _sdk_completion(response)
+
+    async def _complete_stream(
+        self, prompt: str, temperature: float, max_tokens: int, model_name: Optional[str] = None
+    ) -> AsyncIterator[Any]:
+        """Streamed generation over the configured transport, as Completion chunks.
 
-        result_text = response.text.strip()
+        With the SDK, its streaming iterator is consumed on the thread pool
+        and each chunk handed to the event loop through a queue; on close
+        the pool thread stops reading and drops the SDK stream.
+        """
+        model_name = model_name or self.model_name
+        if self._rest is not None:
+            stream = self._rest.stream_generate_content(model_name, prompt, temperature, max_tokens)
+            try:
+                async for chunk in stream:
+                    yield chunk
+            finally:
+                await stream.aclose()
+            return
+
+        sdk_model = self._sdk_model(model_name)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        cancelled = threading.Event()
 
-        # Track usage
-        input_tokens = len(prompt) // 4
-        output_tokens = len(result_text) // 4
-        self.usage_stats.log_request(input_tokens, output_tokens)
+        def _put(item):
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+            except RuntimeError:
+                pass  # Event loop already closed
 
-        return result_text
+        def _produce():
+            try:
+                response = sdk_model.generate_content(
+                    prompt,
+                    generation_config=_sdk_config(temperature, max_tokens),
+                    stream=True,
+                )
+                for chunk in response:
+                    if cancelled.is_set():
+                        break
+                    completion = _sdk_completion(chunk)
+                    if completion.text or completion.input_tokens is not None:
+                        _put(completion)
+            except Exception as e:
+                _put(e)
+            finally:
+                _put(_STREAM_END)
+
+        loop.run_in_executor(_thread_pool, _produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _STREAM_END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    async def _cached_response(self, key: str) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.response_cache.get, key)
+        except Exception as e:
+            logger.warning(f"Gemini response cache read failed: {e}")
+            return None
+
+    async def _remember_response(self, key: str, model_name: str, text: str):
+        if self.response_cache is None or not text:
+            return
+        try:
+            await asyncio.to_thread(self.response_cache.put, key, model_name, text)
+        except Exception as e:
+            logger.warning(f"Gemini response cache write failed: {e}")
 
     def get_usage_stats(self) -> Dict[str, Any]:
-        return {
+        stats = {
             "total_requests": self.usage_stats.total_requests,
             "total_input_tokens": self.usage_stats.total_input_tokens,
             "total_output_tokens": self.usage_stats.total_output_tokens,
             "total_cost_usd": round(self.usage_stats.total_cost_usd, 4),
             "last_reset": self.usage_stats.last_reset.isoformat(),
             "model_name": self.model_name,
+            "models": self.router.models,
+            "by_model": {
+                model: usage.to_dict() for model, usage in self.usage_stats.by_model.items()
+            },
+            "by_method": {
+                method: usage.to_dict() for method, usage in self.usage_stats.by_method.items()
+            },
+            "transport": self.transport,
             "available": self.available,
+            "response_cache": (
+                self.response_cache.stats() if self.response_cache else {"enabled": False}
+            ),
+            "scheduler": self.scheduler.stats(),
+            "circuit_breaker": self.breaker.stats(),
+            "deadlines": {
+                "timeout_seconds": self.timeout,
+                "max_attempts": self.max_attempts,
+                "hedge_after_seconds": self.hedge_after or None,
+                "timeouts": self.timeouts,
+                "retries": self.retries,
+                "hedges": self.hedges,
+            },
         }
+        if self.transport == "fake":
+            stats["fake_backend"] = self._rest.stats()
+        return stats
 
     def reset_usage_stats(self):
-        self.usage_stats = UsageStats()
+        # Keep what the usage store has not received yet, and routing latencies
+        self.usage_stats = UsageStats(
+            pending=self.usage_stats.pending, recent_latency=self.usage_stats.recent_latency
+        )
+
+    def _get_usage_store(self):
+        with self._usage_store_lock:
+            if self._usage_store is None:
+                from services.usage_store import USAGE_STORE_PATH, UsageStore
+                self._usage_store = UsageStore(
+                    USAGE_STORE_PATH, retention_seconds=self.usage_retention_days * 86400
+                )
+            return self._usage_store
+
+    async def flush_usage(self) -> int:
+        """Write usage since the last flush to the usage store.
+
+        Pending usage is taken, and put back if the write fails, on the
+        event loop, where log_request adds to it; only the SQLite write runs
+        on a worker thread. Flushes run one at a time: a write that outlives
+        its caller (e.g. the cancelled flusher) is waited for.
+
+        Returns:
+            Number of (model, method) rows written
+        """
+        while self._usage_write is not None:
+            await asyncio.shield(self._usage_write)
+        period_start, period_end = self._usage_period_start, time.time()
+        pending = self.usage_stats.drain_pending()
+        self._usage_period_start = period_end
+        if not pending:
+            return 0
+        self._usage_write = asyncio.ensure_future(self._write_usage(period_start, period_end, pending))
+        return await asyncio.shield(self._usage_write)
+
+    async def _write_usage(self, period_start: float, period_end: float, pending: PendingUsage) -> int:
+        try:
+            return await asyncio.to_thread(
+                lambda: self._get_usage_store().record(period_start, period_end, pending)
+            )
+        except Exception as e:
+            logger.warning(f"Gemini usage flush failed: {e}")
+            # Put it back for the next flush
+            for model, methods in pending.items():
+                for method, bucket in methods.items():
+                    self.usage_stats.pending.setdefault(model, {}).setdefault(
+                        method, UsageBucket()
+                    ).merge(bucket)
+            self._usage_period_start = period_start
+            return 0
+        finally:
+            self._usage_write = None
+
+    def start_usage_flusher(self):
+        """Flush usage every usage_flush_interval seconds (no-op if 0)."""
+        if self.usage_flush_interval <= 0 or self._usage_flusher is not None:
+            return
+
+        async def _run():
+            while True:
+                await asyncio.sleep(self.usage_flush_interval)
+                await self.flush_usage()
+
+        self._usage_flusher = asyncio.get_running_loop().create_task(_run())
+
+    async def usage_window(self, seconds: float) -> Dict[str, Any]:
+        """Usage over the last `seconds`, from the usage store plus unflushed usage.
+
+        Raises:
+            ValueError: If usage history is disabled (GEMINI_USAGE_FLUSH_INTERVAL=0)
+        """
+        if self.usage_flush_interval <= 0:
+            raise ValueError("Usage history is disabled (GEMINI_USAGE_FLUSH_INTERVAL=0)")
+        now = time.time()
+        by_model, by_method = await asyncio.to_thread(
+            lambda: self._get_usage_store().window(since=now - seconds, until=now)
+        )
+        # Unflushed usage is recent by definition (flushes are at most an
+        # interval apart); read here on the event loop, where it is written
+        merge_pending(self.usage_stats.pending, by_model, by_method)
+
+        totals = UsageBucket()
+        for usage in by_model.values():
+            totals.merge(usage)
+        return {
+            "window_seconds": seconds,
+            "since": datetime.fromtimestamp(now - seconds).isoformat(),
+            **totals.to_dict(),
+            "by_model": {model: usage.to_dict() for model, usage in by_model.items()},
+            "by_method": {method: usage.to_dict() for method, usage in by_method.items()},
+        }
+
+    async def aclose(self):
+        """Stop the usage flusher (flushing once more) and close pooled connections."""
+        if self._usage_flusher is not None:
+            self._usage_flusher.cancel()
+            self._usage_flusher = None
+            # Waits for a write the cancelled flusher left running
+            await self.flush_usage()
+        if self._rest is not None:
+            await self._rest.aclose()
+
+
+def _sdk_completion(response):
+    """Completion from an SDK response or stream chunk.
+
+    Older google-generativeai releases do not expose usage_metadata; the
+    token counts are then left to the estimate.
+    """
+    from services.gemini_transport import Completion
+    usage = getattr(response, "usage_metadata", None)
+    return Completion(
+        response.text,
+        getattr(usage, "prompt_token_count", None) if usage else None,
+        getattr(usage, "candidates_token_count", None) if usage else None,
+    )
+
+
+def _sdk_config(temperature: float, max_tokens: int):
+    import google.generativeai as genai
+    return genai.GenerationConfig(temperature=temperature, max_output_tokens=max_tokens)
 
 
 # Singleton
@@ -205,3 +1138,11 @@ def get_gemini_client() -> GeminiClient:
     if _gemini_client is None:
         _gemini_client = GeminiClient()
     return _gemini_client
+
+
+async def close_gemini_client():
+    """Flush usage and close the shared client, if one was created."""
+    global _gemini_client
+    if _gemini_client is not None:
+        await _gemini_client.aclose()
+        _gemini_client = None
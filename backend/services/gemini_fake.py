@@ -0,0 +1,213 @@
+"""
+Fake Gemini Backend — Lotus v2
+
+A local stand-in for the Gemini API (GEMINI_TRANSPORT=fake), for load
+testing the AI path without an API key or spend. It sits where the REST
+transport does, so the scheduler, deadlines, retries, circuit breaker,
+response cache and fallbacks all run for real:
+
+  - Latency per call is drawn from GEMINI_FAKE_LATENCY:
+      fixed:MS            e.g. fixed:300
+      uniform:MIN,MAX     e.g. uniform:200,900
+      lognormal:MEDIAN,SIGMA   e.g. lognormal:600,0.5 (long right tail)
+  - GEMINI_FAKE_ERROR_RATE of calls fail with a retryable 503, and
+    GEMINI_FAKE_HANG_RATE never answer (so the caller's deadline fires).
+  - GEMINI_FAKE_BLOCKING=true sleeps on the shared SDK thread pool instead
+    of the event loop, to reproduce the SDK transport's executor limits.
+  - Responses come from GEMINI_FAKE_RESPONSES, a JSON list of
+    {"match": regex, "response": template} rules (first match wins), or
+    the built-in rules: an answer per task label for batch assist JSON
+    prompts, otherwise a short canned answer. Templates may use {model},
+    {input_tokens} and {labels_json}.
+  - Streams yield the response a few words at a time, one chunk every
+    GEMINI_FAKE_STREAM_INTERVAL_MS after the first.
+  - GEMINI_FAKE_SEED makes latencies and failures reproducible.
+
+Token counts are reported as usage metadata (4 characters per token).
+
+Usage:
+    GEMINI_TRANSPORT=fake GEMINI_FAKE_LATENCY=lognormal:600,0.5 python main.py
+"""
+
+import os
+import re
+import json
+import math
+import random
+import asyncio
+import logging
+import threading
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from services.gemini_transport import Completion, GeminiAPIError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY = "lognormal:600,0.4"
+# A hanging call gives up after this long, well past any sensible deadline
+HANG_SECONDS = 3600.0
+
+_LABEL_RE = re.compile(r"^### (T\d+):", re.MULTILINE)
+
+DEFAULT_RULES = [
+    {
+        # Batch assist (structured output, one entry per task label)
+        "match": r'"tasks": \[',
+        "response": '{{"tasks": {labels_json}}}',
+    },
+    {
+        "match": r"",
+        "response": (
+            "Fake answer from {model}. Break the task into small steps, "
+            "check similar past tasks for pitfalls, and ship the smallest useful change first."
+        ),
+    },
+]
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Latency sampler (milliseconds) for a GEMINI_FAKE_LATENCY spec."""
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(
+        f"Invalid GEMINI_FAKE_LATENCY {spec!r} (fixed:MS, uniform:MIN,MAX or lognormal:MEDIAN,SIGMA)"
+    )
+
+
+def load_rules(path: Optional[str]) -> List[dict]:
+    if not path:
+        return DEFAULT_RULES
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    # Anything unmatched still gets the canned answer
+    return rules + DEFAULT_RULES[-1:]
+
+
+class FakeGeminiTransport:
+    """Drop-in for GeminiRestTransport that answers locally."""
+
+    def __init__(
+        self,
+        latency: str = DEFAULT_LATENCY,
+        error_rate: float = 0.0,
+        hang_rate: float = 0.0,
+        stream_interval_ms: float = 20.0,
+        rules: Optional[List[dict]] = None,
+        seed: Optional[int] = None,
+        executor=None,
+    ):
+        self.sample_latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.stream_interval_ms = stream_interval_ms
+        self.rules = [(re.compile(rule["match"]), rule["response"]) for rule in (rules or DEFAULT_RULES)]
+        # Blocking mode: sleep on this executor (the SDK thread pool)
+        self.executor = executor
+        self.blocking = executor is not None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # Releases blocked pool threads (hanging calls) on close
+        self._closed = threading.Event()
+        self.calls = 0
+        self.errors = 0
+        self.hangs = 0
+
+    @classmethod
+    def from_env(cls, executor) -> "FakeGeminiTransport":
+        seed = os.getenv("GEMINI_FAKE_SEED")
+        blocking = os.getenv("GEMINI_FAKE_BLOCKING", "false").lower() == "true"
+        return cls(
+            latency=os.getenv("GEMINI_FAKE_LATENCY", DEFAULT_LATENCY),
+            error_rate=float(os.getenv("GEMINI_FAKE_ERROR_RATE", "0")),
+            hang_rate=float(os.getenv("GEMINI_FAKE_HANG_RATE", "0")),
+            stream_interval_ms=float(os.getenv("GEMINI_FAKE_STREAM_INTERVAL_MS", "20")),
+            rules=load_rules(os.getenv("GEMINI_FAKE_RESPONSES")),
+            seed=int(seed) if seed else None,
+            executor=executor if blocking else None,
+        )
+
+    def _draw(self) -> Tuple[float, str]:
+        """(latency seconds, outcome: "ok", "error" or "hang") for one call."""
+        with self._lock:
+            self.calls += 1
+            latency = max(self.sample_latency(self._rng), 0.0) / 1000
+            roll = self._rng.random()
+        if roll < self.hang_rate:
+            return HANG_SECONDS, "hang"
+        if roll < self.hang_rate + self.error_rate:
+            return latency, "error"
+        return latency, "ok"
+
+    async def _wait(self, seconds: float):
+        if self.blocking:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._closed.wait, seconds)
+        else:
+            await asyncio.sleep(seconds)
+
+    async def _call(self) -> None:
+        latency, outcome = self._draw()
+        if outcome == "hang":
+            with self._lock:
+                self.hangs += 1
+        await self._wait(latency)
+        if outcome == "error":
+            with self._lock:
+                self.errors += 1
+            raise GeminiAPIError("Gemini API error 503: fake backend error", status_code=503)
+
+    def respond(self, model: str, prompt: str) -> str:
+        """Response text for a prompt, from the first matching rule."""
+        labels = _LABEL_RE.findall(prompt)
+        values = {
+            "model": model,
+            "input_tokens": len(prompt) // 4,
+            "labels_json": json.dumps(
+                [{"task": label, "advice": f"Fake advice for {label} from {model}."} for label in labels]
+            ),
+        }
+        for pattern, template in self.rules:
+            if pattern.search(prompt):
+                return template.format(**values)
+        return ""
+
+    async def generate_content(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Completion:
+        await self._call()
+        text = self.respond(model, prompt)
+        return Completion(text, len(prompt) // 4, len(text) // 4)
+
+    async def stream_generate_content(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> AsyncIterator[Completion]:
+        await self._call()
+        text = self.respond(model, prompt)
+        words = text.split(" ")
+        for i in range(0, len(words), 4):
+            if i:
+                await self._wait(self.stream_interval_ms / 1000)
+            chunk = " ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "")
+            yield Completion(chunk)
+        yield Completion("", len(prompt) // 4, len(text) // 4)
+
+    def stats(self):
+        return {"calls": self.calls, "errors": self.errors, "hangs": self.hangs, "blocking": self.blocking}
+
+    async def aclose(self):
+        self._closed.set()
@@ -0,0 +1,213 @@
+"""
+Gemini REST Transport — Lotus v2
+
+Native async transport for the Gemini API: calls the generateContent and
+streamGenerateContent REST endpoints with one pooled, keep-alive
+httpx.AsyncClient, instead of running the synchronous SDK on a small
+thread pool. In-flight requests are bounded only by a semaphore
+(GEMINI_MAX_CONCURRENCY), not by worker threads.
+
+GEMINI_API_BASE points the transport at another host, e.g. a local stub
+server in tests or a proxy.
+
+Responses are returned as Completion tuples: the text plus the prompt and
+candidate token counts from the response's usageMetadata (None if absent).
+
+Usage:
+    from services.gemini_transport import GeminiRestTransport
+    transport = GeminiRestTransport(api_key, base_url, max_concurrency=16)
+    completion = await transport.generate_content(model, prompt, temperature, max_tokens)
+    completion.text, completion.input_tokens, completion.output_tokens
+"""
+
+import json
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Dict, NamedTuple, Optional, Set
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE = "https://generativelanguage.googleapis.com"
+API_VERSION = "v1beta"
+# Connect/read timeout per request; overall deadlines are the caller's job
+DEFAULT_TIMEOUT_SECONDS = 60.0
+
+
+class GeminiAPIError(Exception):
+    """Error response (or an unusable response) from the Gemini REST API."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class Completion(NamedTuple):
+    """Generated text and the token counts Gemini reported for it.
+
+    For a streamed chunk, the counts are those of the response so far
+    (Gemini reports running totals); usually only the last chunk has them.
+    """
+    text: str
+    input_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+def _request_body(prompt: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens},
+    }
+
+
+def _response_text(payload: Dict[str, Any], allow_empty: bool = False) -> str:
+    """Concatenated text parts of the first candidate."""
+    candidates = payload.get("candidates") or []
+    if not candidates:
+        if allow_empty:
+            return ""
+        reason = (payload.get("promptFeedback") or {}).get("blockReason", "no candidates")
+        raise GeminiAPIError(f"Gemini returned no response ({reason})")
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    return "".join(part.get("text", "") for part in parts)
+
+
+def _completion(payload: Dict[str, Any], allow_empty: bool = False) -> Completion:
+    usage = payload.get("usageMetadata") or {}
+    return Completion(
+        _response_text(payload, allow_empty),
+        usage.get("promptTokenCount"),
+        usage.get("candidatesTokenCount"),
+    )
+
+
+class GeminiRestTransport:
+    """Async Gemini REST client with a shared connection pool."""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = DEFAULT_API_BASE,
+        max_concurrency: int = 16,
+        timeout: float = DEFAULT_TIMEOUT_SECONDS,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # Created on first use: both belong to the event loop they are used on
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Closes of clients left behind on another loop, kept until done
+        self._closing: Set[asyncio.Task] = set()
+
+    def _session(self):
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._close_stale(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={"x-goog-api-key": self.api_key},
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._client, self._semaphore
+
+    def _close_stale(self, client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+        """Close a client created on another event loop, without waiting.
+
+        Its connections belong to that loop, so they are closed there while
+        it still runs; otherwise the close runs here and whatever the dead
+        loop can no longer close is left to the garbage collector.
+        """
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(_close_quietly(client), loop)
+            return
+        task = asyncio.get_running_loop().create_task(_close_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    def _raise_for_status(response: httpx.Response, body: bytes):
+        if response.status_code < 400:
+            return
+        try:
+            message = json.loads(body)["error"]["message"]
+        except Exception:
+            message = body[:200].decode("utf-8", "replace")
+        raise GeminiAPIError(
+            f"Gemini API error {response.status_code}: {message}", status_code=response.status_code
+        )
+
+    async def generate_content(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> Completion:
+        """Generate a complete response (models/{model}:generateContent)."""
+        client, semaphore = self._session()
+        async with semaphore:
+            response = await client.post(
+                f"/{API_VERSION}/models/{model}:generateContent",
+                json=_request_body(prompt, temperature, max_tokens),
+            )
+        self._raise_for_status(response, response.content)
+        return _completion(response.json())
+
+    async def stream_generate_content(
+        self,
+        model: str,
+        prompt: str,
+        temperature: float,
+        max_tokens: int,
+    ) -> AsyncIterator[Completion]:
+        """Yield chunks as they arrive (models/{model}:streamGenerateContent, SSE).
+
+        Closing the iterator early closes the HTTP response, which cancels
+        the generation upstream.
+        """
+        client, semaphore = self._session()
+        async with semaphore:
+            async with client.stream(
+                "POST",
+                f"/{API_VERSION}/models/{model}:streamGenerateContent",
+                params={"alt": "sse"},
+                json=_request_body(prompt, temperature, max_tokens),
+            ) as response:
+                if response.status_code >= 400:
+                    self._raise_for_status(response, await response.aread())
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk = _completion(json.loads(line[5:]), allow_empty=True)
+                    if chunk.text or chunk.output_tokens is not None:
+                        yield chunk
+
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        if self._client is not None:
+            if self._loop is loop:
+                await self._client.aclose()
+            else:
+                self._close_stale(self._client, self._loop)
+        await asyncio.gather(*(task for task in self._closing if task.get_loop() is loop))
+        self._client = None
+        self._semaphore = None
+        self._loop = None
+
+
+async def _close_quietly(client: httpx.AsyncClient):
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.debug(f"Closing a stale Gemini HTTP client failed: {e}")
@@ -0,0 +1,143 @@
+"""
+Model Router — Lotus v2
+
+Tiered model selection for GeminiClient. Several Gemini models can be
+configured by tier (GEMINI_MODELS="light=gemini-2.0-flash-lite,heavy=gemini-1.5-pro");
+the "standard" tier is always GEMINI_MODEL. Each request is routed to one:
+
+  1. A caller-supplied tier, if that tier is configured (else "standard").
+  2. A latency SLO: the most capable model whose recent p95 latency meets
+     it, or else the fastest observed model. Models without recent
+     observations are not assumed to meet it; with none observed at all,
+     "standard".
+  3. Estimated input tokens: prompts up to GEMINI_LIGHT_MAX_INPUT_TOKENS go
+     to "light", from GEMINI_HEAVY_MIN_INPUT_TOKENS to "heavy", the rest
+     to "standard" — for each, only if that tier is configured.
+
+Also holds the per-model pricing table used for cost accounting.
+
+Usage:
+    from services.model_router import ModelRouter
+    router = ModelRouter.from_env("gemini-2.0-flash-exp")
+    model = router.route(input_tokens=350)
+"""
+
+import os
+import logging
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TIER_LIGHT = "light"
+TIER_STANDARD = "standard"
+TIER_HEAVY = "heavy"
+# Least to most capable
+MODEL_TIERS = (TIER_LIGHT, TIER_STANDARD, TIER_HEAVY)
+
+# USD per 1M (input, output) tokens, matched by longest model-name prefix
+MODEL_PRICING: Dict[str, Tuple[float, float]] = {
+    "gemini-2.0-flash-lite": (0.075, 0.30),
+    "gemini-2.0-flash": (0.075, 0.30),
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-pro": (1.25, 10.00),
+}
+# Unknown models are priced like Gemini 2.0 Flash
+DEFAULT_PRICING = (0.075, 0.30)
+
+
+def model_pricing(model_name: str) -> Tuple[float, float]:
+    """(input, output) USD per 1M tokens for a model."""
+    matches = [prefix for prefix in MODEL_PRICING if model_name.startswith(prefix)]
+    return MODEL_PRICING[max(matches, key=len)] if matches else DEFAULT_PRICING
+
+
+def request_cost(model_name: str, input_tokens: int, output_tokens: int) -> float:
+    input_price, output_price = model_pricing(model_name)
+    return (input_tokens / 1_000_000) * input_price + (output_tokens / 1_000_000) * output_price
+
+
+def parse_models(spec: str) -> Dict[str, str]:
+    """Parse "tier=model,tier=model" (unknown tiers are ignored with a warning)."""
+    models = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tier, _, model = item.partition("=")
+        tier, model = tier.strip().lower(), model.strip()
+        if tier not in MODEL_TIERS or not model:
+            logger.warning(f"Ignoring GEMINI_MODELS entry {item!r} (tiers: {', '.join(MODEL_TIERS)})")
+            continue
+        models[tier] = model
+    return models
+
+
+class ModelRouter:
+    """Picks a configured model for each request."""
+
+    def __init__(
+        self,
+        models: Dict[str, str],
+        light_max_input_tokens: int = 2000,
+        heavy_min_input_tokens: int = 30000,
+    ):
+        if TIER_STANDARD not in models:
+            raise ValueError("A standard-tier model is required")
+        self.models = {tier: models[tier] for tier in MODEL_TIERS if tier in models}
+        self.light_max_input_tokens = light_max_input_tokens
+        self.heavy_min_input_tokens = heavy_min_input_tokens
+
+    @classmethod
+    def from_env(cls, default_model: str) -> "ModelRouter":
+        models = parse_models(os.getenv("GEMINI_MODELS", ""))
+        # GEMINI_MODEL stays the standard model
+        models[TIER_STANDARD] = default_model
+        return cls(
+            models,
+            light_max_input_tokens=int(os.getenv("GEMINI_LIGHT_MAX_INPUT_TOKENS", "2000")),
+            heavy_min_input_tokens=int(os.getenv("GEMINI_HEAVY_MIN_INPUT_TOKENS", "30000")),
+        )
+
+    @property
+    def default_model(self) -> str:
+        return self.models[TIER_STANDARD]
+
+    def route(
+        self,
+        input_tokens: int,
+        tier: Optional[str] = None,
+        latency_slo_ms: Optional[float] = None,
+        observed_latency_ms: Optional[Dict[str, float]] = None,
+    ) -> str:
+        """Model name for a request.
+
+        Args:
+            input_tokens: Estimated prompt tokens
+            tier: Caller-requested tier (light, standard or heavy)
+            latency_slo_ms: Target latency; overrides token-based routing
+            observed_latency_ms: Recent (p95) latency per model; models
+                                 missing from it are not picked for an SLO
+        """
+        if tier is not None:
+            return self.models.get(tier, self.default_model)
+
+        if latency_slo_ms is not None:
+            observed = {
+                model: observed_latency_ms[model]
+                for model in self.models.values()
+                if observed_latency_ms and model in observed_latency_ms
+            }
+            for candidate in reversed(MODEL_TIERS):
+                model = self.models.get(candidate)
+                if model in observed and observed[model] <= latency_slo_ms:
+                    return model
+            return min(observed, key=observed.get) if observed else self.default_model
+
+        if input_tokens <= self.light_max_input_tokens and TIER_LIGHT in self.models:
+            return self.models[TIER_LIGHT]
+        if input_tokens >= self.heavy_min_input_tokens and TIER_HEAVY in self.models:
+            return self.models[TIER_HEAVY]
+        return self.default_model
+
+    def tier_of(self, model_name: str) -> Optional[str]:
+        return next((tier for tier, model in self.models.items() if model == model_name), None)
@@ -0,0 +1,153 @@
+"""
+Reindex Jobs — Intelligence Flywheel
+
+Runs semantic index rebuilds as background jobs so POST /api/ai/reindex
+returns immediately instead of encoding every case study inside the request.
+
+Each job builds a shadow index and publishes it atomically when finished
+(see SemanticRAG.build_index), so search keeps serving the previous snapshot
+while the rebuild runs. Only one rebuild runs at a time; starting a job while
+another is active returns the active one.
+
+Usage:
+    from services.reindex_jobs import start_reindex_job, get_reindex_job
+    job = start_reindex_job()
+    get_reindex_job(job.id).progress
+"""
+
+import asyncio
+import logging
+import threading
+import uuid
+import concurrent.futures
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from pydantic import BaseModel, PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Single worker: rebuilds are serialized and never compete for the model
+_reindex_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="reindex")
+
+MAX_JOB_HISTORY = 20
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+ACTIVE_JOB_STATUSES = {JOB_PENDING, JOB_RUNNING}
+
+
+class ReindexJob(BaseModel):
+    """State of a single background index rebuild."""
+    id: str
+    status: str = JOB_PENDING
+    processed: int = 0
+    total: int = 0
+    count: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    _cancel_event: threading.Event = PrivateAttr(default_factory=threading.Event)
+
+    @property
+    def progress(self) -> float:
+        if self.total == 0:
+            return 1.0 if self.status == JOB_COMPLETED else 0.0
+        return self.processed / self.total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "processed": self.processed,
+            "total": self.total,
+            "progress": round(self.progress, 4),
+            "count": self.count,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
+
+
+_jobs: "OrderedDict[str, ReindexJob]" = OrderedDict()
+_jobs_lock = threading.Lock()
+
+
+def _run_job(job: ReindexJob):
+    """Execute a rebuild on the reindex worker thread."""
+    from services.semantic_rag import get_rag_service, ReindexCancelled
+
+    if job._cancel_event.is_set():
+        job.status = JOB_CANCELLED
+        job.finished_at = datetime.utcnow()
+        return
+
+    job.status = JOB_RUNNING
+    job.started_at = datetime.utcnow()
+
+    def _progress(processed: int, total: int):
+        job.processed = processed
+        job.total = total
+
+    try:
+        rag = get_rag_service()
+        job.count = rag.build_index(progress=_progress, cancel_event=job._cancel_event)
+        job.status = JOB_COMPLETED
+        logger.info(f"Reindex job {job.id} completed: {job.count} case studies")
+    except ReindexCancelled:
+        job.status = JOB_CANCELLED
+        logger.info(f"Reindex job {job.id} cancelled")
+    except Exception as e:
+        job.status = JOB_FAILED
+        job.error = str(e)
+        logger.error(f"Reindex job {job.id} failed: {e}")
+    finally:
+        job.finished_at = datetime.utcnow()
+
+
+def start_reindex_job() -> ReindexJob:
+    """Queue a background rebuild, or return the one already in progress."""
+    with _jobs_lock:
+        for job in reversed(_jobs.values()):
+            if job.status in ACTIVE_JOB_STATUSES:
+                return job
+
+        job = ReindexJob(id=str(uuid.uuid4()), created_at=datetime.utcnow())
+        _jobs[job.id] = job
+        while len(_jobs) > MAX_JOB_HISTORY:
+            _jobs.popitem(last=False)
+
+    try:
+        loop = asyncio.get_running_loop()
+        loop.run_in_executor(_reindex_pool, _run_job, job)
+    except RuntimeError:
+        # No running loop (scripts, tests) — submit directly
+        _reindex_pool.submit(_run_job, job)
+
+    return job
+
+
+def get_reindex_job(job_id: str) -> Optional[ReindexJob]:
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def cancel_reindex_job(job_id: str) -> Optional[ReindexJob]:
+    """Request cancellation. The live index is never touched by a cancelled job."""
+    job = get_reindex_job(job_id)
+    if job is None:
+        return None
+    if job.status in ACTIVE_JOB_STATUSES:
+        job._cancel_event.set()
+        if job.status == JOB_PENDING:
+            job.status = JOB_CANCELLED
+            job.finished_at = datetime.utcnow()
+    return job
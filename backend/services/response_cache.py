@@ -0,0 +1,158 @@
+"""
+Gemini Response Cache — Lotus v2
+
+Persistent cache of Gemini generations in one SQLite file
+(backend/gemini_cache.db), so re-asking about an unchanged task does not
+pay for another API round trip.
+
+Entries are keyed by a SHA-256 of (model, temperature, max_tokens, kind,
+prompt); "kind" separates raw text from structured output for a given
+schema. Entries older than GEMINI_CACHE_TTL seconds are ignored and
+deleted; beyond GEMINI_CACHE_MAX_ENTRIES the least recently used entries
+are evicted. GEMINI_CACHE_TTL=0 disables the cache.
+
+Usage:
+    from services.response_cache import ResponseCache, cache_key
+    key = cache_key(model_name, temperature, max_tokens, prompt)
+    text = cache.get(key)
+    if text is None:
+        text = ...
+        cache.put(key, model_name, text)
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_CACHE_PATH = Path(__file__).parent.parent / "gemini_cache.db"
+# Puts between recounts of the table; the running count drifts only when
+# several processes share the file
+RECOUNT_INTERVAL = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gemini_responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gemini_responses_used ON gemini_responses (last_used_at);
+CREATE INDEX IF NOT EXISTS idx_gemini_responses_created ON gemini_responses (created_at);
+"""
+
+
+def cache_key(
+    model_name: str,
+    temperature: float,
+    max_tokens: int,
+    prompt: str,
+    kind: str = "text",
+) -> str:
+    """Stable cache key for a generation request."""
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    material = json.dumps([model_name, float(temperature), int(max_tokens), kind, prompt_hash])
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed TTL + LRU cache of generated text. Safe to share between threads."""
+
+    def __init__(self, path: Path, ttl_seconds: float, max_entries: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        # Running row count, so writes and stats() need no COUNT(*)
+        self._size = self._count()
+        self._puts = 0
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM gemini_responses").fetchone()[0]
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM gemini_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] > self.ttl_seconds:
+                self._size -= self._conn.execute(
+                    "DELETE FROM gemini_responses WHERE key = ?", (key,)
+                ).rowcount
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE gemini_responses SET last_used_at = ? WHERE key = ?", (now, key)
+            )
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model_name: str, response: str) -> None:
+        """Store a response, then evict expired and least recently used entries."""
+        now = time.time()
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM gemini_responses WHERE key = ?", (key,)
+            ).fetchone() is not None
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gemini_responses "
+                "(key, model, response, created_at, last_used_at) VALUES (?, ?, ?, ?, ?)",
+                (key, model_name, response, now, now),
+            )
+            self._puts += 1
+            if self._puts % RECOUNT_INTERVAL == 0:
+                self._size = self._count()
+            elif not exists:
+                self._size += 1
+            evicted = self._conn.execute(
+                "DELETE FROM gemini_responses WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+            if self._size - evicted > self.max_entries:
+                evicted += self._conn.execute(
+                    "DELETE FROM gemini_responses WHERE key IN ("
+                    "SELECT key FROM gemini_responses ORDER BY last_used_at LIMIT ?)",
+                    (self._size - evicted - self.max_entries,),
+                ).rowcount
+            self._size -= evicted
+            self.evictions += evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM gemini_responses")
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters only, no query: cheap enough to call on the event loop."""
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "size": self._size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -1,12 +1,46 @@
 """
 Semantic RAG Service — Intelligence Flywheel
 
-Local vector search over completed task case studies using
-sentence-transformers (all-MiniLM-L6-v2) for embeddings and
-numpy cosine similarity for search.
+Local vector search over completed task case studies using a pluggable
+embedder (sentence-transformers all-MiniLM-L6-v2 by default, or a NumPy
+hashing TF-IDF vectorizer — see services/embedders.py) and numpy cosine
+similarity for search.
 
-Index is stored as JSON at backend/.vector_index.json for simplicity.
-No external vector database required.
+Index is stored as JSON at backend/.vector_index.json for simplicity, along
+with the descriptor of the embedder that produced it. An index written by a
+different embedder is ignored until rebuilt. No external vector database
+required.
+
+Case studies are read from the packed case store (services/case_store.py);
+index entries reference them by slug.
+
+Compact mode (RAG_COMPACT_MODE=float16|int8) stores quantized vectors with
+per-vector scales and keeps bulky fields (text, description, notes) out of
+memory; they are read back from the case store for top-k hits only.
+
+search() is hybrid by default: a BM25 index over indexed_text (see
+services/bm25.py) lives in each snapshot next to the vectors, and the dense
+and lexical rankings are merged with reciprocal-rank fusion.
+
+Each snapshot also carries a nearest-neighbour graph: the top RAG_RELATED_K
+most similar case studies per slug, built on rebuild and updated
+incrementally by add_to_index, so related_cases() is a dictionary lookup
+instead of an encode + scan.
+
+search() accepts metadata filters (value_stream, assignee, completed_at
+range) answered from per-snapshot inverted indexes, so similarity is only
+computed over the matching rows.
+
+Entries are keyed by task id: add_to_index upserts, so re-completing a task
+replaces its entry instead of appending a duplicate, and remove_from_index
+tombstones it. Dead rows are masked out of every search until a compaction
+pass (compact_index, or automatic above RAG_AUTO_COMPACT_RATIO) rewrites the
+index without them.
+
+Concurrency: the in-memory index is an immutable IndexSnapshot. Writers
+(add_to_index, build_index) build a new snapshot under a writer lock and
+publish it with a single reference assignment; readers (search) grab the
+current reference once and never lock.
 
 Usage:
     from services.semantic_rag import get_rag_service
@@ -14,183 +48,1226 @@ Usage:
     results = rag.search("deployment pipeline issue", top_k=5)
 """
 
+import os
+import sys
 import json
 import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Optional, Sequence
 
 import numpy as np
 
+from services.bm25 import LexicalIndex, tokenize
+from services.case_store import get_case_store
+from services.embedders import Embedder, create_embedder, legacy_descriptor
+
 logger = logging.getLogger(__name__)
 
-CASE_STUDIES_DIR = Path(__file__).parent.parent / "case_studies"
 INDEX_PATH = Path(__file__).parent.parent / ".vector_index.json"
-MODEL_NAME = "all-MiniLM-L6-v2"
+# Texts per embedder call during a full rebuild
+BUILD_BATCH_SIZE = 32
+
+# Storage dtype per compact mode ("off" keeps full float32 precision)
+COMPACT_MODES = {"off": "float32", "float16": "float16", "int8": "int8"}
+# Fields only loaded from disk on demand in compact mode
+LAZY_METADATA_FIELDS = ("description", "notes")
+# Rows scored per block, bounding the float32 temporaries of quantized search
+SCORE_BLOCK_ROWS = 4096
+DEFAULT_QUERY_CACHE_SIZE = 256
+
+# Exact-match metadata fields with inverted indexes
+FILTER_FIELDS = ("value_stream", "assignee")
+# Range filters over completed_at (inclusive ISO timestamps)
+RANGE_FILTERS = ("completed_after", "completed_before")
+_EMPTY_ROWS = np.zeros(0, dtype=np.int64)
+
+SEARCH_MODES = ("hybrid", "dense")
+# Reciprocal-rank fusion constant (Cormack et al.); dampens top-rank dominance
+RRF_K = 60
+# Each ranker contributes this many candidates (at least) to the fusion
+MIN_FUSION_CANDIDATES = 20
+
+# Neighbours kept per case study in the related-cases graph (0 disables it)
+DEFAULT_RELATED_K = 10
+# Rows per block when building the graph; bounds the block x n similarity matrix
+NEIGHBOR_BLOCK_ROWS = 512
+
+# slug -> ((neighbour slug, cosine), ...), most similar first
+NeighborGraph = Dict[str, Tuple[Tuple[str, float], ...]]
+
+# Compact automatically once this fraction of rows is tombstoned
+DEFAULT_AUTO_COMPACT_RATIO = 0.2
+
+
+class ReindexCancelled(Exception):
+    """Raised when a rebuild is cancelled before the new index is published."""
+
+
+def _entry_from_metadata(metadata: dict, lazy: bool = False) -> dict:
+    """Build an index entry (without its embedding) from case study metadata.
+
+    With lazy=True the bulky text fields are left out; see _hydrate_entry.
+    """
+    entry = {
+        "text": metadata.get("indexed_text", ""),
+        "metadata": {
+            "slug": metadata.get("slug"),
+            "title": metadata.get("title"),
+            "description": metadata.get("description", ""),
+            "notes": metadata.get("notes", ""),
+            "assignee": metadata.get("assignee"),
+            "value_stream": metadata.get("value_stream"),
+            "completed_at": metadata.get("completed_at"),
+            "task_id": metadata.get("id"),
+        },
+    }
+    if lazy:
+        del entry["text"]
+        for field in LAZY_METADATA_FIELDS:
+            del entry["metadata"][field]
+    return entry
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a query: case-folded with whitespace collapsed."""
+    return " ".join(query.lower().split())
+
+
+def _hydrate_entry(entry: dict) -> dict:
+    """Return a full entry, loading lazily-stored fields from the case store."""
+    if "text" in entry:
+        return entry
+    slug = entry["metadata"].get("slug")
+    try:
+        metadata = get_case_store().get(slug, include_deleted=True) or {}
+    except Exception as e:
+        logger.warning(f"Failed to load metadata for {slug}: {e}")
+        metadata = {}
+    hydrated = {**entry, "text": metadata.get("indexed_text", ""), "metadata": dict(entry["metadata"])}
+    for field in LAZY_METADATA_FIELDS:
+        hydrated["metadata"][field] = metadata.get(field, "")
+    return hydrated
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize float vectors row-wise.
+
+    Returns (stored, scales) such that stored * scales[:, None] approximates
+    the input. int8 uses a symmetric per-row scale of max(|v|) / 127.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors.reshape(1, -1)
+    if dtype == "int8":
+        peak = np.abs(vectors).max(axis=1) if vectors.size else np.zeros(len(vectors), dtype=np.float32)
+        scales = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        stored = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return stored, scales
+    scales = np.ones(len(vectors), dtype=np.float32)
+    return vectors.astype(np.float16 if dtype == "float16" else np.float32), scales
+
+
+def _to_datetime64(value: Any) -> np.datetime64:
+    """Parse an ISO string or datetime to datetime64; unparseable → NaT."""
+    if value is None:
+        return np.datetime64("NaT")
+    try:
+        dt = value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return np.datetime64("NaT")
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(dt, "us")
+
+
+def validate_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Reject unknown filter keys; drop keys whose value is None."""
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_FIELDS) - set(RANGE_FILTERS)
+    if unknown:
+        raise ValueError(f"Unsupported search filters: {sorted(unknown)}")
+    cleaned = {k: v for k, v in filters.items() if v is not None}
+    return cleaned or None
+
+
+def _deep_sizeof(obj: Any) -> int:
+    """Approximate retained size of plain JSON-like Python objects."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_sizeof(k) + _deep_sizeof(v) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(_deep_sizeof(v) for v in obj)
+    return size
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores, highest first. -inf (masked) never ranks."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return _EMPTY_ROWS
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return top[scores[top] > -np.inf]
+
+
+def _competition_ranks(sorted_scores: np.ndarray) -> List[int]:
+    """1-based ranks for descending scores where ties share a rank ("1224").
+
+    Without this, RRF would reward whichever of several equally-scored rows
+    happened to come first.
+    """
+    rounded = np.round(sorted_scores, 6)
+    ranks = []
+    for i, score in enumerate(rounded):
+        ranks.append(ranks[-1] if i and score == rounded[i - 1] else i + 1)
+    return ranks
+
+
+def _neighbor_list(
+    scores: np.ndarray,
+    slugs: Sequence[str],
+    own_slug: str,
+    k: int,
+) -> Tuple[Tuple[str, float], ...]:
+    """Top-k (slug, score) pairs from one row's similarities, excluding itself."""
+    neighbors = []
+    seen = {own_slug}
+    # A few extra candidates in case duplicate slugs have to be skipped
+    for j in _top_indices(scores, k + 2):
+        if not np.isfinite(scores[j]) or slugs[j] in seen:
+            continue
+        seen.add(slugs[j])
+        neighbors.append((slugs[j], round(float(scores[j]), 6)))
+        if len(neighbors) == k:
+            break
+    return tuple(neighbors)
+
+
+class IndexSnapshot:
+    """Immutable view of the vector index.
+
+    Never mutated after construction: arrays are marked read-only and
+    entries are held in a tuple. Writers derive a new snapshot
+    (copy-on-write) instead of changing this one.
+
+    Embeddings are stored in `dtype` (float32, float16 or int8) with a
+    per-row scale; the dequantized row i is embeddings[i] * scales[i].
+    `lexical` is the row-aligned BM25 index over the same entries and
+    `neighbors` the related-cases graph keyed by slug (live rows only).
+
+    `dead` marks tombstoned rows. They keep their place (so arrays, BM25
+    postings and filter indexes are shared with the previous snapshot) but
+    are excluded from every search; compacted() drops them for good.
+    """
+
+    __slots__ = (
+        "entries", "embeddings", "scales", "inv_norms", "dtype", "lexical",
+        "neighbors", "dead", "n_dead", "_postings", "_completed_index", "_slug_rows",
+    )
+
+    def __init__(
+        self,
+        entries: Sequence[dict],
+        embeddings: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        dtype: str = "float32",
+        lexical: Optional[LexicalIndex] = None,
+        neighbors: Optional[NeighborGraph] = None,
+        dead: Optional[np.ndarray] = None,
+    ):
+        self.entries: Tuple[dict, ...] = tuple(entries)
+        self.lexical = lexical or LexicalIndex.from_documents([{}] * len(self.entries))
+        # Shared between snapshots; treated as read-only like everything else
+        self.neighbors: NeighborGraph = neighbors if neighbors is not None else {}
+        self.embeddings = embeddings
+        self.dtype = dtype
+        self.scales = scales if scales is not None else np.ones(len(self.entries), dtype=np.float32)
+
+        norms = np.zeros(len(self.entries), dtype=np.float32)
+        for start in range(0, len(self.entries), SCORE_BLOCK_ROWS):
+            block = self.embeddings[start:start + SCORE_BLOCK_ROWS].astype(np.float32)
+            norms[start:start + len(block)] = np.linalg.norm(block, axis=1)
+        norms *= self.scales
+        self.inv_norms = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0)
+
+        self.dead = dead if dead is not None else np.zeros(len(self.entries), dtype=bool)
+        self.n_dead = int(self.dead.sum())
+
+        for array in (self.embeddings, self.scales, self.inv_norms, self.dead):
+            array.flags.writeable = False
+
+        # Inverted indexes, built on the first filtered search and then
+        # carried forward by with_entry. Building twice from two threads is
+        # harmless: the result is identical.
+        self._postings: Optional[Dict[str, Dict[Any, np.ndarray]]] = None
+        self._completed_index: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._slug_rows: Optional[Dict[str, int]] = None
+
+    @classmethod
+    def empty(cls, dtype: str = "float32") -> "IndexSnapshot":
+        return cls((), np.zeros((0, 0), dtype=np.float32), dtype=dtype)
+
+    @classmethod
+    def from_entries(
+        cls,
+        entries: Sequence[dict],
+        embeddings: Sequence[Sequence[float]],
+        dtype: str = "float32",
+        terms: Optional[Sequence[Dict[str, int]]] = None,
+        related_k: int = 0,
+        neighbors: Optional[NeighborGraph] = None,
+    ) -> "IndexSnapshot":
+        """Build a snapshot.
+
+        `terms` are per-entry term frequencies for BM25. The neighbour graph
+        is taken from `neighbors` if given, otherwise built for related_k > 0.
+        """
+        if not entries:
+            return cls.empty(dtype)
+        stored, scales = quantize(np.asarray(embeddings, dtype=np.float32), dtype)
+        lexical = LexicalIndex.from_documents(terms) if terms is not None else None
+        snapshot = cls(entries, stored, scales, dtype, lexical, neighbors)
+        if neighbors is None and related_k > 0:
+            snapshot.neighbors = snapshot._build_neighbors(related_k)
+        return snapshot
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def row(self, i: int) -> np.ndarray:
+        """Dequantized float32 embedding of row i."""
+        return self.embeddings[i].astype(np.float32) * self.scales[i]
+
+    def _slugs(self) -> List[str]:
+        return [e["metadata"].get("slug") for e in self.entries]
+
+    def _build_neighbors(self, k: int) -> NeighborGraph:
+        """All-pairs top-k neighbour lists, computed in row blocks."""
+        slugs = self._slugs()
+        units = np.empty(self.embeddings.shape, dtype=np.float32)
+        for start in range(0, len(self.entries), SCORE_BLOCK_ROWS):
+            stop = start + SCORE_BLOCK_ROWS
+            block = self.embeddings[start:stop].astype(np.float32)
+            units[start:start + len(block)] = block * (self.scales[start:stop] * self.inv_norms[start:stop])[:, None]
+
+        graph: NeighborGraph = {}
+        for start in range(0, len(self.entries), NEIGHBOR_BLOCK_ROWS):
+            sims = units[start:start + NEIGHBOR_BLOCK_ROWS] @ units.T
+            for offset, scores in enumerate(sims):
+                row = start + offset
+                scores[row] = -np.inf
+                graph[slugs[row]] = _neighbor_list(scores, slugs, slugs[row], k)
+        return graph
+
+    def _link_last_row(self, previous: NeighborGraph, k: int) -> NeighborGraph:
+        """Neighbour graph with the last row inserted into `previous`.
+
+        One similarity pass over the index: the new node gets its top-k, and
+        every existing node whose k-th neighbour is less similar than the new
+        node gets the new node spliced into its list.
+        """
+        row = len(self.entries) - 1
+        slugs = self._slugs()
+        slug = slugs[row]
+        scores = self._neighbor_scores(row)
+
+        graph = dict(previous)  # untouched lists are shared
+        graph[slug] = _neighbor_list(scores, slugs, slug, k)
+
+        empty: Tuple[Tuple[str, float], ...] = ()
+        floors = np.array([
+            lst[-1][1] if len(lst) >= k else -np.inf
+            for lst in (previous.get(s, empty) for s in slugs[:row])
+        ] + [np.inf], dtype=np.float32)
+        floors[self.dead] = np.inf
+        for j in np.flatnonzero(scores > floors).tolist():
+            other = slugs[j]
+            if other == slug:
+                continue
+            merged = [pair for pair in graph.get(other, empty) if pair[0] != slug]
+            merged.append((slug, round(float(scores[j]), 6)))
+            merged.sort(key=lambda pair: -pair[1])
+            graph[other] = tuple(merged[:k])
+        return graph
+
+    def _neighbor_scores(self, row: int) -> np.ndarray:
+        """Similarity of `row` to every row, with itself and dead rows masked."""
+        scores = self.cosine_scores(self.row(row))
+        scores[row] = -np.inf
+        if self.n_dead:
+            scores[self.dead] = -np.inf
+        return scores
+
+    def _unlink(self, removed: set, previous: NeighborGraph, k: int) -> NeighborGraph:
+        """Neighbour graph without the `removed` slugs.
+
+        Nodes that listed a removed slug are re-scored so their lists are
+        refilled from the remaining live rows.
+        """
+        slugs = self._slugs()
+        graph = {s: pairs for s, pairs in previous.items() if s not in removed}
+        for slug, pairs in list(graph.items()):
+            if not any(other in removed for other, _ in pairs):
+                continue
+            row = self.row_for_slug(slug)
+            if row is None:
+                del graph[slug]
+                continue
+            graph[slug] = _neighbor_list(self._neighbor_scores(row), slugs, slug, k)
+        return graph
+
+    def _replace(self, **changes) -> "IndexSnapshot":
+        """Shallow copy with some slots replaced (arrays are shared, not copied)."""
+        snapshot = object.__new__(IndexSnapshot)
+        for slot in IndexSnapshot.__slots__:
+            setattr(snapshot, slot, changes.get(slot, getattr(self, slot)))
+        return snapshot
+
+    def with_entry(
+        self,
+        entry: dict,
+        embedding: np.ndarray,
+        terms: Optional[Dict[str, int]] = None,
+        related_k: int = 0,
+    ) -> "IndexSnapshot":
+        """Return a new snapshot with one entry appended.
+
+        With related_k > 0 the neighbour graph is updated incrementally.
+        """
+        row, scale = quantize(embedding, self.dtype)
+        lexical = self.lexical.with_document(terms or {})
+        if not self.entries:
+            snapshot = IndexSnapshot((entry,), row, scale, self.dtype, lexical)
+        else:
+            snapshot = IndexSnapshot(
+                self.entries + (entry,),
+                np.vstack([self.embeddings, row]),
+                np.concatenate([self.scales, scale]),
+                self.dtype,
+                lexical,
+                dead=np.append(self.dead, False),
+            )
+        if related_k > 0:
+            snapshot.neighbors = snapshot._link_last_row(self.neighbors, related_k)
+        # Extend already-built lookup indexes rather than rebuilding them on
+        # the next filtered search or related-cases lookup
+        if self._slug_rows is not None:
+            snapshot._slug_rows = {**self._slug_rows, entry["metadata"].get("slug"): len(self.entries)}
+        if self._postings is not None:
+            snapshot._postings = self._postings_with_row(entry, len(self.entries))
+        if self._completed_index is not None:
+            snapshot._completed_index = self._completed_index_with_row(entry, len(self.entries))
+        return snapshot
+
+    def _postings_with_row(self, entry: dict, row: int) -> Dict[str, Dict[Any, np.ndarray]]:
+        """Postings with `row` appended; only the touched lists are copied."""
+        postings = {}
+        for field, values in self._postings.items():
+            value = entry["metadata"].get(field)
+            values = dict(values)
+            values[value] = np.append(values.get(value, _EMPTY_ROWS), row)
+            postings[field] = values
+        return postings
+
+    def _completed_index_with_row(self, entry: dict, row: int) -> Tuple[np.ndarray, np.ndarray]:
+        times, order = self._completed_index
+        completed = _to_datetime64(entry["metadata"].get("completed_at"))
+        if np.isnat(completed):
+            return self._completed_index
+        # After equal times, like the stable sort in _get_completed_index
+        at = np.searchsorted(times, completed, side="right")
+        return np.insert(times, at, completed), np.insert(order, at, row)
+
+    def with_tombstones(self, rows: Sequence[int], related_k: int = 0) -> "IndexSnapshot":
+        """Return a new snapshot with `rows` marked dead.
+
+        Only the dead mask is copied; vectors, BM25 postings and filter
+        indexes are shared with this snapshot.
+        """
+        dead = self.dead.copy()
+        dead[list(rows)] = True
+        dead.flags.writeable = False
+        snapshot = self._replace(dead=dead, n_dead=int(dead.sum()))
+        tombstoned = {self.entries[r]["metadata"].get("slug") for r in rows}
+        # A slug can outlive one of its rows (upsert into the same case dir)
+        live_slugs = {e["metadata"].get("slug") for e in snapshot.live_entries()}
+        removed = tombstoned - live_slugs
+        if self._slug_rows is not None:
+            slug_rows = {s: i for s, i in self._slug_rows.items() if s not in tombstoned}
+            surviving = tombstoned - removed
+            if surviving:
+                # They fall back to their most recent live row
+                for i in reversed(np.flatnonzero(~dead).tolist()):
+                    slug = self.entries[i]["metadata"].get("slug")
+                    if slug in surviving:
+                        slug_rows.setdefault(slug, i)
+            snapshot._slug_rows = slug_rows
+        if self.neighbors and removed:
+            snapshot.neighbors = snapshot._unlink(removed, self.neighbors, related_k)
+        return snapshot
+
+    def compacted(self) -> "IndexSnapshot":
+        """Return a snapshot without dead rows (row ids are renumbered)."""
+        if not self.n_dead:
+            return self
+        live = np.flatnonzero(~self.dead)
+        if not len(live):
+            return IndexSnapshot.empty(self.dtype)
+        terms = self.lexical.document_terms()
+        return IndexSnapshot(
+            [self.entries[i] for i in live],
+            self.embeddings[live],
+            self.scales[live],
+            self.dtype,
+            LexicalIndex.from_documents([terms[i] for i in live]),
+            self.neighbors,
+        )
+
+    def live_entries(self) -> List[dict]:
+        return [e for e, dead in zip(self.entries, self.dead) if not dead]
+
+    def rows_for_task(self, task_id: Optional[str], slug: Optional[str] = None) -> List[int]:
+        """Live rows for a task id (or, for entries indexed without one, a slug)."""
+        rows = []
+        for i, entry in enumerate(self.entries):
+            if self.dead[i]:
+                continue
+            metadata = entry["metadata"]
+            if (task_id is not None and metadata.get("task_id") == task_id) or (
+                slug is not None and metadata.get("slug") == slug
+            ):
+                rows.append(i)
+        return rows
+
+    def row_for_slug(self, slug: str) -> Optional[int]:
+        """Live row of the (most recently added) entry with this slug."""
+        if self._slug_rows is None:
+            self._slug_rows = {
+                s: i for i, s in enumerate(self._slugs()) if not self.dead[i]
+            }
+        return self._slug_rows.get(slug)
+
+    def _get_postings(self) -> Dict[str, Dict[Any, np.ndarray]]:
+        if self._postings is None:
+            lists: Dict[str, Dict[Any, List[int]]] = {field: {} for field in FILTER_FIELDS}
+            for i, entry in enumerate(self.entries):
+                metadata = entry["metadata"]
+                for field in FILTER_FIELDS:
+                    lists[field].setdefault(metadata.get(field), []).append(i)
+            self._postings = {
+                field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+                for field, values in lists.items()
+            }
+        return self._postings
+
+    def _get_completed_index(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(sorted completion times, row ids in that order), NaT rows excluded."""
+        if self._completed_index is None:
+            times = np.array(
+                [_to_datetime64(e["metadata"].get("completed_at")) for e in self.entries],
+                dtype="datetime64[us]",
+            )
+            rows = np.flatnonzero(~np.isnat(times))
+            order = rows[np.argsort(times[rows], kind="stable")]
+            self._completed_index = (times[order], order)
+        return self._completed_index
+
+    def candidate_rows(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Sorted row ids matching all filters, or None when unfiltered.
+
+        Exact-match fields accept a single value or a list, tuple or set of
+        values (OR); any other value, strings included, is matched as is.
+        """
+        if not filters:
+            return None
+        rows: Optional[np.ndarray] = None
+
+        postings = None
+        for field in FILTER_FIELDS:
+            if field not in filters:
+                continue
+            postings = postings or self._get_postings()
+            wanted = filters[field]
+            values = list(wanted) if isinstance(wanted, (list, tuple, set)) else [wanted]
+            matched = np.unique(np.concatenate(
+                [postings[field].get(v, _EMPTY_ROWS) for v in values] or [_EMPTY_ROWS]
+            ))
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+        if any(key in filters for key in RANGE_FILTERS):
+            times, order = self._get_completed_index()
+            lo, hi = 0, len(times)
+            if "completed_after" in filters:
+                lo = np.searchsorted(times, _to_datetime64(filters["completed_after"]), side="left")
+            if "completed_before" in filters:
+                hi = np.searchsorted(times, _to_datetime64(filters["completed_before"]), side="right")
+            matched = np.sort(order[lo:hi]) if hi > lo else _EMPTY_ROWS
+            rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+
+        if rows is not None and self.n_dead:
+            rows = rows[~self.dead[rows]]
+        return rows
+
+    def cosine_scores(
+        self,
+        query_embedding: np.ndarray,
+        rows: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """Cosine similarity of the query against every row (or just `rows`)."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        n = len(self.entries) if rows is None else len(rows)
+        if query_norm == 0 or n == 0:
+            return np.zeros(n, dtype=np.float32)
+
+        embeddings = self.embeddings if rows is None else self.embeddings[rows]
+        scales = self.scales if rows is None else self.scales[rows]
+        inv_norms = self.inv_norms if rows is None else self.inv_norms[rows]
+
+        if self.dtype == "float32":
+            dots = embeddings @ query
+        else:
+            dots = np.empty(n, dtype=np.float32)
+            for start in range(0, n, SCORE_BLOCK_ROWS):
+                block = embeddings[start:start + SCORE_BLOCK_ROWS]
+                dots[start:start + len(block)] = block.astype(np.float32) @ query
+        return dots * scales * inv_norms / query_norm
+
+    def memory_bytes(self) -> Dict[str, int]:
+        """Approximate in-memory footprint of vectors and entry metadata."""
+        vectors = self.embeddings.nbytes + self.scales.nbytes + self.inv_norms.nbytes
+        metadata = sum(_deep_sizeof(entry) for entry in self.entries)
+        lexical = self.lexical.doc_lengths.nbytes + sum(
+            sys.getsizeof(term) + rows.nbytes + tfs.nbytes
+            for term, (rows, tfs) in self.lexical.postings.items()
+        )
+        neighbors = _deep_sizeof(self.neighbors)
+        return {
+            "vectors": vectors,
+            "metadata": metadata,
+            "lexical": lexical,
+            "neighbors": neighbors,
+            "total": vectors + metadata + lexical + neighbors,
+        }
+
+    def to_json(self) -> dict:
+        entries = []
+        terms = self.lexical.document_terms()
+        for i, entry in enumerate(self.entries):
+            item = {**entry, "embedding": self.embeddings[i].tolist(), "terms": terms[i]}
+            if self.dtype == "int8":
+                item["scale"] = float(self.scales[i])
+            if self.dead[i]:
+                item["deleted"] = True
+            entries.append(item)
+        neighbors = {slug: [list(pair) for pair in pairs] for slug, pairs in self.neighbors.items()}
+        return {"vector_dtype": self.dtype, "entries": entries, "neighbors": neighbors}
 
 
 class SemanticRAG:
     """Local semantic search over case study metadata."""
 
-    def __init__(self):
-        self._model = None
-        self._index: List[dict] = []  # [{text, embedding, metadata}]
+    def __init__(self, embedder: Optional[Embedder] = None):
+        self.embedder: Embedder = embedder or create_embedder()
+        compact_mode = os.getenv("RAG_COMPACT_MODE", "off").lower()
+        if compact_mode not in COMPACT_MODES:
+            logger.warning(f"Unknown RAG_COMPACT_MODE '{compact_mode}', using 'off'")
+            compact_mode = "off"
+        self.compact_mode = compact_mode
+        self.vector_dtype = COMPACT_MODES[compact_mode]
+        self.lazy_metadata = compact_mode != "off"
+        self.related_k = max(0, int(os.getenv("RAG_RELATED_K", str(DEFAULT_RELATED_K))))
+        self.auto_compact_ratio = float(
+            os.getenv("RAG_AUTO_COMPACT_RATIO", str(DEFAULT_AUTO_COMPACT_RATIO))
+        )
+        self._snapshot: IndexSnapshot = IndexSnapshot.empty(self.vector_dtype)
+        # Serializes writers only; search never takes it
+        self._write_lock = threading.Lock()
+        # Upserts/removals made while build_index runs, replayed onto its result
+        self._changes_during_build: Optional[List[Tuple[str, Any]]] = None
+
+        # LRU of query embeddings keyed by normalized text
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_size = int(os.getenv("RAG_QUERY_CACHE_SIZE", str(DEFAULT_QUERY_CACHE_SIZE)))
+        self._query_cache_lock = threading.Lock()
+        self._query_cache_hits = 0
+        self._query_cache_misses = 0
         self._load_index()
 
-    def _load_model(self):
-        """Lazy-load the sentence-transformer model."""
-        if self._model is None:
-            try:
-                from sentence_transformers import SentenceTransformer
-                self._model = SentenceTransformer(MODEL_NAME)
-                logger.info(f"Loaded embedding model: {MODEL_NAME}")
-            except Exception as e:
-                logger.error(f"Failed to load embedding model: {e}")
-                raise
-        return self._model
+    def _load_model(self) -> Embedder:
+        """Load the embedder's heavy resources (if any) and return it."""
+        return self.embedder.load()
+
+    def warm_up(self):
+        """Load the embedder and run one encode. Blocking.
+
+        The encode triggers lazy framework initialization (e.g. torch
+        kernels), so the first real search does not pay for it.
+        """
+        self._load_model().encode("warm-up")
+
+    def _cached_query_embedding(self, key: str) -> Optional[np.ndarray]:
+        with self._query_cache_lock:
+            cached = self._query_cache.get(key)
+            if cached is not None:
+                self._query_cache.move_to_end(key)
+                self._query_cache_hits += 1
+            else:
+                self._query_cache_misses += 1
+            return cached
+
+    def _remember_query_embedding(
+        self, key: str, embedding: np.ndarray, embedder: Embedder
+    ) -> np.ndarray:
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        if self._query_cache_size > 0:
+            with self._query_cache_lock:
+                # Encoded by an embedder a rebuild has since swapped out
+                if embedder is not self.embedder:
+                    return embedding
+                self._query_cache[key] = embedding
+                self._query_cache.move_to_end(key)
+                while len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embed a search query, reusing cached embeddings for repeated text."""
+        key = normalize_query(query)
+        cached = self._cached_query_embedding(key)
+        if cached is not None:
+            return cached
+        # Forward pass outside the lock; a concurrent miss on the same key
+        # just computes the same vector twice
+        embedder = self._load_model()
+        return self._remember_query_embedding(key, embedder.encode(query), embedder)
+
+    async def encode_query_async(self, query: str) -> np.ndarray:
+        """Like encode_query, but misses go through the micro-batching
+        embedding worker when it is enabled (see services/embedding_worker.py).
+        """
+        from services.embedding_worker import get_embedding_batcher
+
+        batcher = get_embedding_batcher()
+        if batcher is None:
+            return self.encode_query(query)
+
+        key = normalize_query(query)
+        cached = self._cached_query_embedding(key)
+        if cached is not None:
+            return cached
+        embedder = self.embedder
+        return self._remember_query_embedding(key, await batcher.encode(query), embedder)
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        with self._query_cache_lock:
+            lookups = self._query_cache_hits + self._query_cache_misses
+            return {
+                "size": len(self._query_cache),
+                "max_size": self._query_cache_size,
+                "hits": self._query_cache_hits,
+                "misses": self._query_cache_misses,
+                "hit_rate": round(self._query_cache_hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def clear_query_cache(self):
+        with self._query_cache_lock:
+            self._query_cache.clear()
+
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """The currently published index snapshot."""
+        return self._snapshot
 
     def _load_index(self):
         """Load the vector index from disk."""
         if INDEX_PATH.exists():
             try:
                 data = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
-                self._index = data.get("entries", [])
-                logger.info(f"Loaded {len(self._index)} entries from vector index")
+                stored_embedder = data.get("embedder") or legacy_descriptor()
+                if stored_embedder != self.embedder.descriptor():
+                    logger.warning(
+                        f"Vector index was built with {stored_embedder}, but the configured "
+                        f"embedder is {self.embedder.descriptor()} — reindex required"
+                    )
+                    self._snapshot = IndexSnapshot.empty(self.vector_dtype)
+                    return
+                self.embedder.set_state(data.get("embedder_state"))
+
+                # Tombstoned rows are dropped on load — a free compaction
+                raw_entries = [e for e in data.get("entries", []) if not e.get("deleted")]
+                entries = [
+                    {k: v for k, v in e.items() if k not in ("embedding", "scale", "terms", "deleted")}
+                    for e in raw_entries
+                ]
+                # Indexes written before BM25 have no terms; derive them from text
+                terms = [
+                    e["terms"] if "terms" in e else tokenize(e.get("text", ""))
+                    for e in raw_entries
+                ]
+                # Dequantize whatever was on disk, then store in the configured dtype
+                embeddings = [
+                    np.asarray(e["embedding"], dtype=np.float32) * e.get("scale", 1.0)
+                    for e in raw_entries
+                ]
+                if self.lazy_metadata:
+                    entries = [self._compact_entry(e) for e in entries]
+                # Reuse the stored graph only if it was built with the same k
+                neighbors = None
+                if data.get("related_k") == self.related_k and "neighbors" in data:
+                    neighbors = {
+                        slug: tuple((s, score) for s, score in pairs)
+                        for slug, pairs in data["neighbors"].items()
+                    }
+                self._snapshot = IndexSnapshot.from_entries(
+                    entries, embeddings, self.vector_dtype, terms,
+                    related_k=self.related_k, neighbors=neighbors,
+                )
+                logger.info(
+                    f"Loaded {len(self._snapshot)} entries from vector index "
+                    f"({self.vector_dtype})"
+                )
             except Exception as e:
                 logger.warning(f"Failed to load vector index: {e}")
-                self._index = []
+                self._snapshot = IndexSnapshot.empty(self.vector_dtype)
         else:
-            self._index = []
+            self._snapshot = IndexSnapshot.empty(self.vector_dtype)
+
+    @staticmethod
+    def _compact_entry(entry: dict) -> dict:
+        """Drop lazily-loaded fields from an entry read from a full index."""
+        compact = {k: v for k, v in entry.items() if k != "text"}
+        compact["metadata"] = {
+            k: v for k, v in entry.get("metadata", {}).items() if k not in LAZY_METADATA_FIELDS
+        }
+        return compact
+
+    def _save_index(self, snapshot: IndexSnapshot, embedder: Embedder):
+        """Save a snapshot to disk.
+
+        Writes to a temporary file and renames it over the old one so a
+        crash mid-write never leaves a truncated index behind.
+        """
+        data = snapshot.to_json()
+        data["embedder"] = embedder.descriptor()
+        data["embedder_state"] = embedder.get_state()
+        data["related_k"] = self.related_k
+        tmp_path = INDEX_PATH.with_name(INDEX_PATH.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, INDEX_PATH)
+        logger.info(f"Saved {len(snapshot)} entries to vector index")
+
+    def _publish(self, snapshot: IndexSnapshot, embedder: Optional[Embedder] = None):
+        """Persist and atomically publish a snapshot. Caller holds _write_lock.
+
+        Passing a new (refitted) embedder swaps it in together with the
+        snapshot and drops query embeddings made by the old one.
+        """
+        embedder = embedder or self.embedder
+        self._save_index(snapshot, embedder)
+        if embedder is not self.embedder:
+            self.embedder = embedder
+            self.clear_query_cache()
+        self._snapshot = snapshot
+
+    def build_index(
+        self,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> int:
+        """Rebuild the entire index from all case studies in the case store.
 
-    def _save_index(self):
-        """Save the vector index to disk."""
-        data = {"entries": self._index}
-        INDEX_PATH.write_text(json.dumps(data), encoding="utf-8")
-        logger.info(f"Saved {len(self._index)} entries to vector index")
+        The new index is built into a shadow snapshot and only swapped in once
+        complete, so concurrent searches keep serving the old snapshot.
 
-    def build_index(self) -> int:
-        """Rebuild the entire index from all case studies on disk.
+        Args:
+            progress: Optional callback invoked as progress(processed, total)
+            cancel_event: Optional event; when set, the rebuild stops and the
+                          live index is left untouched
 
         Returns:
             Number of case studies indexed
+
+        Raises:
+            ReindexCancelled: If cancel_event was set before completion
         """
-        self._index = []
+        store = get_case_store()
+        total = store.count()
+        if progress:
+            progress(0, total)
 
-        if not CASE_STUDIES_DIR.exists():
-            logger.info("No case_studies directory found — index empty")
-            self._save_index()
-            return 0
+        # Changes made from here on are replayed onto the new index at publish
+        with self._write_lock:
+            self._changes_during_build = []
 
-        model = self._load_model()
-        count = 0
+        try:
+            return self._build_index(store.iter_cases(), total, progress, cancel_event)
+        finally:
+            with self._write_lock:
+                self._changes_during_build = None
 
-        for metadata_path in sorted(CASE_STUDIES_DIR.glob("*/metadata.json")):
+    def _build_index(
+        self,
+        cases: Iterable[dict],
+        total: int,
+        progress: Optional[Callable[[int, int], None]],
+        cancel_event: Optional[threading.Event],
+    ) -> int:
+        # Read all metadata first: stateful embedders fit on the full corpus
+        texts: List[str] = []
+        entries: List[dict] = []
+        # Case studies written before upserts existed can include several
+        # for one task; keep the most recently completed
+        by_task: Dict[Any, int] = {}
+        for metadata in cases:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ReindexCancelled()
             try:
-                metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
                 text = metadata.get("indexed_text", "")
                 if not text.strip():
                     continue
-
-                embedding = model.encode(text).tolist()
-                self._index.append({
-                    "text": text,
-                    "embedding": embedding,
-                    "metadata": {
-                        "slug": metadata.get("slug"),
-                        "title": metadata.get("title"),
-                        "description": metadata.get("description", ""),
-                        "notes": metadata.get("notes", ""),
-                        "assignee": metadata.get("assignee"),
-                        "value_stream": metadata.get("value_stream"),
-                        "completed_at": metadata.get("completed_at"),
-                        "case_dir": str(metadata_path.parent),
-                    },
-                })
-                count += 1
+                entry = _entry_from_metadata(metadata, self.lazy_metadata)
+                task_id = metadata.get("id")
+                if task_id is not None and task_id in by_task:
+                    i = by_task[task_id]
+                    if (metadata.get("completed_at") or "") < (entries[i]["metadata"].get("completed_at") or ""):
+                        continue
+                    texts[i], entries[i] = text, entry
+                    continue
+                if task_id is not None:
+                    by_task[task_id] = len(entries)
+                texts.append(text)
+                entries.append(entry)
             except Exception as e:
-                logger.warning(f"Failed to index {metadata_path}: {e}")
+                logger.warning(f"Failed to read case study {metadata.get('slug')}: {e}")
 
-        self._save_index()
+        embedder = self._load_model().fitted(texts) if texts else self.embedder
+        terms = [tokenize(text) for text in texts]
+        embeddings: List[np.ndarray] = []
+        processed = total - len(texts)  # unreadable / empty cases count as done
+
+        for start in range(0, len(texts), BUILD_BATCH_SIZE):
+            if cancel_event is not None and cancel_event.is_set():
+                logger.info(f"Index rebuild cancelled after {processed}/{total}")
+                raise ReindexCancelled()
+            batch = texts[start:start + BUILD_BATCH_SIZE]
+            embeddings.extend(embedder.encode_batch(batch))
+            processed += len(batch)
+            if progress:
+                progress(processed, total)
+        if progress and not texts and total:
+            progress(total, total)
+
+        if cancel_event is not None and cancel_event.is_set():
+            raise ReindexCancelled()
+
+        count = len(entries)
+        # The all-pairs neighbour graph is the expensive part: build it
+        # before taking the writer lock
+        shadow = IndexSnapshot.from_entries(
+            entries, embeddings, self.vector_dtype, terms, related_k=self.related_k
+        )
+        # Upserts that raced with the rebuild were encoded by the live
+        # embedder; a refitted one must re-encode them. Encode the ones
+        # queued so far outside the lock, and only late arrivals under it.
+        refit = embedder is not self.embedder
+        reencoded: List[np.ndarray] = []
+        if refit:
+            with self._write_lock:
+                raced = self._raced_texts()
+            if raced:
+                reencoded.extend(embedder.encode_batch(raced))
+        with self._write_lock:
+            if refit:
+                late = self._raced_texts()[len(reencoded):]
+                if late:
+                    reencoded.extend(embedder.encode_batch(late))
+            # Replay upserts/removals that raced with the rebuild
+            upserted = 0
+            for change, args in self._changes_during_build or []:
+                if change == "upsert":
+                    entry, _, embedding, entry_terms = args
+                    if refit:
+                        embedding = reencoded[upserted]
+                    upserted += 1
+                    shadow = self._upsert(shadow, entry, embedding, entry_terms)
+                else:
+                    shadow = self._remove(shadow, args)
+            self._publish(shadow.compacted(), embedder)
+
+        if not total:
+            logger.info("No case studies found — index empty")
         logger.info(f"Built index with {count} case studies")
         return count
 
-    def add_to_index(self, case_dir: str):
-        """Add a single case study to the index.
+    def _raced_texts(self) -> List[str]:
+        """Texts of the upserts recorded during a rebuild. Caller holds _write_lock."""
+        return [args[1] for change, args in self._changes_during_build or [] if change == "upsert"]
+
+    def add_to_index(self, slug: str):
+        """Add (or replace) a single case study in the index.
 
         Args:
-            case_dir: Path to the case study directory
+            slug: Case study slug in the case store
         """
-        metadata_path = Path(case_dir) / "metadata.json"
-        if not metadata_path.exists():
-            logger.warning(f"No metadata.json in {case_dir}")
+        metadata = get_case_store().get(slug)
+        if metadata is None:
+            logger.warning(f"No case study {slug} in the case store")
             return
 
         try:
-            model = self._load_model()
-            metadata = json.loads(metadata_path.read_text(encoding="utf-8"))
+            embedder = self._load_model()
             text = metadata.get("indexed_text", "")
             if not text.strip():
                 return
 
-            embedding = model.encode(text).tolist()
-            self._index.append({
-                "text": text,
-                "embedding": embedding,
-                "metadata": {
-                    "slug": metadata.get("slug"),
-                    "title": metadata.get("title"),
-                    "description": metadata.get("description", ""),
-                    "notes": metadata.get("notes", ""),
-                    "assignee": metadata.get("assignee"),
-                    "value_stream": metadata.get("value_stream"),
-                    "completed_at": metadata.get("completed_at"),
-                    "case_dir": case_dir,
-                },
-            })
-            self._save_index()
+            # Encode outside the lock — it's the slow part
+            embedding = embedder.encode(text)
+            entry = _entry_from_metadata(metadata, self.lazy_metadata)
+            terms = tokenize(text)
+
+            with self._write_lock:
+                if embedder is not self.embedder:
+                    # A rebuild swapped in a refitted embedder meanwhile
+                    embedding = self.embedder.encode(text)
+                if self._changes_during_build is not None:
+                    self._changes_during_build.append(("upsert", (entry, text, embedding, terms)))
+                self._publish(self._maybe_compact(
+                    self._upsert(self._snapshot, entry, embedding, terms)
+                ))
             logger.info(f"Added to index: {metadata.get('slug')}")
         except Exception as e:
-            logger.warning(f"Failed to add {case_dir} to index: {e}")
+            logger.warning(f"Failed to add {slug} to index: {e}")
+
+    def _upsert(
+        self,
+        snapshot: IndexSnapshot,
+        entry: dict,
+        embedding: np.ndarray,
+        terms: Dict[str, int],
+    ) -> IndexSnapshot:
+        """Tombstone any live rows for the entry's task, then append it."""
+        metadata = entry["metadata"]
+        stale = snapshot.rows_for_task(metadata.get("task_id"), metadata.get("slug"))
+        if stale:
+            snapshot = snapshot.with_tombstones(stale, self.related_k)
+        return snapshot.with_entry(entry, embedding, terms, self.related_k)
+
+    def _remove(self, snapshot: IndexSnapshot, task_id: str) -> IndexSnapshot:
+        rows = snapshot.rows_for_task(task_id)
+        return snapshot.with_tombstones(rows, self.related_k) if rows else snapshot
+
+    def _maybe_compact(self, snapshot: IndexSnapshot) -> IndexSnapshot:
+        if snapshot.n_dead and snapshot.n_dead > self.auto_compact_ratio * len(snapshot):
+            logger.info(f"Auto-compacting vector index ({snapshot.n_dead}/{len(snapshot)} dead rows)")
+            return snapshot.compacted()
+        return snapshot
+
+    def remove_from_index(self, task_id: str) -> int:
+        """Tombstone the index entries of a task.
+
+        Returns:
+            Number of rows removed
+        """
+        with self._write_lock:
+            snapshot = self._snapshot
+            removed = len(snapshot.rows_for_task(task_id))
+            if self._changes_during_build is not None:
+                self._changes_during_build.append(("remove", task_id))
+            if removed:
+                self._publish(self._maybe_compact(self._remove(snapshot, task_id)))
+        if removed:
+            logger.info(f"Removed task {task_id} from index ({removed} rows)")
+        return removed
+
+    def compact_index(self) -> Dict[str, int]:
+        """Rewrite the index without tombstoned rows."""
+        with self._write_lock:
+            snapshot = self._snapshot
+            if snapshot.n_dead:
+                self._publish(snapshot.compacted())
+            return {"removed": snapshot.n_dead, "entries": len(snapshot) - snapshot.n_dead}
 
-    def search(self, query: str, top_k: int = 5) -> List[Tuple[dict, float]]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        query_embedding: Optional[np.ndarray] = None,
+        mode: str = "hybrid",
+    ) -> List[Tuple[dict, float]]:
         """Search the index for case studies similar to the query.
 
         Args:
             query: Natural language search query
             top_k: Maximum results to return
+            filters: Optional metadata filters. Keys: value_stream, assignee
+                     (a value or list of values), completed_after,
+                     completed_before (inclusive ISO timestamps)
+            query_embedding: Precomputed embedding of `query` (e.g. from
+                             encode_query_async); skips encoding when given
+            mode: "hybrid" fuses dense and BM25 rankings with RRF; "dense"
+                  ranks by cosine similarity only
 
         Returns:
-            List of (entry, similarity_score) tuples, highest first
+            List of (entry, similarity_score) tuples in rank order. The score
+            is always the cosine similarity. In hybrid mode each entry also
+            carries a "match" dict with dense_rank, lexical_rank (1-based,
+            None if not in that ranker's candidates) and rrf_score.
+
+        Raises:
+            ValueError: If filters contains an unsupported key or mode is unknown
         """
-        if not self._index:
+        filters = validate_filters(filters)
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unsupported search mode: {mode}")
+
+        # One read of the reference; the snapshot itself never changes
+        snapshot = self._snapshot
+        if not snapshot.entries:
             return []
 
         try:
-            model = self._load_model()
-            query_embedding = model.encode(query)
+            rows = snapshot.candidate_rows(filters)
+            if rows is not None and len(rows) == 0:
+                return []
+
+            if query_embedding is None:
+                query_embedding = self.encode_query(query)
+            scores = snapshot.cosine_scores(query_embedding, rows)
+            row_ids = np.arange(len(snapshot)) if rows is None else rows
+            if rows is None and snapshot.n_dead:
+                scores[snapshot.dead] = -np.inf
 
-            results = []
-            for entry in self._index:
-                entry_embedding = np.array(entry["embedding"])
-                # Cosine similarity
-                dot = np.dot(query_embedding, entry_embedding)
-                norm = np.linalg.norm(query_embedding) * np.linalg.norm(entry_embedding)
-                similarity = float(dot / norm) if norm > 0 else 0.0
-                results.append((entry, similarity))
+            if mode == "dense":
+                top = _top_indices(scores, top_k)
+                return [
+                    (_hydrate_entry(snapshot.entries[row_ids[i]]), float(scores[i]))
+                    for i in top
+                ]
 
-            results.sort(key=lambda x: x[1], reverse=True)
-            return results[:top_k]
+            return self._fuse(snapshot, query, scores, row_ids, rows, top_k)
 
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
 
+    @staticmethod
+    def _fuse(
+        snapshot: IndexSnapshot,
+        query: str,
+        scores: np.ndarray,
+        row_ids: np.ndarray,
+        rows: Optional[np.ndarray],
+        top_k: int,
+    ) -> List[Tuple[dict, float]]:
+        """Reciprocal-rank fusion of the dense and BM25 candidate lists."""
+        n_candidates = max(top_k * 4, MIN_FUSION_CANDIDATES)
+
+        dense_positions = _top_indices(scores, n_candidates)
+        dense_rank = dict(zip(
+            row_ids[dense_positions].tolist(), _competition_ranks(scores[dense_positions])
+        ))
+
+        lex_rows, lex_scores = snapshot.lexical.scores(tokenize(query), rows)
+        if rows is None and snapshot.n_dead:
+            alive = ~snapshot.dead[lex_rows]
+            lex_rows, lex_scores = lex_rows[alive], lex_scores[alive]
+        lex_positions = _top_indices(lex_scores, n_candidates)
+        lexical_rank = dict(zip(
+            lex_rows[lex_positions].tolist(), _competition_ranks(lex_scores[lex_positions])
+        ))
+
+        # Cosine score by row id (scores is aligned with row_ids)
+        position = {int(row): i for i, row in enumerate(row_ids)} if rows is not None else None
+
+        def cosine(row: int) -> float:
+            return float(scores[row if position is None else position[row]])
+
+        fused = {}
+        for row in dense_rank.keys() | lexical_rank.keys():
+            rrf = sum(
+                1.0 / (RRF_K + ranks[row])
+                for ranks in (dense_rank, lexical_rank)
+                if row in ranks
+            )
+            fused[row] = rrf
+
+        ranked = sorted(fused, key=lambda row: (-fused[row], -cosine(row)))[:top_k]
+        results = []
+        for row in ranked:
+            hit = dict(_hydrate_entry(snapshot.entries[row]))
+            hit["match"] = {
+                "dense_rank": dense_rank.get(row),
+                "lexical_rank": lexical_rank.get(row),
+                "rrf_score": round(fused[row], 6),
+            }
+            results.append((hit, cosine(row)))
+        return results
+
+    def related_cases(self, slug: str, limit: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """Most similar case studies to `slug`, from the precomputed graph.
+
+        Returns:
+            Up to `limit` neighbours, most similar first, or None if the slug
+            is not in the index. Only related_k are stored per case study,
+            so larger limits are capped at related_k.
+        """
+        snapshot = self._snapshot
+        neighbors = snapshot.neighbors.get(slug)
+        if neighbors is None:
+            return None
+        limit = self.related_k if limit is None else min(limit, self.related_k)
+
+        related = []
+        for neighbor_slug, score in neighbors[:limit]:
+            row = snapshot.row_for_slug(neighbor_slug)
+            if row is None:
+                continue
+            metadata = snapshot.entries[row]["metadata"]
+            related.append({
+                "slug": neighbor_slug,
+                "title": metadata.get("title"),
+                "value_stream": metadata.get("value_stream"),
+                "assignee": metadata.get("assignee"),
+                "completed_at": metadata.get("completed_at"),
+                "score": score,
+            })
+        return related
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Report the in-memory footprint of the current snapshot."""
+        snapshot = self._snapshot
+        usage: Dict[str, Any] = dict(snapshot.memory_bytes())
+        usage["entries"] = len(snapshot) - snapshot.n_dead
+        usage["dead_rows"] = snapshot.n_dead
+        usage["compact_mode"] = self.compact_mode
+        usage["embedder"] = self.embedder.descriptor()
+        usage["bytes_per_10k_cases"] = (
+            int(usage["total"] / len(snapshot) * 10_000) if len(snapshot) else 0
+        )
+        return usage
+
 
 # Singleton
 _rag_service: Optional[SemanticRAG] = None
+_rag_lock = threading.Lock()
 
 
 def get_rag_service() -> SemanticRAG:
     global _rag_service
     if _rag_service is None:
-        _rag_service = SemanticRAG()
+        with _rag_lock:
+            if _rag_service is None:
+                _rag_service = SemanticRAG()
+    return _rag_service
+
+
+def loaded_rag_service() -> Optional[SemanticRAG]:
+    """The shared service if something has loaded it already, else None (never loads)."""
     return _rag_service
@@ -0,0 +1,285 @@
+"""
+Gemini Usage Store — Lotus v2
+
+Usage accounting for GeminiClient that survives restarts:
+
+  - LatencyHistogram: fixed log-spaced buckets (about 25% apart, 10 ms to
+    two minutes), so p50/p95/p99 can be read off any merge of histograms
+    without keeping every sample.
+  - UsageBucket: requests, tokens, cost and latency for one slice of
+    traffic (a model, a method, or both).
+  - RecentLatency: per-model histograms over the last few minutes, for
+    latency-SLO routing (see model_router.py).
+  - UsageStore: one SQLite file (backend/gemini_usage.db) holding a row per
+    flush interval, model and method. Rows older than
+    GEMINI_USAGE_RETENTION_DAYS are pruned; window() merges the rows of a
+    time window back into buckets.
+
+GeminiClient flushes its pending buckets every GEMINI_USAGE_FLUSH_INTERVAL
+seconds and on shutdown.
+
+Usage:
+    from services.usage_store import UsageStore, USAGE_STORE_PATH
+    store = UsageStore(USAGE_STORE_PATH, retention_seconds=30 * 86400)
+    store.record(period_start, period_end, pending)
+    by_model, by_method = store.window(since=time.time() - 3600)
+"""
+
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+logger = logging.getLogger(__name__)
+
+USAGE_STORE_PATH = Path(__file__).parent.parent / "gemini_usage.db"
+
+# Bucket upper bounds in ms; one more bucket catches everything slower
+LATENCY_BUCKETS_MS: Tuple[float, ...] = tuple(round(10 * 1.25 ** i, 1) for i in range(43))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS gemini_usage (
+    period_start REAL NOT NULL,
+    period_end REAL NOT NULL,
+    model TEXT NOT NULL,
+    method TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    input_tokens INTEGER NOT NULL,
+    output_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    estimated_requests INTEGER NOT NULL,
+    latency_counts TEXT NOT NULL,
+    latency_sum_ms REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_gemini_usage_end ON gemini_usage (period_end);
+"""
+
+
+def _empty_counts() -> List[int]:
+    return [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+class LatencyHistogram(BaseModel):
+    """Latency distribution in fixed buckets (see LATENCY_BUCKETS_MS)."""
+    counts: List[int] = []
+    count: int = 0
+    sum_ms: float = 0.0
+
+    def observe(self, latency_ms: float):
+        if not self.counts:
+            self.counts = _empty_counts()
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.sum_ms += latency_ms
+
+    def merge(self, other: "LatencyHistogram"):
+        if not other.count:
+            return
+        if not self.counts:
+            self.counts = _empty_counts()
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum_ms += other.sum_ms
+
+    @property
+    def avg_ms(self) -> Optional[float]:
+        return self.sum_ms / self.count if self.count else None
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0..1), interpolated within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                if i == len(LATENCY_BUCKETS_MS):
+                    return LATENCY_BUCKETS_MS[-1]  # open-ended: report its lower bound
+                lower = LATENCY_BUCKETS_MS[i - 1] if i else 0.0
+                return lower + (LATENCY_BUCKETS_MS[i] - lower) * (rank - seen) / n
+            seen += n
+        return LATENCY_BUCKETS_MS[-1]
+
+    def summary(self) -> Dict[str, Any]:
+        def _ms(value: Optional[float]) -> Optional[float]:
+            return round(value, 1) if value is not None else None
+
+        return {
+            "count": self.count,
+            "avg_ms": _ms(self.avg_ms),
+            "p50_ms": _ms(self.percentile(0.50)),
+            "p95_ms": _ms(self.percentile(0.95)),
+            "p99_ms": _ms(self.percentile(0.99)),
+        }
+
+
+class UsageBucket(BaseModel):
+    """Requests, tokens, cost and latency for one slice of Gemini traffic."""
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    # Requests whose token counts were estimated (no usage metadata)
+    estimated_requests: int = 0
+    latency: LatencyHistogram = Field(default_factory=LatencyHistogram)
+
+    def add(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cost_usd: float,
+        latency_ms: Optional[float],
+        estimated: bool,
+    ):
+        self.requests += 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cost_usd += cost_usd
+        self.estimated_requests += int(estimated)
+        if latency_ms is not None:
+            self.latency.observe(latency_ms)
+
+    def merge(self, other: "UsageBucket"):
+        self.requests += other.requests
+        self.input_tokens += other.input_tokens
+        self.output_tokens += other.output_tokens
+        self.cost_usd += other.cost_usd
+        self.estimated_requests += other.estimated_requests
+        self.latency.merge(other.latency)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": round(self.cost_usd, 6),
+            "estimated_requests": self.estimated_requests,
+            "latency": self.latency.summary(),
+        }
+
+
+class RecentLatency(BaseModel):
+    """Per-model latency over roughly the last window_seconds.
+
+    Two sets of histograms rotate every window_seconds and reads merge
+    both, so they cover between one and two windows of traffic.
+    """
+    window_seconds: float = 300.0
+    current: Dict[str, LatencyHistogram] = {}
+    previous: Dict[str, LatencyHistogram] = {}
+    rotated_at: float = Field(default_factory=time.monotonic)
+
+    def _rotate(self):
+        now = time.monotonic()
+        elapsed = now - self.rotated_at
+        if elapsed >= self.window_seconds:
+            self.previous = self.current if elapsed < 2 * self.window_seconds else {}
+            self.current = {}
+            self.rotated_at = now
+
+    def observe(self, model: str, latency_ms: float):
+        self._rotate()
+        self.current.setdefault(model, LatencyHistogram()).observe(latency_ms)
+
+    def percentile(self, q: float) -> Dict[str, float]:
+        """q-quantile latency per model with recent observations."""
+        self._rotate()
+        merged: Dict[str, LatencyHistogram] = {}
+        for histograms in (self.previous, self.current):
+            for model, histogram in histograms.items():
+                merged.setdefault(model, LatencyHistogram()).merge(histogram)
+        return {model: histogram.percentile(q) for model, histogram in merged.items() if histogram.count}
+
+
+# model -> method -> bucket
+PendingUsage = Dict[str, Dict[str, UsageBucket]]
+
+
+def merge_pending(
+    pending: PendingUsage,
+    by_model: Dict[str, UsageBucket],
+    by_method: Dict[str, UsageBucket],
+):
+    """Fold (model, method) buckets into per-model and per-method totals."""
+    for model, methods in pending.items():
+        for method, bucket in methods.items():
+            by_model.setdefault(model, UsageBucket()).merge(bucket)
+            by_method.setdefault(method, UsageBucket()).merge(bucket)
+
+
+class UsageStore:
+    """SQLite history of Gemini usage, one row per flush, model and method."""
+
+    def __init__(self, path: Path, retention_seconds: float):
+        self.path = Path(path)
+        self.retention_seconds = retention_seconds
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def record(self, period_start: float, period_end: float, pending: PendingUsage) -> int:
+        """Store one flush interval, then prune rows past retention. Returns rows written."""
+        rows = [
+            (
+                period_start, period_end, model, method,
+                bucket.requests, bucket.input_tokens, bucket.output_tokens, bucket.cost_usd,
+                bucket.estimated_requests,
+                json.dumps(bucket.latency.counts or _empty_counts()), bucket.latency.sum_ms,
+            )
+            for model, methods in pending.items()
+            for method, bucket in methods.items()
+            if bucket.requests
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT INTO gemini_usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "DELETE FROM gemini_usage WHERE period_end < ?", (period_end - self.retention_seconds,)
+            )
+            self._conn.execute("COMMIT")
+        return len(rows)
+
+    def window(
+        self, since: float, until: Optional[float] = None
+    ) -> Tuple[Dict[str, UsageBucket], Dict[str, UsageBucket]]:
+        """Usage of the intervals that ended within [since, until], per model and per method."""
+        until = time.time() if until is None else until
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT model, method, requests, input_tokens, output_tokens, cost_usd, "
+                "estimated_requests, latency_counts, latency_sum_ms "
+                "FROM gemini_usage WHERE period_end >= ? AND period_end <= ?",
+                (since, until),
+            ).fetchall()
+
+        pending: PendingUsage = {}
+        for model, method, requests, tokens_in, tokens_out, cost, estimated, counts, sum_ms in rows:
+            counts = json.loads(counts)
+            bucket = UsageBucket(
+                requests=requests,
+                input_tokens=tokens_in,
+                output_tokens=tokens_out,
+                cost_usd=cost,
+                estimated_requests=estimated,
+                latency=LatencyHistogram(counts=counts, count=sum(counts), sum_ms=sum_ms),
+            )
+            pending.setdefault(model, {}).setdefault(method, UsageBucket()).merge(bucket)
+
+        by_model: Dict[str, UsageBucket] = {}
+        by_method: Dict[str, UsageBucket] = {}
+        merge_pending(pending, by_model, by_method)
+        return by_model, by_method
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
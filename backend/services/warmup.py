@@ -0,0 +1,124 @@
+"""
+AI Warm-up — Intelligence Flywheel
+
+Opt-in (RAG_WARMUP=true) background warm-up of the AI path at startup.
+Without it, the first /api/ai/assist after a deploy pays for importing
+sentence-transformers, loading the model and parsing the vector index,
+because get_rag_service() and the embedder are lazy.
+
+start_warmup() is called from the lifespan hook and returns immediately;
+a daemon thread then builds the RAG service (loading the index), loads the
+embedder, runs one encode so first-call initialization happens now, and
+starts the embedding worker process when that is enabled.
+
+/api/health reports the warm-up state; /api/health/ai answers 503 until the
+instance is warm so a load balancer can keep AI traffic on warm instances.
+
+Usage:
+    from services.warmup import start_warmup, get_warmup_status
+    start_warmup()
+    get_warmup_status().ready
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+WARMUP_DISABLED = "disabled"
+WARMUP_PENDING = "pending"
+WARMUP_RUNNING = "running"
+WARMUP_READY = "ready"
+WARMUP_FAILED = "failed"
+
+
+class WarmupStatus(BaseModel):
+    """State of the startup warm-up."""
+    status: str = WARMUP_DISABLED
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        # Without warm-up nothing gates AI traffic (lazy loading, as before)
+        return self.status in (WARMUP_DISABLED, WARMUP_READY)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "error": self.error,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_ms": self.duration_ms,
+        }
+
+
+_status = WarmupStatus()
+_lock = threading.Lock()
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("RAG_WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+def run_warmup():
+    """Load the index, embedder and embedding worker. Blocking."""
+    global _status
+    start = time.perf_counter()
+    with _lock:
+        _status = WarmupStatus(status=WARMUP_RUNNING, started_at=datetime.utcnow())
+    try:
+        from services.semantic_rag import get_rag_service
+        from services.embedding_worker import get_embedding_batcher
+
+        rag = get_rag_service()
+        rag.warm_up()
+        batcher = get_embedding_batcher()
+        if batcher is not None:
+            batcher.warm_up()
+
+        status, error = WARMUP_READY, None
+        logger.info(f"AI warm-up finished in {(time.perf_counter() - start) * 1000:.0f}ms "
+                    f"({len(rag.snapshot)} indexed cases)")
+    except Exception as e:
+        status, error = WARMUP_FAILED, str(e)
+        logger.error(f"AI warm-up failed: {e}")
+
+    with _lock:
+        _status = _status.model_copy(update={
+            "status": status,
+            "error": error,
+            "finished_at": datetime.utcnow(),
+            "duration_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+
+
+def start_warmup() -> bool:
+    """Start warm-up in a daemon thread if RAG_WARMUP is set.
+
+    Returns:
+        Whether a warm-up was started
+    """
+    global _status
+    if not warmup_enabled():
+        return False
+    with _lock:
+        if _status.status in (WARMUP_PENDING, WARMUP_RUNNING):
+            return False
+        _status = WarmupStatus(status=WARMUP_PENDING)
+    threading.Thread(target=run_warmup, name="ai-warmup", daemon=True).start()
+    return True
+
+
+def get_warmup_status() -> WarmupStatus:
+    with _lock:
+        return _status
@@ -0,0 +1,64 @@
+"""
+Case Context Tests
+
+Token-budgeted similar-case context: budget enforcement, query-relevant
+sentence extraction, near-duplicate removal and saved-token reporting.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.case_context import build_case_context, condense, estimate_tokens
+
+
+def _case(title, description="", notes="", **extra):
+    return {"title": title, "description": description, "notes": notes, **extra}
+
+
+def test_small_cases_are_rendered_in_full():
+    cases = [(_case("Fix login", "Session cookie expired early.", assignee="Ana"), 0.8)]
+    context = build_case_context(cases, "login cookie", budget=800)
+    assert "Description: Session cookie expired early." in context.text
+    assert "Assignee: Ana" in context.text
+    assert context.saved_tokens == 0
+    assert context.tokens == estimate_tokens(context.text)
+
+
+def test_budget_is_enforced_and_savings_reported():
+    topics = ["dashboard layout", "release notes", "onboarding survey"]
+    cases = [
+        (_case(
+            f"Case {i}",
+            f"We reviewed the {topic} again. " * 40 + "The payments-gateway timeout was raised to 30s.",
+            f"Follow-up on the {topic}. " * 40,
+        ), 0.9 - i / 10)
+        for i, topic in enumerate(topics)
+    ]
+    context = build_case_context(cases, "payments-gateway timeout", budget=300)
+
+    assert context.tokens <= 300
+    assert context.saved_tokens > 1000
+    # Most similar first; the query-relevant sentence survives condensing
+    assert context.text.index("Case 0") < context.text.index("Case 1")
+    assert "payments-gateway timeout was raised" in context.text
+
+
+def test_near_duplicates_are_dropped():
+    notes = "Rotated the API keys for the billing service and updated the vault entry."
+    cases = [
+        (_case("Rotate billing keys", notes=notes), 0.9),
+        (_case("Rotate billing keys", notes=notes), 0.85),
+        (_case("Migrate search index", notes="Moved to the new cluster."), 0.5),
+    ]
+    context = build_case_context(cases, "rotate keys", budget=800)
+    assert context.deduplicated == 1
+    assert [meta["title"] for meta, _ in context.cases] == ["Rotate billing keys", "Migrate search index"]
+    assert context.text.count("Rotate billing keys") == 1
+
+
+def test_condense_truncates_a_single_long_sentence():
+    text = "word " * 200
+    condensed = condense(text, set(), 20)
+    assert condensed.endswith("…")
+    assert estimate_tokens(condensed) <= 20
@@ -0,0 +1,74 @@
+"""
+Case Store Tests
+
+Packed case study storage: upsert/tombstone semantics, slug allocation in
+case_memory, lazy README rendering and importing legacy directories.
+"""
+import os
+import sys
+import json
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import case_store
+from services.case_store import CaseStore, render_readme
+from services.case_memory import write_case_study
+
+
+@pytest.fixture
+def store(tmp_path):
+    with patch.object(case_store, "CASE_STORE_PATH", tmp_path / "cases.db"), \
+         patch("services.semantic_rag.get_rag_service"):
+        yield case_store.get_case_store()
+
+
+def test_upsert_manifest_and_tombstone(store):
+    store.upsert({"id": "t1", "slug": "0101_a", "title": "A", "completed_at": "2024-01-01"})
+    store.upsert({"id": "t2", "slug": "0102_b", "title": "B", "completed_at": "2024-01-02"})
+    assert [m["slug"] for m in store.manifest()] == ["0101_a", "0102_b"]
+
+    assert store.tombstone_task("t1", "2024-02-01") == ["0101_a"]
+    assert store.count() == 1 and store.count(include_deleted=True) == 2
+    assert [c["slug"] for c in store.iter_cases()] == ["0102_b"]
+    assert store.get("0101_a") is None
+
+    # Writing the case again revives it
+    store.upsert({"id": "t1", "slug": "0101_a", "title": "A2", "completed_at": "2024-03-01"})
+    assert store.get("0101_a")["title"] == "A2"
+
+
+def test_write_case_study_reuses_and_allocates_slugs(store):
+    first = write_case_study({"id": "t1", "title": "Fix Login", "comments": [{"author": "You", "text": "Done"}]})
+    assert "- **You:** Done" in render_readme(store.get(first["slug"]))
+    again = write_case_study({"id": "t1", "title": "Fix Login (again)"})
+    other = write_case_study({"id": "t2", "title": "Fix Login"})
+
+    assert again["slug"] == first["slug"]
+    assert other["slug"] == first["slug"] + "-2"
+    assert store.count() == 2
+
+    readme = render_readme(store.get(other["slug"]))
+    assert readme.startswith("# Fix Login")
+    assert "**Value Stream:** None" in readme
+    # The re-completion rewrote the first case in place (its comments are gone)
+    assert render_readme(store.get(first["slug"])).startswith("# Fix Login (again)")
+    assert "## Discussion" not in render_readme(store.get(first["slug"]))
+
+
+def test_import_directory(tmp_path):
+    legacy = tmp_path / "case_studies"
+    for slug, deleted in [("0101_a", None), ("0102_b", "2024-02-01")]:
+        (legacy / slug / "artifacts").mkdir(parents=True)
+        metadata = {"id": slug, "slug": slug, "title": slug, "indexed_text": slug}
+        if deleted:
+            metadata["deleted_at"] = deleted
+        (legacy / slug / "metadata.json").write_text(json.dumps(metadata))
+        (legacy / slug / "README.md").write_text(f"# {slug}")
+
+    store = CaseStore(tmp_path / "cases.db")
+    assert store.import_directory(legacy) == 2
+    assert store.import_directory(legacy) == 2  # idempotent
+    assert [m["slug"] for m in store.manifest()] == ["0101_a"]
+    assert store.get("0102_b", include_deleted=True)["deleted_at"] == "2024-02-01"
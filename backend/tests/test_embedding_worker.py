@@ -0,0 +1,79 @@
+"""
+Embedding Worker Tests
+
+Checks that concurrent encode calls are coalesced into batches and that
+each caller gets back its own row.
+"""
+import os
+import sys
+import asyncio
+import concurrent.futures
+import pytest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import embedding_worker
+from services.embedding_worker import EmbeddingBatcher
+from services.embedders import HashingEmbedder
+
+DESCRIPTOR = {"name": "hashing", "n_features": 64}
+TEXTS = [f"deploy service {i} api bug" for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_encodes_share_one_batch():
+    embedding_worker._init_worker(DESCRIPTOR)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        batcher = EmbeddingBatcher(DESCRIPTOR, max_batch=32, max_wait_ms=20, executor=pool)
+        vectors = await asyncio.gather(*(batcher.encode(t) for t in TEXTS))
+
+    assert batcher.stats()["batches"] == 1
+    expected = HashingEmbedder(n_features=64).encode_batch(TEXTS)
+    np.testing.assert_allclose(np.stack(vectors), expected, rtol=1e-6)
+
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting():
+    embedding_worker._init_worker(DESCRIPTOR)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        batcher = EmbeddingBatcher(DESCRIPTOR, max_batch=4, max_wait_ms=10_000, executor=pool)
+        await asyncio.wait_for(asyncio.gather(*(batcher.encode(t) for t in TEXTS[:8])), timeout=5)
+    assert batcher.stats()["batches"] == 2
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_batches_in_flight():
+    import threading
+    release = threading.Event()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as pool:
+        pool.submit(release.wait, 5)  # Hold the only worker
+        batcher = EmbeddingBatcher(DESCRIPTOR, max_batch=2, max_wait_ms=10_000, executor=pool)
+        calls = asyncio.gather(*(batcher.encode(t) for t in TEXTS[:2]))
+        await asyncio.sleep(0.01)
+        assert len(batcher._batches) == 1
+
+        batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(calls, timeout=5)
+        release.set()
+    assert not batcher._batches
+
+
+@pytest.mark.asyncio
+async def test_worker_process_round_trip():
+    batcher = EmbeddingBatcher(DESCRIPTOR, max_wait_ms=5)
+    try:
+        vectors = await asyncio.wait_for(
+            asyncio.gather(*(batcher.encode(t) for t in TEXTS[:3])), timeout=60
+        )
+    finally:
+        batcher.close()
+    expected = HashingEmbedder(n_features=64).encode_batch(TEXTS[:3])
+    np.testing.assert_allclose(np.stack(vectors), expected, rtol=1e-6)
+
+
+def test_batcher_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("RAG_EMBED_WORKER", raising=False)
+    assert embedding_worker.get_embedding_batcher() is None
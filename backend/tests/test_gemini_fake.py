@@ -0,0 +1,83 @@
+"""
+Fake Gemini Backend Tests
+
+Latency specs, canned and batch answers with token counts, and the client's
+retry and deadline paths driven by injected errors and hangs.
+"""
+import os
+import sys
+import random
+import asyncio
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.gemini_client import GeminiClient
+from services.gemini_fake import parse_latency
+from services.gemini_transport import GeminiAPIError
+
+
+def fake_client(**env) -> GeminiClient:
+    settings = {
+        "GEMINI_TRANSPORT": "fake",
+        "GEMINI_CACHE_TTL": "0",
+        "GEMINI_USAGE_FLUSH_INTERVAL": "0",
+        "GEMINI_FAKE_LATENCY": "fixed:1",
+        "GEMINI_FAKE_SEED": "7",
+        "GEMINI_FAKE_STREAM_INTERVAL_MS": "0",
+        **env,
+    }
+    with patch.dict(os.environ, settings):
+        return GeminiClient()
+
+
+def test_parse_latency_specs():
+    rng = random.Random(1)
+    assert parse_latency("fixed:250")(rng) == 250
+    assert all(200 <= parse_latency("uniform:200,400")(rng) <= 400 for _ in range(50))
+    samples = sorted(parse_latency("lognormal:600,0.4")(rng) for _ in range(2001))
+    assert samples[1000] == pytest.approx(600, rel=0.1)
+    for spec in ("fixed", "uniform:1", "gaussian:1,2"):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+@pytest.mark.asyncio
+async def test_answers_with_token_counts_and_batch_labels():
+    gemini = fake_client()
+    assert gemini.available
+
+    text = await gemini.generate("What should I do next on this task?")
+    assert text.startswith("Fake answer from")
+    assert gemini.get_usage_stats()["by_method"]["generate"]["estimated_requests"] == 0
+
+    chunks = [chunk async for chunk in gemini.generate_stream("Stream me an answer")]
+    assert len(chunks) > 1 and "".join(chunks).startswith("Fake answer from")
+
+    from services.ai_service import BatchAdvice
+    batch = await gemini.generate_structured(
+        '### T1: first task\n### T2: second task\nRespond as JSON: {"tasks": [...]}', BatchAdvice
+    )
+    assert [item.task for item in batch.tasks] == ["T1", "T2"]
+
+    stats = gemini.get_usage_stats()
+    assert stats["fake_backend"]["calls"] == 3
+    assert stats["total_input_tokens"] > 0
+    await gemini.aclose()
+
+
+@pytest.mark.asyncio
+async def test_injected_errors_and_hangs_exercise_retries_and_deadlines():
+    gemini = fake_client(GEMINI_FAKE_ERROR_RATE="1", GEMINI_MAX_ATTEMPTS="2")
+    with pytest.raises(GeminiAPIError):
+        await gemini.generate("doomed")
+    assert gemini.retries == 1
+    assert gemini.get_usage_stats()["fake_backend"]["errors"] == 2
+    await gemini.aclose()
+
+    gemini = fake_client(GEMINI_FAKE_HANG_RATE="1", GEMINI_TIMEOUT="0.05", GEMINI_MAX_ATTEMPTS="1")
+    with pytest.raises(asyncio.TimeoutError):
+        await gemini.generate("stuck")
+    assert gemini.timeouts == 1
+    await gemini.aclose()
@@ -0,0 +1,154 @@
+"""
+Gemini Resilience Tests
+
+Circuit breaker transitions, retries of transient errors, hedged attempts,
+end-to-end deadlines, and AI assist falling back when the circuit is open.
+"""
+import os
+import sys
+import asyncio
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.gemini_client import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitBreaker,
+    GeminiClient,
+    GeminiScheduler,
+    GeminiUnavailable,
+)
+from services.gemini_transport import Completion, GeminiAPIError
+
+
+@pytest.fixture
+def gemini():
+    env = {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0", "GEMINI_BREAKER_FAILURES": "2"}
+    with patch.dict(os.environ, env):
+        client = GeminiClient()
+    client.available = True
+    return client
+
+
+def _fake_complete(*outcomes):
+    """_complete replacement returning/raising outcomes in order; a float sleeps first."""
+    calls = []
+
+    async def complete(prompt, temperature, max_tokens, model_name=None):
+        outcome = outcomes[len(calls)]
+        calls.append(prompt)
+        if isinstance(outcome, tuple):
+            delay, outcome = outcome
+            await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Completion(outcome)
+
+    return complete, calls
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    with patch("services.gemini_client.time.monotonic", return_value=100.0):
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_OPEN
+        assert not breaker.allow()
+
+    with patch("services.gemini_client.time.monotonic", return_value=131.0):
+        assert breaker.allow()  # the probe
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert not breaker.allow()  # only one probe at a time
+        breaker.record_failure()
+        assert breaker.state == CIRCUIT_OPEN
+
+    with patch("services.gemini_client.time.monotonic", return_value=162.0):
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CIRCUIT_CLOSED and breaker.allow()
+
+    assert breaker.stats()["trips"] == 2
+    assert breaker.stats()["short_circuited"] == 2
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried_others_are_not(gemini):
+    gemini._complete, calls = _fake_complete(GeminiAPIError("busy", status_code=503), "ok")
+    assert await gemini.generate("a") == "ok"
+    assert len(calls) == 2 and gemini.retries == 1
+
+    gemini._complete, calls = _fake_complete(GeminiAPIError("bad request", status_code=400), "ok")
+    with pytest.raises(GeminiAPIError):
+        await gemini.generate("b")
+    assert len(calls) == 1
+    assert gemini.breaker.state == CIRCUIT_CLOSED
+
+
+@pytest.mark.asyncio
+async def test_hedged_attempt_wins_when_the_first_stalls(gemini):
+    gemini.hedge_after = 0.05
+    gemini._complete, calls = _fake_complete((5, "slow"), "fast")
+    assert await asyncio.wait_for(gemini.generate("a"), timeout=1) == "fast"
+    assert gemini.hedges == 1
+
+
+@pytest.mark.asyncio
+async def test_deadline_then_circuit_opens_and_fails_fast(gemini):
+    gemini.max_attempts = 1
+    gemini._complete, calls = _fake_complete((5, "never"), (5, "never"), "unused")
+    for prompt in ("a", "b"):
+        with pytest.raises(asyncio.TimeoutError):
+            await gemini.generate(prompt, timeout=0.05)
+    assert gemini.breaker.state == CIRCUIT_OPEN
+
+    with pytest.raises(GeminiUnavailable):
+        await gemini.generate("c")
+    assert len(calls) == 2
+
+    stats = gemini.get_usage_stats()
+    assert stats["circuit_breaker"]["state"] == CIRCUIT_OPEN
+    assert stats["deadlines"]["timeouts"] == 2
+
+
+@pytest.mark.asyncio
+async def test_deadlines_spent_in_the_queue_do_not_trip_the_breaker(gemini):
+    # A healthy backend, but a burst waits for the one slot past its budget
+    gemini.scheduler = GeminiScheduler(max_concurrency=1, max_queue=8)
+    gemini._complete, calls = _fake_complete(*[(0.1, "ok")] * 8)
+    results = await asyncio.gather(
+        *(gemini.generate(f"prompt {i}", timeout=1 if i < 2 else 0.15) for i in range(6)),
+        return_exceptions=True,
+    )
+    assert results[:2] == ["ok", "ok"]
+    assert all(isinstance(r, asyncio.TimeoutError) for r in results[2:])
+    # The others were out of budget by the time they got the slot: never sent
+    await asyncio.sleep(0.05)
+    assert len(calls) == 2
+    assert gemini.breaker.state == CIRCUIT_CLOSED
+    assert gemini.breaker.consecutive_failures == 0
+    assert await gemini.generate("after the burst") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_probe_answered_with_a_client_error_closes_the_circuit(gemini):
+    gemini.breaker.state, gemini.breaker.opened_at = CIRCUIT_OPEN, float("-inf")
+    gemini._complete, calls = _fake_complete(GeminiAPIError("bad request", status_code=400), "ok")
+    with pytest.raises(GeminiAPIError):
+        await gemini.generate("a")
+    assert gemini.breaker.state == CIRCUIT_CLOSED
+    assert await gemini.generate("b") == "ok"
+
+
+@pytest.mark.asyncio
+async def test_assist_falls_back_when_circuit_is_open(gemini):
+    from services.ai_service import assist_with_task
+    gemini.breaker.state, gemini.breaker.opened_at = CIRCUIT_OPEN, float("inf")
+
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini), \
+         patch("services.ai_service.find_similar_cases", return_value=([], "ok")):
+        result = await assist_with_task({"title": "Help"})
+    assert result["model"] == "fallback"
@@ -0,0 +1,167 @@
+"""
+Gemini Scheduler Tests
+
+Singleflight coalescing, priority ordering, bounded-queue rejection,
+slot accounting when waiters are cancelled, and shared calls taking the
+priority and deadline of the callers that join them.
+"""
+import os
+import sys
+import asyncio
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.gemini_client import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    GeminiClient,
+    GeminiOverloaded,
+    GeminiScheduler,
+)
+from services.gemini_transport import Completion
+
+
+async def _settle():
+    """Let queued tasks run up to their next wait."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_share_one_call():
+    scheduler = GeminiScheduler(max_concurrency=4, max_queue=4)
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    results = await asyncio.gather(*(scheduler.run("same", PRIORITY_INTERACTIVE, call) for _ in range(5)))
+    assert results == ["answer"] * 5
+    assert calls == 1
+    assert scheduler.stats()["coalesced"] == 4
+
+    # Once finished, the key is free again
+    await scheduler.run("same", PRIORITY_INTERACTIVE, call)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_jump_background_ones():
+    scheduler = GeminiScheduler(max_concurrency=1, max_queue=8)
+    gate = asyncio.Event()
+    order = []
+
+    def job(name):
+        async def call():
+            if name == "first":
+                await gate.wait()
+            order.append(name)
+            return name
+        return call
+
+    first = asyncio.ensure_future(scheduler.run("first", PRIORITY_INTERACTIVE, job("first")))
+    await _settle()
+    waiting = [
+        asyncio.ensure_future(scheduler.run(name, priority, job(name)))
+        for name, priority in [("bg1", PRIORITY_BACKGROUND), ("bg2", PRIORITY_BACKGROUND), ("ui", PRIORITY_INTERACTIVE)]
+    ]
+    await _settle()
+    stats = scheduler.stats()
+    assert (stats["active"], stats["queued_interactive"], stats["queued_background"]) == (1, 1, 2)
+
+    gate.set()
+    await asyncio.gather(first, *waiting)
+    assert order == ["first", "ui", "bg1", "bg2"]
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_fast_and_cancelled_waiters_free_their_place():
+    scheduler = GeminiScheduler(max_concurrency=1, max_queue=1)
+    gate = asyncio.Event()
+
+    async def blocked():
+        await gate.wait()
+        return "done"
+
+    running = asyncio.ensure_future(scheduler.run("a", PRIORITY_INTERACTIVE, blocked))
+    await _settle()
+    queued = asyncio.ensure_future(scheduler.run("b", PRIORITY_INTERACTIVE, blocked))
+    await _settle()
+
+    assert scheduler.saturated
+    with pytest.raises(GeminiOverloaded):
+        await scheduler.run("c", PRIORITY_INTERACTIVE, blocked)
+    assert scheduler.stats()["rejected"] == 1
+
+    # The shared call behind "b" is cancelled directly; its place is freed
+    scheduler._inflight["b"].task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    assert not scheduler.saturated
+
+    gate.set()
+    assert await running == "done"
+    assert await scheduler.run("d", PRIORITY_INTERACTIVE, blocked) == "done"
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_caller_promotes_a_queued_background_call():
+    scheduler = GeminiScheduler(max_concurrency=1, max_queue=8)
+    gate = asyncio.Event()
+    order = []
+
+    def job(name):
+        async def call():
+            if name == "first":
+                await gate.wait()
+            order.append(name)
+            return name
+        return call
+
+    first = asyncio.ensure_future(scheduler.run("first", PRIORITY_INTERACTIVE, job("first")))
+    await _settle()
+    prefetch = asyncio.ensure_future(scheduler.run("prefetch", PRIORITY_BACKGROUND, job("prefetch"), 10.0))
+    other = asyncio.ensure_future(scheduler.run("other", PRIORITY_BACKGROUND, job("other")))
+    await _settle()
+    joined = asyncio.ensure_future(scheduler.run("prefetch", PRIORITY_INTERACTIVE, job("unused"), 20.0))
+    await _settle()
+
+    stats = scheduler.stats()
+    assert (stats["queued_interactive"], stats["queued_background"]) == (1, 1)
+    assert scheduler.deadline("prefetch") == 20.0
+
+    gate.set()
+    assert await asyncio.gather(first, prefetch, other, joined) == ["first", "prefetch", "other", "prefetch"]
+    assert order == ["first", "prefetch", "other"]
+    assert scheduler.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_coalesced_caller_keeps_its_own_longer_deadline():
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0"}):
+        gemini = GeminiClient()
+    gemini.available = True
+    calls = 0
+
+    async def complete(prompt, temperature, max_tokens, model_name=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.2)
+        return Completion("answer")
+
+    gemini._complete = complete
+    impatient = asyncio.ensure_future(gemini.generate("same", timeout=0.05))
+    await _settle()
+    patient = asyncio.ensure_future(gemini.generate("same", timeout=2))
+
+    with pytest.raises(asyncio.TimeoutError):
+        await impatient
+    assert await patient == "answer"
+    assert calls == 1
@@ -0,0 +1,177 @@
+"""
+Gemini REST Transport Tests
+
+Runs the async transport and GeminiClient against a local stub of the
+generateContent / streamGenerateContent endpoints: request shape,
+streaming, usage metadata, error mapping, the concurrency semaphore and
+connection reuse.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import concurrent.futures
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pydantic import BaseModel
+
+from services.gemini_transport import Completion, GeminiAPIError, GeminiRestTransport
+
+
+def _candidate(text, usage=None):
+    payload = {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]}
+    if usage:
+        payload["usageMetadata"] = {"promptTokenCount": usage[0], "candidatesTokenCount": usage[1]}
+    return payload
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body: bytes, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        stub = self.server.stub
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = request["contents"][0]["parts"][0]["text"]
+        with stub.lock:
+            stub.requests.append((self.path, self.headers.get("x-goog-api-key"), request))
+            stub.ports.add(self.client_address[1])
+            stub.in_flight += 1
+            stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+        try:
+            time.sleep(stub.delay)
+            if prompt == "fail":
+                self._send(429, json.dumps({"error": {"code": 429, "message": "Quota exceeded"}}).encode())
+            elif ":streamGenerateContent" in self.path:
+                chunks = [_candidate("Hel"), _candidate("lo", usage=(7, 2))]
+                events = "".join(f"data: {json.dumps(c)}\r\n\r\n" for c in chunks)
+                self._send(200, events.encode(), "text/event-stream")
+            else:
+                self._send(200, json.dumps(_candidate(stub.reply, usage=(11, 3))).encode())
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+
+class _Stub:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests, self.ports = [], set()
+        self.in_flight = self.max_in_flight = 0
+        self.delay = 0.0
+        self.reply = "Stub answer"
+
+
+@pytest.fixture
+def stub():
+    state = _Stub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    server.daemon_threads = True
+    server.stub = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state.url = f"http://127.0.0.1:{server.server_port}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_generate_and_stream(stub):
+    transport = GeminiRestTransport("key-123", base_url=stub.url)
+    assert await transport.generate_content("gemini-x", "hi", 0.4, 256) == Completion("Stub answer", 11, 3)
+    chunks = [c async for c in transport.stream_generate_content("gemini-x", "hi", 0.4, 256)]
+    assert chunks == [Completion("Hel"), Completion("lo", 7, 2)]
+    await transport.aclose()
+
+    (path, api_key, body), (stream_path, _, _) = stub.requests
+    assert path == "/v1beta/models/gemini-x:generateContent"
+    assert stream_path == "/v1beta/models/gemini-x:streamGenerateContent?alt=sse"
+    assert api_key == "key-123"
+    assert body["generationConfig"] == {"temperature": 0.4, "maxOutputTokens": 256}
+
+
+@pytest.mark.asyncio
+async def test_error_status_raises(stub):
+    transport = GeminiRestTransport("key", base_url=stub.url)
+    with pytest.raises(GeminiAPIError, match="Quota exceeded") as error:
+        await transport.generate_content("m", "fail", 0.1, 10)
+    assert error.value.status_code == 429
+    await transport.aclose()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_by_semaphore_and_connections_reused(stub):
+    stub.delay = 0.05
+    transport = GeminiRestTransport("key", base_url=stub.url, max_concurrency=2)
+    results = await asyncio.gather(*(transport.generate_content("m", "hi", 0.1, 10) for _ in range(8)))
+    await transport.aclose()
+
+    assert [result.text for result in results] == ["Stub answer"] * 8
+    assert stub.max_in_flight == 2
+    assert len(stub.ports) <= 2  # keep-alive: two pooled connections served all eight
+
+
+@pytest.mark.asyncio
+async def test_client_left_on_another_loop_is_closed(stub):
+    transport = GeminiRestTransport("key", base_url=stub.url)
+
+    # A loop that keeps running elsewhere closes its own client
+    other = asyncio.new_event_loop()
+    thread = threading.Thread(target=other.run_forever, daemon=True)
+    thread.start()
+    asyncio.run_coroutine_threadsafe(transport.generate_content("m", "hi", 0.1, 10), other).result(5)
+    running_client = transport._client
+    await transport.generate_content("m", "hi", 0.1, 10)
+    await asyncio.sleep(0.05)
+    assert running_client.is_closed
+    other.call_soon_threadsafe(other.stop)
+    thread.join(5)
+    other.close()
+
+    # One that is gone has its client closed from here
+    gone_client = transport._client
+    with concurrent.futures.ThreadPoolExecutor(1) as pool:
+        pool.submit(asyncio.run, transport.generate_content("m", "hi", 0.1, 10)).result(5)
+    stale_client = transport._client
+    await transport.generate_content("m", "hi", 0.1, 10)
+    await transport.aclose()
+    assert gone_client.is_closed and stale_client.is_closed and not transport._closing
+
+
+class Verdict(BaseModel):
+    ok: bool
+
+
+@pytest.mark.asyncio
+async def test_gemini_client_uses_rest_transport(stub):
+    from services.gemini_client import GeminiClient
+    env = {"GOOGLE_API_KEY": "key", "GEMINI_API_BASE": stub.url, "GEMINI_CACHE_TTL": "0"}
+    with patch.dict(os.environ, env):
+        os.environ.pop("GEMINI_TRANSPORT", None)
+        client = GeminiClient()
+
+    assert client.available and client.transport == "rest"
+    assert await client.generate("hello") == "Stub answer"
+    stub.reply = '```json\n{"ok": true}\n```'
+    assert await client.generate_structured("judge", Verdict) == Verdict(ok=True)
+    stats = client.get_usage_stats()
+    assert stats["total_requests"] == 2
+    # Token counts come from usageMetadata, not the 4-characters estimate
+    assert stats["total_input_tokens"] == 22 and stats["total_output_tokens"] == 6
+    await client.aclose()
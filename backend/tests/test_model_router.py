@@ -0,0 +1,109 @@
+"""
+Model Router Tests
+
+Parsing GEMINI_MODELS, routing by input size, tier and recent latency
+against an SLO, per-model pricing, and per-model usage accounting in
+GeminiClient.
+"""
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services.gemini_client import GeminiClient
+from services.gemini_transport import Completion
+from services.model_router import ModelRouter, model_pricing, parse_models, request_cost
+from services.usage_store import RecentLatency
+
+MODELS = {"light": "gemini-2.0-flash-lite", "standard": "gemini-2.0-flash", "heavy": "gemini-1.5-pro"}
+
+
+def test_parse_models_ignores_unknown_tiers():
+    spec = " light = gemini-2.0-flash-lite, turbo=x, heavy=gemini-1.5-pro,"
+    assert parse_models(spec) == {"light": "gemini-2.0-flash-lite", "heavy": "gemini-1.5-pro"}
+    assert parse_models("") == {}
+
+
+def test_routes_by_input_tokens_and_tier():
+    router = ModelRouter(MODELS, light_max_input_tokens=100, heavy_min_input_tokens=1000)
+    assert router.route(50) == "gemini-2.0-flash-lite"
+    assert router.route(500) == "gemini-2.0-flash"
+    assert router.route(5000) == "gemini-1.5-pro"
+    assert router.route(50, tier="heavy") == "gemini-1.5-pro"
+
+    standard_only = ModelRouter({"standard": "gemini-2.0-flash"})
+    assert standard_only.route(10) == standard_only.route(10**6) == "gemini-2.0-flash"
+    assert standard_only.route(10, tier="light") == "gemini-2.0-flash"
+
+
+def test_latency_slo_picks_most_capable_model_that_meets_it():
+    router = ModelRouter(MODELS)
+    observed = {"gemini-1.5-pro": 4000.0, "gemini-2.0-flash": 900.0, "gemini-2.0-flash-lite": 300.0}
+    assert router.route(50000, latency_slo_ms=1000, observed_latency_ms=observed) == "gemini-2.0-flash"
+    assert router.route(10, latency_slo_ms=5000, observed_latency_ms=observed) == "gemini-1.5-pro"
+    # Nothing meets it: the fastest observed model
+    assert router.route(10, latency_slo_ms=100, observed_latency_ms=observed) == "gemini-2.0-flash-lite"
+
+    # Unobserved models are not assumed to meet it
+    partial = {"gemini-2.0-flash-lite": 300.0}
+    assert router.route(10, latency_slo_ms=5000, observed_latency_ms=partial) == "gemini-2.0-flash-lite"
+    assert router.route(10, latency_slo_ms=5000, observed_latency_ms={}) == "gemini-2.0-flash"
+
+
+def test_recent_latency_forgets_old_windows():
+    recent = RecentLatency(window_seconds=60)
+    with patch("services.usage_store.time.monotonic", return_value=recent.rotated_at + 1):
+        recent.observe("slow", 4000.0)
+    with patch("services.usage_store.time.monotonic", return_value=recent.rotated_at + 61):
+        recent.observe("fast", 100.0)
+        assert set(recent.percentile(0.95)) == {"slow", "fast"}
+    with patch("services.usage_store.time.monotonic", return_value=recent.rotated_at + 200):
+        assert recent.percentile(0.95) == {}
+
+
+def test_pricing_by_longest_prefix():
+    assert model_pricing("gemini-1.5-flash-8b-001") == (0.0375, 0.15)
+    assert model_pricing("gemini-1.5-flash-002") == (0.075, 0.30)
+    assert model_pricing("some-future-model") == (0.075, 0.30)
+    assert request_cost("gemini-1.5-pro", 1_000_000, 1_000_000) == pytest.approx(6.25)
+
+
+@pytest.mark.asyncio
+async def test_usage_is_accounted_per_model():
+    env = {
+        "GOOGLE_API_KEY": "",
+        "GEMINI_CACHE_TTL": "0",
+        "GEMINI_MODEL": "gemini-2.0-flash",
+        "GEMINI_MODELS": "light=gemini-2.0-flash-lite,heavy=gemini-1.5-pro",
+        "GEMINI_LIGHT_MAX_INPUT_TOKENS": "10",
+    }
+    with patch.dict(os.environ, env):
+        gemini = GeminiClient()
+    gemini.available = True
+    models_called = []
+
+    async def complete(prompt, temperature, max_tokens, model_name=None):
+        models_called.append(model_name)
+        return Completion("x" * 400)
+
+    gemini._complete = complete
+    await gemini.generate("short")
+    await gemini.generate("a much longer prompt " * 10)
+    await gemini.generate("short", tier="heavy")
+    assert models_called == ["gemini-2.0-flash-lite", "gemini-2.0-flash", "gemini-1.5-pro"]
+
+    stats = gemini.get_usage_stats()
+    assert stats["models"] == {
+        "light": "gemini-2.0-flash-lite", "standard": "gemini-2.0-flash", "heavy": "gemini-1.5-pro"
+    }
+    by_model = stats["by_model"]
+    assert set(by_model) == set(models_called)
+    assert all(usage["requests"] == 1 and usage["latency"]["count"] == 1 for usage in by_model.values())
+    assert by_model["gemini-1.5-pro"]["cost_usd"] > by_model["gemini-2.0-flash-lite"]["cost_usd"]
+    assert stats["total_requests"] == 3
+
+    # All three have recent latencies now; an SLO above them picks the most capable
+    await gemini.generate("another short one", latency_slo_ms=60_000)
+    assert models_called[-1] == "gemini-1.5-pro"
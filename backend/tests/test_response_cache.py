@@ -0,0 +1,114 @@
+"""
+Gemini Response Cache Tests
+
+Keying, TTL expiry, LRU eviction, and GeminiClient answering repeated
+prompts from the cache without calling the model.
+"""
+import os
+import sys
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from pydantic import BaseModel
+
+from services import response_cache
+from services.response_cache import ResponseCache, cache_key
+
+
+def test_key_covers_generation_parameters():
+    base = cache_key("m", 0.4, 1024, "prompt")
+    assert base == cache_key("m", 0.4, 1024, "prompt")
+    assert len({
+        base,
+        cache_key("other", 0.4, 1024, "prompt"),
+        cache_key("m", 0.5, 1024, "prompt"),
+        cache_key("m", 0.4, 512, "prompt"),
+        cache_key("m", 0.4, 1024, "prompt!"),
+        cache_key("m", 0.4, 1024, "prompt", kind="structured:X"),
+    }) == 6
+
+
+def test_ttl_and_lru_eviction(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.db", ttl_seconds=60, max_entries=2)
+    with patch("services.response_cache.time.time", return_value=1000.0):
+        cache.put("a", "m", "A")
+    with patch("services.response_cache.time.time", return_value=1001.0):
+        cache.put("b", "m", "B")
+    with patch("services.response_cache.time.time", return_value=1002.0):
+        assert cache.get("a") == "A"  # a is now more recently used than b
+        cache.put("c", "m", "C")
+        assert cache.get("b") is None
+    with patch("services.response_cache.time.time", return_value=1061.5):
+        assert cache.get("a") is None  # expired
+        assert cache.get("c") == "C"
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (2, 2, 1)
+    assert stats["size"] == 1
+
+
+def test_size_is_kept_without_counting(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache, "RECOUNT_INTERVAL", 4)
+    cache = ResponseCache(tmp_path / "cache.db", ttl_seconds=60, max_entries=3)
+    for key in ("a", "b", "a", "c", "d", "e", "e"):
+        cache.put(key, "m", key.upper())
+    assert cache.stats()["size"] == 3 and cache.stats()["evictions"] == 2
+
+    # Another process sharing the file: the periodic recount catches up
+    other = ResponseCache(tmp_path / "cache.db", ttl_seconds=60, max_entries=3)
+    other.clear()
+    cache.put("f", "m", "F")
+    assert cache.stats()["size"] == 1
+
+    # stats() answers from counters, without touching the database
+    cache.close()
+    assert cache.stats()["size"] == 1
+
+
+class _CountingModel:
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        self.calls += 1
+        return type("Response", (), {"text": self.text})()
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+@pytest.fixture
+def gemini(tmp_path):
+    from services.gemini_client import GeminiClient
+    with patch.object(response_cache, "RESPONSE_CACHE_PATH", tmp_path / "cache.db"), \
+         patch.dict(os.environ, {"GOOGLE_API_KEY": "", "GEMINI_MODEL": "fake-model", "GEMINI_CACHE_TTL": "3600"}):
+        client = GeminiClient()
+    client.available = True
+    return client
+
+
+@pytest.mark.asyncio
+async def test_repeated_prompt_skips_the_model(gemini):
+    gemini.model = _CountingModel("Do the thing.")
+    assert await gemini.generate("same prompt") == "Do the thing."
+    assert await gemini.generate("same prompt") == "Do the thing."
+    assert await gemini.generate("same prompt", temperature=0.9) == "Do the thing."
+    assert gemini.model.calls == 2
+
+    stats = gemini.get_usage_stats()
+    assert stats["total_requests"] == 2
+    assert stats["response_cache"]["hits"] == 1
+    assert stats["response_cache"]["misses"] == 2
+
+    gemini.model = _CountingModel('{"answer": "42"}')
+    first = await gemini.generate_structured("question", Answer)
+    again = await gemini.generate_structured("question", Answer)
+    assert first == again == Answer(answer="42")
+    assert gemini.model.calls == 1
+    # A different output budget is a different request
+    await gemini.generate_structured("question", Answer, max_tokens=512)
+    assert gemini.model.calls == 2
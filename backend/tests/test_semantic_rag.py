@@ -0,0 +1,574 @@
+"""
+Semantic RAG Tests
+
+Exercises the vector index with a deterministic fake embedding model so the
+tests don't need sentence-transformers installed.
+"""
+import os
+import sys
+import json
+import threading
+import concurrent.futures
+import pytest
+from unittest.mock import patch
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import case_store, semantic_rag
+from services.semantic_rag import IndexSnapshot, SemanticRAG, ReindexCancelled
+from services.embedders import Embedder, HashingEmbedder
+from services.bm25 import LexicalIndex, tokenize
+
+
+class FakeEmbedder(Embedder):
+    """Bag-of-words embedding over a tiny fixed vocabulary."""
+    name = "fake"
+    VOCAB = ["deploy", "pipeline", "database", "migration", "frontend", "bug", "release", "api"]
+
+    def encode_batch(self, texts):
+        rows = []
+        for text in texts:
+            words = text.lower().split()
+            rows.append([float(words.count(w)) for w in self.VOCAB])
+        return np.array(rows, dtype=np.float32) + 0.01
+
+
+def write_case(store, slug, title, description="", notes="", value_stream="Platform",
+               assignee="You", completed_at="2024-01-01T00:00:00", task_id=None):
+    metadata = {
+        "id": task_id or slug,
+        "slug": slug,
+        "title": title,
+        "description": description,
+        "notes": notes,
+        "assignee": assignee,
+        "value_stream": value_stream,
+        "completed_at": completed_at,
+        "indexed_text": f"{title} {description} {notes}".strip(),
+    }
+    store.upsert(metadata)
+    return slug
+
+
+@pytest.fixture
+def rag_env(tmp_path):
+    with patch.object(case_store, "CASE_STORE_PATH", tmp_path / "cases.db"), \
+         patch.object(semantic_rag, "INDEX_PATH", tmp_path / "index.json"):
+        yield case_store.get_case_store()
+
+
+def make_rag(embedder=None):
+    return SemanticRAG(embedder=embedder or FakeEmbedder())
+
+
+def test_build_index_and_search(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline", "release pipeline")
+    write_case(rag_env, "0102_db", "database migration", "database")
+    rag = make_rag()
+
+    assert rag.build_index() == 2
+    results = rag.search("database migration", top_k=1)
+    assert results[0][0]["metadata"]["slug"] == "0102_db"
+
+
+def test_build_index_reports_progress(rag_env):
+    for i in range(3):
+        write_case(rag_env, f"010{i}_case", f"bug {i}")
+    rag = make_rag()
+    calls = []
+    rag.build_index(progress=lambda done, total: calls.append((done, total)))
+    assert calls[0] == (0, 3)
+    assert calls[-1] == (3, 3)
+
+
+def test_cancelled_rebuild_keeps_old_index(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    rag = make_rag()
+    rag.build_index()
+    old_snapshot = rag.snapshot
+
+    write_case(rag_env, "0102_db", "database migration")
+    cancel = threading.Event()
+
+    def _progress(done, total):
+        if done >= 1:
+            cancel.set()
+
+    with pytest.raises(ReindexCancelled):
+        rag.build_index(progress=_progress, cancel_event=cancel)
+
+    assert rag.snapshot is old_snapshot
+    assert len(rag.search("deploy", top_k=5)) == 1
+    # On-disk index still holds the old snapshot too
+    assert len(json.loads(semantic_rag.INDEX_PATH.read_text())["entries"]) == 1
+
+
+def test_search_serves_old_snapshot_during_rebuild(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    rag = make_rag()
+    rag.build_index()
+    write_case(rag_env, "0102_db", "database migration")
+
+    seen = []
+
+    def _progress(done, total):
+        # Mid-rebuild, searches still see the complete old index
+        seen.append(len(rag.search("deploy database", top_k=5)))
+
+    rag.build_index(progress=_progress)
+    assert all(n == 1 for n in seen)
+    assert len(rag.search("deploy database", top_k=5)) == 2
+
+
+def test_add_to_index_publishes_new_snapshot(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    rag = make_rag()
+    rag.build_index()
+    before = rag.snapshot
+
+    slug = write_case(rag_env, "0102_db", "database migration")
+    rag.add_to_index(slug)
+
+    assert len(before) == 1  # old snapshot is never mutated
+    assert len(rag.snapshot) == 2
+    assert not rag.snapshot.embeddings.flags.writeable
+
+
+def test_concurrent_search_and_insert(rag_env):
+    """Readers never see a torn index while writers keep inserting."""
+    rag = make_rag()
+    rag.build_index()
+    n_inserts = 40
+    slugs = [
+        write_case(rag_env, f"01{i:02d}_case", f"deploy bug {i}", "api release")
+        for i in range(n_inserts)
+    ]
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        last = 0
+        while not stop.is_set():
+            try:
+                results = rag.search("deploy api bug", top_k=100)
+                # Snapshots only grow, and each result set is self-consistent
+                assert len(results) >= last
+                assert len({r[0]["metadata"]["slug"] for r in results}) == len(results)
+                last = len(results)
+            except Exception as e:  # pragma: no cover - surfaced below
+                errors.append(e)
+                return
+
+    def writer(batch):
+        for slug in batch:
+            rag.add_to_index(slug)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        readers = [pool.submit(reader) for _ in range(4)]
+        writers = [pool.submit(writer, slugs[i::4]) for i in range(4)]
+        for w in writers:
+            w.result()
+        stop.set()
+        for r in readers:
+            r.result()
+
+    assert not errors
+    assert len(rag.snapshot) == n_inserts
+    assert len(json.loads(semantic_rag.INDEX_PATH.read_text())["entries"]) == n_inserts
+
+
+@pytest.mark.parametrize("mode", ["float16", "int8"])
+def test_compact_mode_search_and_lazy_metadata(rag_env, monkeypatch, mode):
+    write_case(rag_env, "0101_deploy", "deploy pipeline", "release pipeline", "long notes " * 50)
+    write_case(rag_env, "0102_db", "database migration", "database")
+    monkeypatch.setenv("RAG_COMPACT_MODE", mode)
+    rag = make_rag()
+    rag.build_index()
+
+    assert rag.snapshot.embeddings.dtype == np.dtype(mode)
+    assert "text" not in rag.snapshot.entries[0]
+    assert "notes" not in rag.snapshot.entries[0]["metadata"]
+
+    entry, score = rag.search("deploy pipeline", top_k=1)[0]
+    assert entry["metadata"]["slug"] == "0101_deploy"
+    # Bulky fields are hydrated from the case store for the hit
+    assert entry["metadata"]["description"] == "release pipeline"
+    assert entry["metadata"]["notes"].startswith("long notes")
+    assert score > 0.8
+
+    # Reloading the quantized index from disk keeps the same ranking
+    reloaded = make_rag()
+    assert reloaded.search("database", top_k=1)[0][0]["metadata"]["slug"] == "0102_db"
+
+
+def test_quantize_int8_round_trip():
+    vectors = np.random.default_rng(0).normal(size=(20, 384)).astype(np.float32)
+    stored, scales = semantic_rag.quantize(vectors, "int8")
+    assert stored.dtype == np.int8
+    restored = stored.astype(np.float32) * scales[:, None]
+    cos = (restored * vectors).sum(1) / (np.linalg.norm(restored, axis=1) * np.linalg.norm(vectors, axis=1))
+    assert cos.min() > 0.999
+
+
+def test_memory_usage_shrinks_in_compact_mode(rag_env, monkeypatch):
+    for i in range(5):
+        write_case(rag_env, f"010{i}_case", f"bug {i}", "description " * 40, "notes " * 80)
+    full = make_rag()
+    full.build_index()
+    monkeypatch.setenv("RAG_COMPACT_MODE", "int8")
+    compact = make_rag()
+
+    full_usage, compact_usage = full.memory_usage(), compact.memory_usage()
+    assert compact_usage["entries"] == full_usage["entries"] == 5
+    assert compact_usage["vectors"] < full_usage["vectors"]
+    assert compact_usage["bytes_per_10k_cases"] < full_usage["bytes_per_10k_cases"] / 2
+
+
+def test_query_embedding_cache(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    rag = make_rag()
+    rag.build_index()
+
+    calls = []
+    encode_batch = rag.embedder.encode_batch
+    rag.embedder.encode_batch = lambda texts: calls.append(texts) or encode_batch(texts)
+
+    rag.search("Deploy  pipeline", top_k=1)
+    rag.search("deploy pipeline ", top_k=1)
+    rag.search("deploy pipeline", top_k=1)
+
+    assert len(calls) == 1
+    stats = rag.query_cache_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1
+
+
+def test_query_cache_is_bounded(rag_env, monkeypatch):
+    monkeypatch.setenv("RAG_QUERY_CACHE_SIZE", "2")
+    rag = make_rag()
+    for q in ["deploy", "database", "frontend"]:
+        rag.encode_query(q)
+    assert rag.query_cache_stats()["size"] == 2
+    rag.encode_query("deploy")  # evicted as least recently used
+    assert rag.query_cache_stats()["misses"] == 4
+
+
+def test_search_with_metadata_filters(rag_env):
+    write_case(rag_env, "0101_a", "deploy api", value_stream="Platform", assignee="Alice",
+               completed_at="2024-01-10T00:00:00")
+    write_case(rag_env, "0102_b", "deploy api bug", value_stream="Growth", assignee="Bob",
+               completed_at="2024-02-10T00:00:00")
+    write_case(rag_env, "0103_c", "deploy frontend", value_stream="Platform", assignee="Bob",
+               completed_at="2024-03-10T00:00:00")
+    rag = make_rag()
+    rag.build_index()
+
+    def slugs(**filters):
+        return {e["metadata"]["slug"] for e, _ in rag.search("deploy api", top_k=10, filters=filters)}
+
+    assert slugs(value_stream="Platform") == {"0101_a", "0103_c"}
+    assert slugs(value_stream=["Platform", "Growth"]) == {"0101_a", "0102_b", "0103_c"}
+    assert slugs(value_stream="Platform", assignee="Bob") == {"0103_c"}
+    assert slugs(completed_after="2024-02-01", completed_before="2024-03-10T00:00:00") == {"0102_b", "0103_c"}
+    assert slugs(completed_before="2024-01-31T00:00:00Z") == {"0101_a"}
+    assert slugs(value_stream="Nope") == set()
+    # top_k applies after filtering
+    assert len(rag.search("deploy api", top_k=1, filters={"value_stream": "Platform"})) == 1
+
+    with pytest.raises(ValueError):
+        rag.search("deploy", filters={"owner": "x"})
+
+
+def test_hashing_embedder_is_stable_and_normalized():
+    embedder = HashingEmbedder(n_features=256).fitted(["deploy the api", "fix database migration"])
+    a = embedder.encode("Deploy the API")
+    b = HashingEmbedder(n_features=256)
+    b.set_state(embedder.get_state())
+    assert a.shape == (256,)
+    assert np.isclose(np.linalg.norm(a), 1.0)
+    np.testing.assert_allclose(a, b.encode("deploy the api"))
+
+
+def test_hashing_embedder_search(rag_env):
+    write_case(rag_env, "0101_svc", "payments-gateway timeout", "ticket OPS-1432 retries")
+    write_case(rag_env, "0102_ui", "frontend dark mode", "css variables")
+    write_case(rag_env, "0103_db", "database migration", "add index to orders table")
+    rag = make_rag(HashingEmbedder(n_features=512))
+    assert rag.build_index() == 3
+
+    assert rag.search("OPS-1432 payments-gateway", top_k=1)[0][0]["metadata"]["slug"] == "0101_svc"
+    assert rag.search("orders table migration", top_k=1)[0][0]["metadata"]["slug"] == "0103_db"
+
+    # Index records its embedder; reload restores fitted IDF state
+    data = json.loads(semantic_rag.INDEX_PATH.read_text())
+    assert data["embedder"] == {"name": "hashing", "n_features": 512}
+    reloaded = make_rag(HashingEmbedder(n_features=512))
+    assert len(reloaded.snapshot) == 3
+    assert reloaded.search("dark mode css", top_k=1)[0][0]["metadata"]["slug"] == "0102_ui"
+
+
+def test_index_from_other_embedder_is_ignored(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    make_rag().build_index()
+    assert len(make_rag().snapshot) == 1
+    assert len(make_rag(HashingEmbedder(n_features=64)).snapshot) == 0
+
+
+def test_bm25_tokenize_keeps_identifiers():
+    terms = tokenize("Fix OPS-1432 in payments-gateway")
+    assert terms["ops-1432"] == 1
+    assert terms["1432"] == 1
+    assert terms["payments-gateway"] == 1 and terms["gateway"] == 1
+
+
+def test_bm25_scores_only_candidate_rows():
+    texts = ["deploy api", "api gateway timeout", "deploy frontend", "database api migration", "release"]
+    index = LexicalIndex.from_documents([tokenize(t) for t in texts])
+    query = tokenize("api deploy")
+    all_rows, all_scores = index.scores(query)
+    full = dict(zip(all_rows.tolist(), all_scores.tolist()))
+
+    candidates = np.array([1, 2, 4], dtype=np.int64)
+    rows, scores = index.scores(query, candidates)
+    assert dict(zip(rows.tolist(), scores.tolist())) == {r: full[r] for r in (1, 2)}
+
+    # The inverted form is cached and extended, not rebuilt
+    grown = index.with_document(tokenize("api"))
+    assert grown.document_terms() is not index.document_terms()
+    assert grown.document_terms()[-1] == {"api": 1}
+    assert LexicalIndex(grown.postings, grown.doc_lengths).document_terms() == grown.document_terms()
+
+
+def test_hybrid_search_surfaces_exact_identifier(rag_env):
+    # Identical dense vectors (no vocabulary words) — only BM25 can tell them apart
+    for i in range(5):
+        write_case(rag_env, f"010{i}_deploy", "deploy api", f"ticket OPS-10{i}")
+    write_case(rag_env, "0199_target", "deploy api", "ticket OPS-1432")
+    rag = make_rag()
+    rag.build_index()
+
+    dense = rag.search("deploy api OPS-1432", top_k=1, mode="dense")
+    hybrid = rag.search("deploy api OPS-1432", top_k=1)
+    entry, score = hybrid[0]
+    assert entry["metadata"]["slug"] == "0199_target"
+    assert entry["match"]["lexical_rank"] == 1
+    assert score == pytest.approx(dense[0][1])  # score stays the cosine similarity
+
+
+def test_hybrid_search_respects_filters_and_incremental_adds(rag_env):
+    write_case(rag_env, "0101_a", "deploy api", "OPS-1", value_stream="Platform")
+    rag = make_rag()
+    rag.build_index()
+    slug = write_case(rag_env, "0102_b", "deploy api", "OPS-2", value_stream="Growth")
+    rag.add_to_index(slug)
+
+    assert rag.search("OPS-2", top_k=1)[0][0]["metadata"]["slug"] == "0102_b"
+    hits = rag.search("OPS-2", top_k=5, filters={"value_stream": "Platform"})
+    assert [e["metadata"]["slug"] for e, _ in hits] == ["0101_a"]
+
+    # BM25 postings survive a reload from disk
+    reloaded = make_rag()
+    assert reloaded.search("OPS-2", top_k=1)[0][0]["match"]["lexical_rank"] == 1
+
+
+def test_incremental_neighbor_graph_matches_rebuild():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(40, 16)).astype(np.float32)
+    entries = [{"text": "", "metadata": {"slug": f"case-{i}"}} for i in range(40)]
+
+    snapshot = semantic_rag.IndexSnapshot.from_entries(entries[:10], vectors[:10], related_k=3)
+    for entry, vector in zip(entries[10:], vectors[10:]):
+        snapshot = snapshot.with_entry(entry, vector, related_k=3)
+    rebuilt = semantic_rag.IndexSnapshot.from_entries(entries, vectors, related_k=3)
+
+    assert set(snapshot.neighbors) == set(rebuilt.neighbors)
+    for slug, pairs in rebuilt.neighbors.items():
+        assert [s for s, _ in snapshot.neighbors[slug]] == [s for s, _ in pairs]
+
+
+def test_related_cases_from_graph(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline release")
+    write_case(rag_env, "0102_db", "database migration")
+    write_case(rag_env, "0103_frontend", "frontend bug")
+    rag = make_rag()
+    rag.build_index()
+    slug = write_case(rag_env, "0104_release", "release pipeline deploy")
+    rag.add_to_index(slug)
+
+    related = rag.related_cases("0101_deploy")
+    assert related[0]["slug"] == "0104_release"
+    assert related[0]["title"] == "release pipeline deploy"
+    assert all(r["slug"] != "0101_deploy" for r in related)
+    assert len(rag.related_cases("0104_release", limit=2)) == 2
+    assert rag.related_cases("missing") is None
+
+    # The graph is persisted with the index
+    reloaded = make_rag()
+    assert reloaded.snapshot.neighbors == rag.snapshot.neighbors
+
+
+def test_add_to_index_upserts_by_task_id(rag_env):
+    slug = write_case(rag_env, "0101_deploy", "deploy pipeline")
+    write_case(rag_env, "0102_db", "database migration")
+    rag = make_rag()
+    rag.build_index()
+
+    # Task reopened and completed again: same slug, new content
+    metadata = rag_env.get(slug)
+    metadata.update(title="frontend release", indexed_text="frontend release")
+    rag_env.upsert(metadata)
+    rag.add_to_index(slug)
+    rag.add_to_index(slug)
+
+    hits = rag.search("frontend release deploy pipeline database", top_k=10)
+    assert sorted(e["metadata"]["slug"] for e, _ in hits) == ["0101_deploy", "0102_db"]
+    assert rag.search("frontend release", top_k=1, mode="dense")[0][0]["metadata"]["title"] == "frontend release"
+
+
+def test_remove_from_index_tombstones_and_compacts(rag_env, monkeypatch):
+    monkeypatch.setenv("RAG_AUTO_COMPACT_RATIO", "0.5")
+    for slug, title in [("0101_a", "deploy pipeline"), ("0102_b", "deploy release"),
+                        ("0103_c", "database migration"), ("0104_d", "frontend bug")]:
+        write_case(rag_env, slug, title)
+    rag = make_rag()
+    rag.build_index()
+    before = rag.snapshot
+
+    assert rag.remove_from_index("0102_b") == 1
+    assert rag.snapshot.n_dead == 1 and len(before) == 4
+    assert rag.snapshot.embeddings is before.embeddings  # tombstoning shares vectors
+    slugs = [e["metadata"]["slug"] for e, _ in rag.search("deploy release", top_k=10)]
+    assert "0102_b" not in slugs
+    assert rag.search("x", top_k=10, filters={"value_stream": "Platform"})
+    assert all(s != "0102_b" for s, _ in rag.snapshot.neighbors["0101_a"])
+    assert rag.related_cases("0102_b") is None
+
+    # Tombstones survive a reload (and are dropped from memory on load)
+    assert len(make_rag().snapshot) == 3
+
+    assert rag.compact_index() == {"removed": 1, "entries": 3}
+    assert len(rag.snapshot) == 3 and rag.snapshot.n_dead == 0
+    assert rag.search("deploy", top_k=1)[0][0]["metadata"]["slug"] == "0101_a"
+
+    # Crossing the dead-row ratio compacts automatically
+    rag.remove_from_index("0103_c")
+    rag.remove_from_index("0104_d")
+    assert len(rag.snapshot) == 1 and rag.snapshot.n_dead == 0
+
+
+def test_rebuild_skips_tombstoned_and_duplicate_cases(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    write_case(rag_env, "0102_db", "database migration", completed_at="2024-01-01T00:00:00",
+               task_id="task-db")
+    write_case(rag_env, "0301_db", "database release", completed_at="2024-03-01T00:00:00",
+               task_id="task-db")
+    write_case(rag_env, "0103_gone", "frontend bug")
+    rag_env.tombstone_task("0103_gone", "2024-02-01T00:00:00")
+
+    rag = make_rag()
+    assert rag.build_index() == 2
+    slugs = {e["metadata"]["slug"] for e in rag.snapshot.entries}
+    assert slugs == {"0101_deploy", "0301_db"}
+
+
+def test_removal_during_rebuild_is_replayed(rag_env):
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    write_case(rag_env, "0102_db", "database migration")
+    rag = make_rag()
+    rag.build_index()
+
+    def _progress(done, total):
+        if done == total:
+            rag.remove_from_index("0102_db")
+
+    rag.build_index(progress=_progress)
+    assert [e["metadata"]["slug"] for e in rag.snapshot.entries] == ["0101_deploy"]
+
+
+def test_upsert_during_refitting_rebuild_is_reencoded(rag_env):
+    class RefittingEmbedder(FakeEmbedder):
+        def __init__(self, generation=0):
+            self.generation = generation
+            self.encoded = []
+
+        def encode_batch(self, texts):
+            self.encoded.extend(texts)
+            return super().encode_batch(texts) * (self.generation + 1)
+
+        def fitted(self, texts):
+            return RefittingEmbedder(self.generation + 1)
+
+    write_case(rag_env, "0101_deploy", "deploy pipeline")
+    rag = make_rag(RefittingEmbedder())
+    rag.encode_query("deploy")
+    old = rag.embedder
+
+    def _progress(done, total):
+        if done == total:
+            write_case(rag_env, "0102_db", "database migration")
+            rag.add_to_index("0102_db")
+
+    rag.build_index(progress=_progress)
+    assert rag.embedder is not old and rag.embedder.generation == 1
+    assert "database migration" in rag.embedder.encoded
+    assert rag.search("database migration", top_k=1)[0][0]["metadata"]["slug"] == "0102_db"
+    # Query embeddings from the old embedder are gone
+    rag.encode_query("deploy")
+    assert "deploy" in rag.embedder.encoded
+
+
+def test_filter_indexes_are_extended_by_adds(rag_env):
+    write_case(rag_env, "0101_a", "deploy api", value_stream="Platform", completed_at="2024-01-10T00:00:00")
+    write_case(rag_env, "0102_b", "deploy api bug", value_stream="Growth",
+               completed_at="2024-03-10T00:00:00")
+    rag = make_rag()
+    rag.build_index()
+    filters = {"value_stream": ("Platform",), "completed_after": "2024-01-01"}
+    assert len(rag.search("deploy", top_k=10, filters=filters)) == 1
+
+    write_case(rag_env, "0103_c", "deploy frontend", value_stream="Platform",
+               completed_at="2024-02-10T00:00:00")
+    rag.add_to_index("0103_c")
+    snapshot = rag.snapshot
+    assert snapshot._postings is not None and snapshot._completed_index is not None
+    fresh = IndexSnapshot(snapshot.entries, snapshot.embeddings)
+    for field, values in fresh._get_postings().items():
+        assert {v: rows.tolist() for v, rows in values.items()} == \
+               {v: rows.tolist() for v, rows in snapshot._postings[field].items()}
+    for ours, theirs in zip(snapshot._completed_index, fresh._get_completed_index()):
+        assert ours.tolist() == theirs.tolist()
+
+    def slugs(**filters):
+        return {e["metadata"]["slug"] for e, _ in rag.search("deploy", top_k=10, filters=filters)}
+
+    assert slugs(**filters) == {"0101_a", "0103_c"}
+    assert slugs(value_stream={"Growth"}, completed_before="2024-12-31") == {"0102_b"}
+    # A non-list value is one value to match, not an iterable of values
+    assert slugs(value_stream=7) == set()
+
+
+def test_slug_rows_follow_adds_and_removals(rag_env, monkeypatch):
+    monkeypatch.setenv("RAG_RELATED_K", "2")
+    monkeypatch.setenv("RAG_AUTO_COMPACT_RATIO", "1")
+    for slug, title in [("0101_deploy", "deploy pipeline"), ("0102_db", "database migration"),
+                        ("0103_ui", "frontend bug")]:
+        write_case(rag_env, slug, title)
+    rag = make_rag()
+    rag.build_index()
+    assert rag.snapshot.row_for_slug("0102_db") == 1
+    assert len(rag.related_cases("0101_deploy", limit=50)) == 2
+
+    write_case(rag_env, "0104_release", "release pipeline deploy")
+    rag.add_to_index("0104_release")
+    rag.remove_from_index("0103_ui")
+    snapshot = rag.snapshot
+    assert snapshot._slug_rows == {"0101_deploy": 0, "0102_db": 1, "0104_release": 3}
+
+    # A slug that outlives one of its rows maps back to the live one
+    entry = snapshot.entries[1]
+    both = snapshot.with_entry(entry, snapshot.row(1)).with_tombstones([4])
+    assert both.row_for_slug("0102_db") == 1
+    fresh = IndexSnapshot(both.entries, both.embeddings, dead=both.dead)
+    fresh.row_for_slug("0102_db")
+    assert both._slug_rows == fresh._slug_rows
@@ -0,0 +1,152 @@
+"""
+Gemini Usage Store Tests
+
+Latency histogram percentiles, persisting and windowing usage rows,
+GeminiClient accounting reported token counts across a restart, and a
+failed flush keeping usage logged while it wrote.
+"""
+import os
+import sys
+import time
+import asyncio
+import threading
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from services import usage_store
+from services.gemini_transport import Completion
+from services.usage_store import LatencyHistogram, UsageBucket, UsageStore
+
+
+def test_histogram_percentiles_within_bucket_resolution():
+    histogram = LatencyHistogram()
+    for ms in range(1, 1001):
+        histogram.observe(float(ms))
+
+    assert histogram.count == 1000
+    assert histogram.avg_ms == pytest.approx(500.5)
+    assert histogram.percentile(0.50) == pytest.approx(500, rel=0.15)
+    assert histogram.percentile(0.99) == pytest.approx(990, rel=0.15)
+
+    merged = LatencyHistogram()
+    merged.merge(histogram)
+    merged.merge(LatencyHistogram())
+    assert merged.summary() == histogram.summary()
+    assert LatencyHistogram().summary()["p95_ms"] is None
+
+
+def test_store_windows_and_prunes(tmp_path):
+    store = UsageStore(tmp_path / "usage.db", retention_seconds=1000)
+    bucket = UsageBucket()
+    bucket.add(100, 20, 0.01, 250.0, estimated=False)
+
+    store.record(0, 100, {"m1": {"generate": bucket}})
+    store.record(100, 200, {"m1": {"generate": bucket}, "m2": {"generate_stream": bucket}})
+    by_model, by_method = store.window(since=150, until=300)
+    assert by_model["m1"].requests == by_model["m2"].requests == 1
+    assert by_method["generate"].input_tokens == 100
+    assert by_method["generate_stream"].latency.count == 1
+
+    by_model, _ = store.window(since=0, until=300)
+    assert by_model["m1"].requests == 2
+
+    # Past retention: the first two intervals are dropped
+    store.record(1150, 1250, {"m1": {"generate": bucket}})
+    by_model, _ = store.window(since=0, until=2000)
+    assert by_model["m1"].requests == 1 and "m2" not in by_model
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_client_accounts_reported_tokens_and_keeps_history(tmp_path):
+    from services.gemini_client import GeminiClient
+
+    env = {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0", "GEMINI_MODEL": "gemini-1.5-pro"}
+    with patch.object(usage_store, "USAGE_STORE_PATH", tmp_path / "usage.db"), \
+         patch.dict(os.environ, env):
+        gemini = GeminiClient()
+        gemini.available = True
+        replies = iter([Completion("first", 1200, 300), Completion("second")])
+
+        async def complete(prompt, temperature, max_tokens, model_name=None):
+            return next(replies)
+
+        gemini._complete = complete
+        await gemini.generate("a prompt")
+        await gemini.generate("another prompt that is forty chars long!")
+
+        stats = gemini.get_usage_stats()
+        assert stats["total_input_tokens"] == 1200 + 10
+        assert stats["total_output_tokens"] == 300 + 1
+        assert stats["by_method"]["generate"]["estimated_requests"] == 1
+        assert stats["by_method"]["generate"]["latency"]["count"] == 2
+
+        assert await gemini.flush_usage() == 1
+        assert await gemini.flush_usage() == 0
+
+        # A new process sees the persisted history
+        restarted = GeminiClient()
+        window = await restarted.usage_window(3600)
+        assert window["requests"] == 2
+        assert window["input_tokens"] == 1210
+        assert window["cost_usd"] == pytest.approx((1210 * 1.25 + 301 * 5.00) / 1_000_000, abs=1e-6)
+        assert window["by_model"]["gemini-1.5-pro"]["latency"]["p50_ms"] is not None
+
+        restarted.usage_flush_interval = 0
+        with pytest.raises(ValueError):
+            await restarted.usage_window(3600)
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_usage_logged_during_the_write(tmp_path):
+    from services.gemini_client import GeminiClient
+
+    env = {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0", "GEMINI_MODEL": "gemini-2.0-flash"}
+    with patch.object(usage_store, "USAGE_STORE_PATH", tmp_path / "usage.db"), \
+         patch.dict(os.environ, env):
+        gemini = GeminiClient()
+        gemini.usage_stats.log_request(100, 10, "gemini-2.0-flash", 50.0)
+        store = gemini._get_usage_store()
+        writing = threading.Event()
+
+        def failing_record(*args):
+            writing.set()
+            time.sleep(0.1)
+            raise OSError("disk full")
+
+        with patch.object(store, "record", failing_record):
+            flush = asyncio.ensure_future(gemini.flush_usage())
+            await asyncio.to_thread(writing.wait, 1)
+            # Logged on the event loop while the write is in flight
+            gemini.usage_stats.log_request(200, 20, "gemini-2.0-flash", 50.0)
+            # A second flush (e.g. aclose) waits for the first to finish
+            second = asyncio.ensure_future(gemini.flush_usage())
+            assert await flush == 0
+            assert await second == 0
+
+        bucket = gemini.usage_stats.pending["gemini-2.0-flash"]["generate"]
+        assert (bucket.requests, bucket.input_tokens) == (2, 300)
+        assert await gemini.flush_usage() == 1
+        assert gemini.usage_stats.pending == {}
+
+
+@pytest.mark.asyncio
+async def test_closing_the_shared_client_flushes_usage(tmp_path):
+    from services import gemini_client
+
+    env = {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0", "GEMINI_MODEL": "gemini-2.0-flash"}
+    with patch.object(usage_store, "USAGE_STORE_PATH", tmp_path / "usage.db"), \
+         patch.object(gemini_client, "_gemini_client", None), \
+         patch.dict(os.environ, env):
+        gemini = gemini_client.get_gemini_client()
+        gemini.start_usage_flusher()
+        gemini.usage_stats.log_request(100, 10, "gemini-2.0-flash", 50.0)
+
+        await gemini_client.close_gemini_client()
+        assert gemini_client._gemini_client is None
+        assert gemini.usage_stats.pending == {}
+        window = await gemini_client.get_gemini_client().usage_window(3600)
+        assert window["requests"] == 1
+        await gemini_client.close_gemini_client()
@@ -17,6 +17,8 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 # Use in-memory SQLite for tests
 os.environ["DATABASE_URL"] = "sqlite:////:memory:"
 os.environ["DEBUG"] = "false"
+# Don't leave a Gemini response cache in the source tree
+os.environ["GEMINI_CACHE_TTL"] = "0"
 
 from main import app
 from db.database import init_db, engine
@@ -52,6 +54,29 @@ async def test_health(client):
     assert data["database_connected"] is True
 
 
+@pytest.mark.asyncio
+async def test_health_reports_ai_warmup(client, tmp_path, monkeypatch):
+    from services import warmup
+    from services.embedders import HashingEmbedder
+    from services.semantic_rag import SemanticRAG
+
+    monkeypatch.setattr(warmup, "_status", warmup.WarmupStatus(status=warmup.WARMUP_PENDING))
+    resp = await client.get("/api/health/ai")
+    assert resp.status_code == 503
+    assert (await client.get("/api/health")).json()["ai_ready"] is False
+
+    with patch("services.semantic_rag.INDEX_PATH", tmp_path / "index.json"):
+        rag = SemanticRAG(embedder=HashingEmbedder())
+    with patch("services.semantic_rag.get_rag_service", return_value=rag):
+        warmup.run_warmup()
+
+    resp = await client.get("/api/health/ai")
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["ai_ready"] is True
+    assert data["warmup"]["status"] == "ready"
+
+
 @pytest.mark.asyncio
 async def test_root(client):
     resp = await client.get("/")
@@ -138,27 +163,118 @@ async def test_task_not_found(client):
 
 @pytest.mark.asyncio
 async def test_complete_task_creates_case_study(client, tmp_path):
-    """When a task moves to 'done', a case study directory is created."""
+    """When a task moves to 'done', a case study is stored and its README renders."""
     create_resp = await client.post("/api/tasks", json={
         "title": "Deployable Feature",
         "description": "Ship the new widget",
     })
     task_id = create_resp.json()["id"]
 
-    # Patch CASE_STUDIES_DIR to use tmp_path
-    with patch("services.case_memory.CASE_STUDIES_DIR", tmp_path):
+    from services.case_store import get_case_store
+    from services.flywheel_worker import process_outbox
+
+    # Patch the case store to live in tmp_path
+    with patch("services.case_store.CASE_STORE_PATH", tmp_path / "cases.db"):
         resp = await client.put(f"/api/tasks/{task_id}", json={"status": "done"})
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "done"
 
-    assert resp.status_code == 200
-    data = resp.json()
-    assert data["status"] == "done"
+        # The request only queued the work; nothing is stored yet
+        store = get_case_store()
+        assert store.count() == 0
+        assert await process_outbox() == 1
 
-    # Verify case study was created on disk
-    case_dirs = list(tmp_path.iterdir())
-    assert len(case_dirs) >= 1
-    case_dir = case_dirs[0]
-    assert (case_dir / "README.md").exists()
-    assert (case_dir / "metadata.json").exists()
+        # Verify the case study was stored
+        manifest = store.manifest()
+        assert [m["task_id"] for m in manifest] == [task_id]
+        resp = await client.get(f"/api/cases/{manifest[0]['slug']}/readme")
+        assert resp.status_code == 200
+        assert resp.text.startswith("# Deployable Feature")
+        assert "Ship the new widget" in resp.text
+
+        resp = await client.get("/api/cases/nonexistent/readme")
+        assert resp.status_code == 404
+
+    resp = await client.get(f"/api/tasks/{task_id}")
+    assert resp.json()["status"] == "done"
+
+
+@pytest.mark.asyncio
+async def test_recompleting_task_upserts_case_study(client, tmp_path):
+    """Reopening and completing again rewrites one case study; delete tombstones it."""
+    from services.case_store import get_case_store
+    from services.flywheel_worker import process_outbox
+
+    create_resp = await client.post("/api/tasks", json={"title": "Flaky Deploy"})
+    task_id = create_resp.json()["id"]
+
+    with patch("services.case_store.CASE_STORE_PATH", tmp_path / "cases.db"):
+        store = get_case_store()
+        await client.put(f"/api/tasks/{task_id}", json={"status": "done"})
+        await process_outbox()
+        await client.put(f"/api/tasks/{task_id}", json={"status": "doing"})
+        await client.put(f"/api/tasks/{task_id}", json={"status": "done", "notes": "Pinned the runner"})
+        await process_outbox()
+
+        manifest = store.manifest()
+        assert len(manifest) == 1
+        slug = manifest[0]["slug"]
+        assert store.get(slug)["notes"] == "Pinned the runner"
+
+        resp = await client.delete(f"/api/tasks/{task_id}")
+        assert resp.status_code == 200
+        assert store.get(slug) is not None
+        await process_outbox()
+
+        assert store.get(slug) is None
+        assert store.get(slug, include_deleted=True)["deleted_at"]
+
+
+@pytest.mark.asyncio
+async def test_flywheel_worker_drains_on_stop(client, tmp_path):
+    from services.case_store import get_case_store
+    from services.flywheel_worker import FlywheelWorker
+
+    create_resp = await client.post("/api/tasks", json={"title": "Drain Me"})
+    task_id = create_resp.json()["id"]
+
+    with patch("services.case_store.CASE_STORE_PATH", tmp_path / "cases.db"):
+        await client.put(f"/api/tasks/{task_id}", json={"status": "done"})
+        worker = FlywheelWorker()
+        worker.start()
+        await worker.stop()
+        manifest = get_case_store().manifest()
+
+    assert len(manifest) == 1
+
+    from db.database import AsyncSessionLocal
+    from db.models import Task
+    async with AsyncSessionLocal() as session:
+        task = await session.get(Task, task_id)
+    assert task.case_study_slug == manifest[0]["slug"]
+
+
+@pytest.mark.asyncio
+async def test_flywheel_outbox_retries_failures(client):
+    from sqlalchemy import select
+    from db.database import AsyncSessionLocal
+    from db.models import FlywheelOutbox
+    from services.flywheel_worker import process_outbox, OUTBOX_PENDING, OUTBOX_FAILED
+
+    create_resp = await client.post("/api/tasks", json={"title": "Broken Disk"})
+    task_id = create_resp.json()["id"]
+    await client.put(f"/api/tasks/{task_id}", json={"status": "done"})
+
+    async def _row():
+        async with AsyncSessionLocal() as session:
+            return (await session.execute(select(FlywheelOutbox))).scalar_one()
+
+    with patch("services.case_memory.write_case_study", side_effect=OSError("disk full")):
+        await process_outbox(max_attempts=2)
+        row = await _row()
+        assert (row.status, row.attempts, row.last_error) == (OUTBOX_PENDING, 1, "disk full")
+        await process_outbox(max_attempts=2)
+        assert (await _row()).status == OUTBOX_FAILED
 
 
 # ============= Search =============
@@ -229,6 +345,390 @@ async def test_ai_assist_returns_response(client):
     assert "model" in data
 
 
+@pytest.mark.asyncio
+async def test_ai_assist_skips_slow_retrieval(client, monkeypatch):
+    """A search that misses RAG_SEARCH_TIMEOUT is abandoned, not awaited."""
+    import asyncio
+    import threading
+    import time
+    from services import ai_service
+
+    release = threading.Event()
+
+    def slow_search(*args, **kwargs):
+        release.wait(5)
+        return []
+
+    monkeypatch.setenv("RAG_SEARCH_TIMEOUT", "0.05")
+    monkeypatch.setattr(ai_service, "_search_cases", slow_search)
+    create_resp = await client.post("/api/tasks", json={"title": "Need help"})
+
+    # The event loop stays free while the search thread is stuck
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.005)
+
+    ticking = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    resp = await client.post("/api/ai/assist", json={"task_id": create_resp.json()["id"]})
+    elapsed = time.perf_counter() - start
+    ticking.cancel()
+    release.set()
+
+    assert resp.status_code == 200
+    assert resp.json()["retrieval"] == "timeout"
+    assert resp.json()["similar_cases"] == 0
+    assert elapsed < 1
+    assert ticks > 1
+
+
+@pytest.mark.asyncio
+async def test_retrieval_sheds_searches_while_abandoned_ones_run(monkeypatch):
+    """Timed-out searches keep their pool thread; once all are held, new ones are skipped."""
+    import asyncio
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from services import ai_service
+
+    release = threading.Event()
+    scanned = []
+
+    def slow_search(query, filters, query_embedding=None, abandoned=None):
+        release.wait(5)
+        scanned.append(query)
+        return []
+
+    monkeypatch.setattr(ai_service, "SEARCH_WORKERS", 1)
+    monkeypatch.setattr(ai_service, "_search_pool", ThreadPoolExecutor(max_workers=1))
+    monkeypatch.setattr(ai_service, "_search_backends", lambda: (None, None))
+    monkeypatch.setattr(ai_service, "_search_cases", slow_search)
+
+    assert await ai_service.find_similar_cases("stuck", timeout=0.05) == ([], ai_service.RETRIEVAL_TIMEOUT)
+    assert await ai_service.find_similar_cases("next", timeout=0.05) == ([], ai_service.RETRIEVAL_BUSY)
+
+    release.set()
+    for _ in range(100):
+        if ai_service._searches_abandoned == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert ai_service._searches_abandoned == 0
+    assert await ai_service.find_similar_cases("free again", timeout=1) == ([], ai_service.RETRIEVAL_OK)
+    assert scanned == ["stuck", "free again"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_healthy_searches_wait_for_a_thread(monkeypatch):
+    """More simultaneous searches than pool threads all complete within their deadline."""
+    import asyncio
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from services import ai_service
+
+    def search(query, filters, query_embedding=None, abandoned=None):
+        time.sleep(0.05)
+        return [({"slug": query}, 0.9)]
+
+    monkeypatch.setattr(ai_service, "SEARCH_WORKERS", 2)
+    monkeypatch.setattr(ai_service, "_search_pool", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(ai_service, "_search_backends", lambda: (None, None))
+    monkeypatch.setattr(ai_service, "_search_cases", search)
+
+    results = await asyncio.gather(*(
+        ai_service.find_similar_cases(f"q{i}", timeout=2) for i in range(8)
+    ))
+    assert [status for _, status in results] == [ai_service.RETRIEVAL_OK] * 8
+    assert [cases[0][0]["slug"] for cases, _ in results] == [f"q{i}" for i in range(8)]
+
+
+def _sse_events(body: str):
+    import json
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_ai_assist_stream_fallback(client):
+    """Without Gemini the fallback text arrives as one chunk, then metadata."""
+    create_resp = await client.post("/api/tasks", json={"title": "Need help"})
+    resp = await client.post("/api/ai/assist/stream", json={"task_id": create_resp.json()["id"]})
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+
+    events = _sse_events(resp.text)
+    assert [event for event, _ in events] == ["chunk", "metadata"]
+    assert "AI generation is unavailable" in events[0][1]["text"]
+    assert events[1][1]["model"] == "fallback"
+    assert events[1][1]["similar_cases"] == 0
+
+    missing = await client.post("/api/ai/assist/stream", json={"task_id": "nonexistent"})
+    assert missing.status_code == 404
+
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _FakeStreamingModel:
+    """Stands in for genai.GenerativeModel; the second chunk waits for `gate`."""
+
+    def __init__(self):
+        import threading
+        self.gate = threading.Event()
+        self.closed = threading.Event()
+        self.produced = 0
+
+    def generate_content(self, prompt, generation_config=None, stream=False):
+        def chunks():
+            try:
+                for i, text in enumerate(["Hello", ", ", "world"]):
+                    if i == 1:
+                        self.gate.wait(5)
+                    self.produced += 1
+                    yield _FakeChunk(text)
+            finally:
+                self.closed.set()
+        return chunks()
+
+
+def _streaming_client(model):
+    from services.gemini_client import GeminiClient
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": "", "GEMINI_MODEL": "fake-model"}):
+        gemini = GeminiClient()
+    gemini.available, gemini.model = True, model
+    return gemini
+
+
+@pytest.mark.asyncio
+async def test_ai_assist_stream_chunks(client):
+    model = _FakeStreamingModel()
+    model.gate.set()
+    gemini = _streaming_client(model)
+    create_resp = await client.post("/api/tasks", json={"title": "Need help"})
+
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini):
+        resp = await client.post("/api/ai/assist/stream", json={"task_id": create_resp.json()["id"]})
+
+    events = _sse_events(resp.text)
+    assert "".join(data["text"] for event, data in events if event == "chunk") == "Hello, world"
+    event, metadata = events[-1]
+    assert event == "metadata"
+    assert metadata["model"] == "fake-model" and "error" not in metadata
+    assert gemini.usage_stats.total_requests == 1
+
+
+@pytest.mark.asyncio
+async def test_gemini_stream_stops_when_closed():
+    """Closing the async iterator stops the pool thread reading the SDK stream."""
+    import asyncio
+    model = _FakeStreamingModel()
+    stream = _streaming_client(model).generate_stream("prompt")
+
+    assert await stream.__anext__() == "Hello"
+    await stream.aclose()
+    model.gate.set()
+
+    assert await asyncio.to_thread(model.closed.wait, 5)
+    assert model.produced == 2  # the chunk in flight, but not the rest
+
+
+@pytest.mark.asyncio
+async def test_ai_assist_sheds_load_when_gemini_queue_is_full(client):
+    from services.gemini_client import get_gemini_client
+    create_resp = await client.post("/api/tasks", json={"title": "Need help"})
+    scheduler = get_gemini_client().scheduler
+
+    with patch.object(type(scheduler), "saturated", new=True):
+        for path in ("/api/ai/assist", "/api/ai/assist/stream"):
+            resp = await client.post(path, json={"task_id": create_resp.json()["id"]})
+            assert resp.status_code == 503
+            assert resp.headers["retry-after"] == "1"
+
+    usage = (await client.get("/api/ai/usage")).json()
+    assert usage["scheduler"]["max_queue"] == scheduler.max_queue
+
+    # The queue filled up after the capacity check: the stream still answers 503
+    from services.gemini_client import GeminiClient, GeminiScheduler
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": "", "GEMINI_CACHE_TTL": "0"}):
+        gemini = GeminiClient()
+    gemini.available = True
+    gemini.scheduler = GeminiScheduler(max_concurrency=0, max_queue=0)
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini), \
+         patch.object(GeminiScheduler, "saturated", new=False):
+        resp = await client.post("/api/ai/assist/stream", json={"task_id": create_resp.json()["id"]})
+    assert resp.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_ai_assist_serves_prefetched_answer_until_task_changes(client, monkeypatch):
+    from services import assist_prefetcher
+    from services.gemini_client import GeminiClient
+    from services.gemini_transport import Completion
+
+    monkeypatch.setenv("ASSIST_PREFETCH", "true")
+    monkeypatch.setattr(assist_prefetcher, "_prefetcher", None)
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": ""}):
+        gemini = GeminiClient()
+    gemini.available = True
+    calls = []
+
+    async def complete(prompt, temperature, max_tokens, model_name=None):
+        calls.append(prompt)
+        return Completion(f"Advice #{len(calls)}")
+
+    gemini._complete = complete
+    retrieval = {"status": "timeout"}
+
+    async def find_similar_cases(*args, **kwargs):
+        return [], retrieval["status"]
+
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini), \
+         patch("services.ai_service.find_similar_cases", find_similar_cases):
+        # Generated without case context: not stored
+        task_id = (await client.post("/api/tasks", json={"title": "Draft", "status": "doing"})).json()["id"]
+        await assist_prefetcher.get_assist_prefetcher().join()
+        assert len(calls) == 1
+        data = (await client.post("/api/ai/assist", json={"task_id": task_id})).json()
+        assert data["prefetched"] is False
+        calls.clear()
+
+        retrieval["status"] = "ok"
+        task_id = (await client.post("/api/tasks", json={"title": "Plan", "status": "doing"})).json()["id"]
+        await assist_prefetcher.get_assist_prefetcher().join()
+        assert len(calls) == 1
+
+        data = (await client.post("/api/ai/assist", json={"task_id": task_id})).json()
+        assert data["response"] == "Advice #1" and data["prefetched"] is True
+        assert len(calls) == 1
+        # A custom prompt is not the prefetched default
+        data = (await client.post("/api/ai/assist", json={"task_id": task_id, "prompt": "Risks?"})).json()
+        assert data["prefetched"] is False
+
+        # Edited since: generated again
+        await client.put(f"/api/tasks/{task_id}", json={"description": "Now with scope"})
+        data = (await client.post("/api/ai/assist", json={"task_id": task_id})).json()
+        assert data["response"] == "Advice #3" and data["prefetched"] is False
+
+    prefetch = (await client.get("/api/ai/usage")).json()["prefetch"]
+    assert prefetch["enabled"] is True
+    assert (prefetch["prefetched"], prefetch["discarded"]) == (1, 1)
+    # Served once; missed for the context-less answer and after the edit
+    assert (prefetch["served"], prefetch["missed"], prefetch["hit_rate"]) == (1, 2, 0.3333)
+
+
+def test_pack_batches_respects_budget_and_task_limit():
+    from services.ai_service import pack_batches
+    assert pack_batches([100, 100, 100, 100], budget=250, max_tasks=8) == [[0, 1], [2, 3]]
+    assert pack_batches([10] * 5, budget=1000, max_tasks=2) == [[0, 1], [2, 3], [4]]
+    assert pack_batches([500, 10], budget=100, max_tasks=8) == [[0], [1]]
+
+
+@pytest.mark.asyncio
+async def test_ai_assist_batch_packs_tasks_and_shares_cases(client, monkeypatch):
+    import json as _json
+    from services import ai_service
+    from services.gemini_client import GeminiClient
+    from services.gemini_transport import Completion
+
+    monkeypatch.setenv("AI_BATCH_MAX_TASKS", "2")
+    shared_case = ({"slug": "auth-migration", "title": "Auth migration", "description": "Rolled out OAuth."}, 0.9)
+    searches = []
+
+    async def fake_search(query, filters=None, timeout=None):
+        searches.append(query)
+        return [shared_case], ai_service.RETRIEVAL_OK
+
+    monkeypatch.setattr(ai_service, "find_similar_cases", fake_search)
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": ""}):
+        gemini = GeminiClient()
+    gemini.available = True
+    prompts, budgets = [], []
+
+    async def complete(prompt, temperature, max_tokens, model_name=None):
+        prompts.append(prompt)
+        budgets.append(max_tokens)
+        labels = [f"T{i}" for i in (1, 2) if f"### T{i}:" in prompt]
+        # The model skips the second task of the second batch
+        answered = labels if len(prompts) == 1 else labels[:1]
+        return Completion(_json.dumps({"tasks": [{"task": t, "advice": f"Do {t}"} for t in answered]}))
+
+    gemini._complete = complete
+    ids = [
+        (await client.post("/api/tasks", json={"title": title})).json()["id"]
+        for title in ("Login bug", "Login bug", "SSO rollout", "Deploy")
+    ]
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini):
+        resp = await client.post("/api/ai/assist/batch", json={"task_ids": ids + ["missing"]})
+        assert resp.status_code == 404
+        resp = await client.post("/api/ai/assist/batch", json={"task_ids": ids})
+
+    data = resp.json()
+    assert data["batches"] == 2 and len(prompts) == 2
+    # Output room is sized to the two tasks of each batch
+    assert budgets == [ai_service.BATCH_OUTPUT_OVERHEAD_TOKENS + 2 * ai_service.BATCH_ADVICE_TOKENS] * 2
+    assert [r["task_id"] for r in data["results"]] == ids
+    assert [r["response"] for r in data["results"][:2]] == ["Do T1", "Do T2"]
+    assert data["results"][0]["model"] == gemini.model_name and data["results"][0]["similar_cases"] == 1
+    assert data["results"][2]["response"] == "Do T1"
+    assert data["results"][3]["model"] == "fallback"
+    # Identical searches ran once; the shared case is in the first prompt once
+    assert sorted(searches) == ["Deploy", "Login bug", "SSO rollout"]
+    assert prompts[0].count("Auth migration") == 1
+
+
+@pytest.mark.asyncio
+async def test_batch_retrieves_context_for_more_tasks_than_search_threads(monkeypatch):
+    import time
+    from concurrent.futures import ThreadPoolExecutor
+    from services import ai_service
+    from services.gemini_client import GeminiClient
+
+    def search(query, filters, query_embedding=None, abandoned=None):
+        time.sleep(0.1)
+        return [({"slug": query, "title": query, "description": "Done before."}, 0.9)]
+
+    monkeypatch.setattr(ai_service, "SEARCH_WORKERS", 2)
+    monkeypatch.setattr(ai_service, "_search_pool", ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(ai_service, "_search_backends", lambda: (None, None))
+    monkeypatch.setattr(ai_service, "_search_cases", search)
+    # Enough for one search, not for six queued on two threads
+    monkeypatch.setenv("RAG_SEARCH_TIMEOUT", "0.25")
+    with patch.dict(os.environ, {"GOOGLE_API_KEY": ""}):
+        gemini = GeminiClient()
+
+    tasks = [{"id": f"t{i}", "title": f"Task {i}"} for i in range(6)]
+    with patch("services.gemini_client.get_gemini_client", return_value=gemini):
+        results, _ = await ai_service.batch_assist_with_tasks(tasks)
+
+    assert [r["retrieval"] for r in results] == [ai_service.RETRIEVAL_OK] * 6
+    assert all(r["similar_cases"] == 1 for r in results)
+
+
+@pytest.mark.asyncio
+async def test_usage_reports_query_cache_once_index_is_loaded(client, tmp_path, monkeypatch):
+    from services import semantic_rag
+    from services.embedders import HashingEmbedder
+
+    monkeypatch.setattr(semantic_rag, "_rag_service", None)
+    assert (await client.get("/api/ai/usage")).json()["query_cache"] is None
+
+    with patch("services.semantic_rag.INDEX_PATH", tmp_path / "index.json"):
+        rag = semantic_rag.SemanticRAG(embedder=HashingEmbedder())
+    monkeypatch.setattr(semantic_rag, "_rag_service", rag)
+    rag.encode_query("deploy pipeline")
+    rag.encode_query("Deploy pipeline")
+
+    query_cache = (await client.get("/api/ai/usage")).json()["query_cache"]
+    assert (query_cache["hits"], query_cache["misses"], query_cache["hit_rate"]) == (1, 1, 0.5)
+
+
 @pytest.mark.asyncio
 async def test_ai_assist_task_not_found(client):
     resp = await client.post("/api/ai/assist", json={"task_id": "nonexistent"})
@@ -236,13 +736,39 @@ async def test_ai_assist_task_not_found(client):
 
 
 @pytest.mark.asyncio
-async def test_reindex_endpoint(client):
-    resp = await client.post("/api/ai/reindex")
-    # 200 if sentence-transformers is installed, 503 if not
-    assert resp.status_code in (200, 503)
-    if resp.status_code == 200:
-        data = resp.json()
-        assert "count" in data
+async def test_reindex_endpoint(client, tmp_path):
+    import asyncio
+
+    with patch("services.case_store.CASE_STORE_PATH", tmp_path / "cases.db"), \
+         patch("services.semantic_rag.INDEX_PATH", tmp_path / "index.json"):
+        resp = await client.post("/api/ai/reindex")
+        assert resp.status_code == 202
+        job_id = resp.json()["job_id"]
+
+        for _ in range(50):
+            resp = await client.get(f"/api/ai/reindex/{job_id}")
+            if resp.json()["status"] not in ("pending", "running"):
+                break
+            await asyncio.sleep(0.05)
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["status"] == "completed"
+    assert data["count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reindex_job_not_found(client):
+    resp = await client.get("/api/ai/reindex/nonexistent")
+    assert resp.status_code == 404
+    resp = await client.post("/api/ai/reindex/nonexistent/cancel")
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_related_cases_unknown_slug(client):
+    resp = await client.get("/api/cases/nonexistent/related")
+    assert resp.status_code == 404
 
 
 # ============= Comments =============
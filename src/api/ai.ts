@@ -8,6 +8,10 @@ export interface AIAssistResponse {
   response: string;
   similar_cases: number;
   model: string;
+  retrieval?: string;
+  context_tokens?: number;
+  context_tokens_saved?: number;
+  prefetched?: boolean;
 }
 
 /**
@@ -28,4 +32,62 @@ export async function askLotus(
   }
 
   return response.json();
-}
\ No newline at end of file
+}
+
+/**
+ * Ask Lotus with a streamed response (server-sent events).
+ * onChunk receives the text generated so far; resolves with the full response.
+ * Aborting the signal closes the connection, which stops generation server-side.
+ */
+export async function streamLotus(
+  taskId: string,
+  prompt: string | undefined,
+  onChunk: (textSoFar: string) => void,
+  signal?: AbortSignal
+): Promise<AIAssistResponse> {
+  const response = await fetch(`${API_BASE_URL}/ai/assist/stream`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ task_id: taskId, prompt: prompt || undefined }),
+    signal,
+  });
+
+  if (!response.ok || !response.body) {
+    throw new Error(`AI assist failed: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let text = "";
+  let metadata: Omit<AIAssistResponse, "response"> | null = null;
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary: number;
+    while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = "message";
+      let data = "";
+      for (const line of block.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data += line.slice(6);
+      }
+      if (event === "chunk") {
+        text += JSON.parse(data).text;
+        onChunk(text);
+      } else if (event === "metadata") {
+        metadata = JSON.parse(data);
+      }
+    }
+  }
+
+  if (!metadata) {
+    throw new Error("AI assist stream ended unexpectedly");
+  }
+  return { ...metadata, response: text };
+}
@@ -4,7 +4,7 @@ import { Textarea } from "./ui/textarea";
 import { Badge } from "./ui/badge";
 import { Loader2, Send, X } from "lucide-react";
 import { LotusIcon } from "./LotusIcon";
-import { askLotus, type AIAssistResponse } from "@/api/ai";
+import { streamLotus, type AIAssistResponse } from "@/api/ai";
 
 interface AskLotusProps {
   taskId: string;
@@ -15,6 +15,9 @@ export function AskLotus({ taskId }: AskLotusProps) {
   const [loading, setLoading] = useState(false);
   const [result, setResult] = useState<AIAssistResponse | null>(null);
   const [error, setError] = useState<string | null>(null);
+  // True until the stream's metadata (past cases, model) has arrived
+  const [streaming, setStreaming] = useState(false);
+  const streamRef = useRef<AbortController | null>(null);
 
   // Floating vs Inline state
   const [isFloating, setIsFloating] = useState(false);
@@ -41,6 +44,12 @@ export function AskLotus({ taskId }: AskLotusProps) {
     return () => observer.disconnect();
   }, []);
 
+  // Stop reading the stream once the component is gone
+  useEffect(() => () => {
+    streamRef.current?.abort();
+    streamRef.current = null;
+  }, []);
+
   // Sync focus
   useEffect(() => {
     if (isFloating && isExpanded && fabInputRef.current) {
@@ -50,22 +59,39 @@ export function AskLotus({ taskId }: AskLotusProps) {
 
   const handleAsk = async () => {
     if (!prompt.trim()) return;
+    // A new question replaces any answer still streaming
+    streamRef.current?.abort();
+    const controller = new AbortController();
+    streamRef.current = controller;
     setLoading(true);
+    setStreaming(true);
     setError(null);
     try {
-      const response = await askLotus(taskId, prompt);
+      // Show text as it streams in; metadata badges arrive with the final event
+      const response = await streamLotus(taskId, prompt, (textSoFar) => {
+        if (controller.signal.aborted) return;
+        setResult({ response: textSoFar, similar_cases: 0, model: "fallback" });
+        if (isFloating) setIsExpanded(true);
+      }, controller.signal);
+      if (controller.signal.aborted) return;
       setResult(response);
       setPrompt("");
       if (isFloating) setIsExpanded(true); // Ensure FAB is expanded to show result
     } catch (e) {
+      if (controller.signal.aborted) return;
       setError(e instanceof Error ? e.message : "Something went wrong");
       if (isFloating) setIsExpanded(true);
     } finally {
-      setLoading(false);
+      if (streamRef.current === controller) {
+        streamRef.current = null;
+        setLoading(false);
+        setStreaming(false);
+      }
     }
   };
 
   const clearResult = () => {
+    streamRef.current?.abort();
     setResult(null);
     setError(null);
   };
@@ -150,9 +176,15 @@ export function AskLotus({ taskId }: AskLotusProps) {
                 </div>
                 <div className="flex items-center gap-3">
                   <Badge variant="secondary" className="text-[10px] uppercase tracking-wider font-medium bg-muted/50 border-none text-muted-foreground">
-                    {result.similar_cases} past case{result.similar_cases !== 1 ? "s" : ""}
+                    {streaming ? (
+                      <span className="flex items-center gap-1">
+                        <Loader2 className="h-3 w-3 animate-spin" /> Answering
+                      </span>
+                    ) : (
+                      <>{result.similar_cases} past case{result.similar_cases !== 1 ? "s" : ""}</>
+                    )}
                   </Badge>
-                  {result.model !== "fallback" && (
+                  {!streaming && result.model !== "fallback" && (
                     <Badge variant="outline" className="text-[10px] uppercase tracking-wider font-medium bg-primary/5 border-primary/20 text-primary/80">
                       {result.model}
                     </Badge>
@@ -192,9 +224,15 @@ export function AskLotus({ taskId }: AskLotusProps) {
               </div>
               <div className="flex items-center gap-2">
                 <Badge variant="secondary" className="text-[10px] uppercase tracking-wider font-medium bg-muted/50 border-none text-muted-foreground">
-                  {result.similar_cases} past case{result.similar_cases !== 1 ? "s" : ""}
+                  {streaming ? (
+                    <span className="flex items-center gap-1">
+                      <Loader2 className="h-3 w-3 animate-spin" /> Answering
+                    </span>
+                  ) : (
+                    <>{result.similar_cases} past case{result.similar_cases !== 1 ? "s" : ""}</>
+                  )}
                 </Badge>
-                {result.model !== "fallback" && (
+                {!streaming && result.model !== "fallback" && (
                   <Badge variant="outline" className="text-[10px] uppercase tracking-wider font-medium bg-primary/5 border-primary/20 text-primary/80">
                     {result.model}
                   </Badge>